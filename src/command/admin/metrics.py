@@ -0,0 +1,78 @@
+# Copyright (c) 2022, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import json
+
+from command import Command
+from tools.metrics import Metrics as GameMetrics
+
+
+class Metrics(Command):
+
+    """Record metrics about the game, for load testing.
+
+    Usage:
+        metrics start
+        metrics
+        metrics stop
+
+    `metrics start` starts (or restarts) recording, for each input,
+    the time needed to send back the output and the number of SQL
+    statements it required.  `metrics` displays the report as JSON.
+    `metrics stop` displays the report and stops recording.
+    Recording metrics adds a small overhead to each input.
+
+    """
+
+    can_shorten = False
+    args = Command.new_parser()
+    args.add_argument("word", dest="action", optional=True)
+
+    def run(self, action: str = ""):
+        """Run the command."""
+        game = type(self).service.parent
+        metrics = game.metrics
+        match action:
+            case "start":
+                if metrics is not None:
+                    metrics.stop()
+
+                game.metrics = GameMetrics(game.data.engine)
+                self.msg("Recording metrics.")
+            case "" | "stop":
+                if metrics is None:
+                    self.msg("Metrics are not being recorded.")
+                    return
+
+                self.msg(json.dumps(metrics.report()))
+                if action == "stop":
+                    metrics.stop()
+                    game.metrics = None
+            case _:
+                self.msg(f"Unknown action: {action!r}.")
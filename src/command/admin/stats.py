@@ -31,6 +31,8 @@ from beautifultable import BeautifulTable
 
 from command import Command
 from data.session import Session
+from tools.delay import Delay
+from tools.hasher import HASHER
 
 
 class Stats(Command):
@@ -57,7 +59,7 @@ class Stats(Command):
         table.rows.separator = ""
 
         for uuid, command, elapsed in stats:
-            session = Session.repository.get(uuid=uuid)
+            session = Session.get(uuid=uuid, raise_not_found=False)
             if session is None:
                 origin = "[DISCONNECTED]"
             elif character := session.character:
@@ -74,4 +76,15 @@ class Stats(Command):
             elapsed = round(elapsed, 4)
             table.rows.append((origin, command, elapsed))
 
-        self.msg(str(table))
+        hashing = HASHER.get_stats()
+        self.msg(
+            str(table) + "\n"
+            f"Password hashing: {hashing['calls']} calls, "
+            f"{hashing['rejected']} rejected, "
+            f"{hashing['pending']} pending "
+            f"(max {hashing['max_pending']}), "
+            f"wait {hashing['avg_wait'] * 1000:.1f} ms "
+            f"(max {hashing['max_wait'] * 1000:.1f} ms), "
+            f"run {hashing['avg_run'] * 1000:.1f} ms\n"
+            f"Delays: {Delay.count()} scheduled"
+        )
@@ -33,7 +33,7 @@ from typing import Any, Optional, Union, TYPE_CHECKING
 
 from command.args.base import ARG_TYPES, Argument
 from command.args.error import ArgumentError
-from command.args.helpers import parse_possibilities
+from command.args.helpers import order_possibilities, parse_possibilities
 from command.args.group import Group
 from command.args.namespace import Namespace
 
@@ -92,11 +92,16 @@ class CommandArgs:
     methods have been created to do so, but you can also use `add_argument`
     to add these argument types.
 
+    The possible argument sequences (expanded from groups) are computed
+    the first time the parser is used and then kept in a parse plan.
+    Adding arguments or branches invalidates this plan.
+
     """
 
     def __init__(self):
         self.arguments = []
         self.msg_invalid = "Invalid syntax."
+        self._plan = None
 
     def new(
         self,
@@ -152,14 +157,42 @@ class CommandArgs:
             arg_type, *args, dest=dest, optional=optional, **kwargs
         )
         self.arguments.append(argument)
+        self.invalidate()
         return argument
 
     def add_group(self, role):
         """Add an argument group."""
         group = Group(self, role)
         self.arguments.append(group)
+        self.invalidate()
         return group
 
+    def invalidate(self) -> None:
+        """Invalidate the parse plan, it will be compiled again."""
+        self._plan = None
+
+    def compile(self) -> tuple[list[list[Argument]], list[list[Argument]]]:
+        """Compile the parse plan, if necessary, and return it.
+
+        Returns:
+            plan (tuple): a tuple containing the possible sequences
+                    of arguments, in their definition order, and the
+                    same sequences in the order in which they
+                    should be parsed.
+
+        """
+        if (plan := self._plan) is None:
+            possibilities = [[]]
+            for arg in self.arguments:
+                possibilities = arg.expand(possibilities)
+
+            plan = self._plan = (
+                possibilities,
+                order_possibilities(possibilities),
+            )
+
+        return plan
+
     def format(self) -> str:
         """Return a string description of the arguments.
 
@@ -170,10 +203,7 @@ class CommandArgs:
             description (str): the formatted text.
 
         """
-        possibilities = [[]]
-        for arg in self.arguments:
-            possibilities = arg.expand(possibilities)
-
+        possibilities, _ = self.compile()
         return "\n".join(
             [
                 " ".join([arg.format() for arg in line])
@@ -203,10 +233,13 @@ class CommandArgs:
             result (`Namespace` or `ArgumentError`): the parsed result.
 
         """
-        possibilities = [[]]
-        for arg in self.arguments:
-            possibilities = arg.expand(possibilities)
-
+        _, ordered = self.compile()
         return parse_possibilities(
-            possibilities, character, string, begin, end, self.msg_invalid
+            ordered,
+            character,
+            string,
+            begin,
+            end,
+            self.msg_invalid,
+            ordered=True,
         )
@@ -79,6 +79,7 @@ class Group:
 
         """
         self.branches.append(list(args))
+        self.parser.invalidate()
 
         for arg in args:
             arg.run_in = run_in
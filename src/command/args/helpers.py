@@ -28,11 +28,13 @@ def parse_possibilities(
     begin: int = 0,
     end: Optional[int] = None,
     syntax_error: str = "Invalid syntax.",
+    ordered: bool = False,
 ) -> ArgumentError | Namespace:
     """Try several possibilities.
 
     Each possibility is a list of arguments.  This allows to sequencially
-    test branches.
+    test branches.  The first possibility (in parse order) to succeed
+    is returned and the remaining ones are not parsed at all.
 
     Args:
         possibilities (list lof list of arguments): the arguments to test.
@@ -41,26 +43,44 @@ def parse_possibilities(
         begin (int): the beginning of the string to parse.
         end (int, optional): the end of the string to parse.
         syntax_error (str): message to display if no match occurs.
+        ordered (bool): whether the possibilities have already been
+                sorted by `order_possibilities`.
 
     Returns:
         result (Namespace or ArgumentError): the parsed result.
 
     """
-    results = [
-        parse_all(arguments, character, string, begin, end)
-        for arguments in possibilities
-    ]
-    successes = [result for result in results if isinstance(result, Namespace)]
-    if successes:
-        lines = zip(results, possibilities)
-        lines = [tup for tup in lines if tup[0]]
-        result, _ = max(
-            lines, key=lambda tup: len([a for a in tup[1] if not a.optional])
-        )
-    else:
-        result = ArgumentError(syntax_error)
+    if not ordered:
+        possibilities = order_possibilities(possibilities)
+
+    for arguments in possibilities:
+        result = parse_all(arguments, character, string, begin, end)
+        if isinstance(result, Namespace):
+            return result
+
+    return ArgumentError(syntax_error)
+
+
+def order_possibilities(
+    possibilities: Sequence[Sequence[Argument]],
+) -> list[Sequence[Argument]]:
+    """Sort the possibilities in the order in which they should be parsed.
+
+    Possibilities with more mandatory arguments are preferred.
+    Possibilities with the same number of mandatory arguments
+    keep their definition order.
 
-    return result
+    Args:
+        possibilities (list of list of arguments): the possibilities.
+
+    Returns:
+        ordered (list of list of arguments): the sorted possibilities.
+
+    """
+    return sorted(
+        possibilities,
+        key=lambda arguments: -len([a for a in arguments if not a.optional]),
+    )
 
 
 def parse_all(
@@ -309,7 +329,7 @@ def has_entirely_parsed(
     if end is None:
         end = len(string)
 
-    indices = list(range(begin, end))
+    intervals = []
     for result in results:
         if not result:
             continue
@@ -318,19 +338,20 @@ def has_entirely_parsed(
         r_end = result.end
         r_begin = 0 if r_begin is None else r_begin
         r_end = len(string) if r_end is None else r_end
-        for i in range(r_begin, r_end):
-            if i in indices:
-                indices.remove(i)
+        intervals.append((r_begin, r_end))
 
-    # Remove spaces in unprocessed indices.
-    for i in tuple(indices):
-        if string[i].isspace():
-            indices.remove(i)
+    # Only spaces are allowed between parsed intervals.
+    position = begin
+    for r_begin, r_end in sorted(intervals):
+        if r_begin > position:
+            if string[position : min(r_begin, end)].strip():
+                return False
 
-    if indices:
-        return False
+        position = max(position, r_end)
+        if position >= end:
+            return True
 
-    return True
+    return not string[position:end].strip()
 
 
 def create_namespace(
@@ -0,0 +1,418 @@
+# Copyright (c) 2023, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Command index, to quickly find the command matching user input.
+
+Commands are organized in levels: the root level holds commands
+without a parent, and each command with sub-commands has its own level.
+Every level maps names (names, aliases, global aliases for the root level,
+and shortened names if allowed) to an ordered sequence of candidates.
+This mapping is computed once, when commands are loaded, and is
+then filtered into views, one per level and per set of permissions.
+Only room exits and commands overriding `can_run` are checked
+while processing input.
+
+"""
+
+from typing import Iterable, Optional, Sequence, Type, TYPE_CHECKING
+
+from dynaconf import settings
+
+from command.base import Command
+
+if TYPE_CHECKING:
+    from data.character import Character
+
+# Ranks of a name, the lowest rank is preferred.
+GLOBAL = 0  # A global alias (only on the root level).
+EXACT = 1  # A name or alias.
+PARTIAL = 2  # A shortened name or alias.
+GLOBAL_PARTIAL = 3  # A shortened global alias.
+
+# A match: the command class, separator, arguments and method name.
+Match = tuple[Type[Command], Optional[str], str, Optional[str]]
+
+
+class Level:
+
+    """A level in the index, containing commands sharing a parent."""
+
+    __slots__ = ("parent", "commands", "names")
+
+    def __init__(self, parent: Type[Command] | None):
+        self.parent = parent
+        self.commands = []
+        self.names = {}
+
+    def add(self, command: Type[Command], names: Iterable[str], rank: int):
+        """Add a command to this level under the given names.
+
+        Args:
+            command (subclass of Command): the command to add.
+            names (iterable of str): the names of this command.
+            rank (int): the rank of exact names, either `GLOBAL` or `EXACT`.
+
+        """
+        order = len(self.commands)
+        self.commands.append(command)
+        partial = GLOBAL_PARTIAL if rank == GLOBAL else PARTIAL
+        record_names(self.names, names, command, rank, partial, order)
+
+    def sort(self) -> None:
+        """Sort the candidates of every name, best first."""
+        for name, candidates in self.names.items():
+            candidates.sort(key=lambda candidate: candidate[0])
+            seen = set()
+            unique = []
+            for (rank, _), command in candidates:
+                if command not in seen:
+                    seen.add(command)
+                    unique.append((rank, command))
+
+            self.names[name] = tuple(unique)
+
+
+class View:
+
+    """A level, filtered for a given set of permissions."""
+
+    __slots__ = ("level", "names", "seps", "dynamic", "dynamic_seps")
+
+    def __init__(self, level: Level, permissions: frozenset[str]):
+        self.level = level
+        self.dynamic = frozenset(
+            command for command in level.commands if is_dynamic(command)
+        )
+        allowed = {
+            command
+            for command in level.commands
+            if command in self.dynamic or is_permitted(command, permissions)
+        }
+        self.names = {}
+        for name, candidates in level.names.items():
+            candidates = tuple(
+                candidate
+                for candidate in candidates
+                if candidate[1] in allowed
+            )
+            if candidates:
+                self.names[name] = candidates
+
+        # Separators are only taken from commands at this level.
+        parent = level.parent
+        seps = {}
+        dynamic_seps = []
+        for command in level.commands:
+            if command.parent is not parent or command not in allowed:
+                continue
+
+            if command in self.dynamic:
+                dynamic_seps.append((command, tuple(command.seps)))
+            else:
+                seps.update(dict.fromkeys(command.seps))
+
+        self.seps = tuple(seps)
+        self.dynamic_seps = tuple(dynamic_seps)
+
+
+class CommandIndex:
+
+    """Index of commands, organized by level and permissions.
+
+    The index should be built (`build`) each time commands are
+    loaded or reloaded.  Views are cached by level and frozen
+    permission set: when a character's permissions change,
+    another view is used (or built) automatically.
+
+    """
+
+    max_views = 256
+
+    def __init__(self):
+        self.levels = {}
+        self.views = {}
+
+    def build(self, commands: Iterable[Type[Command]]) -> None:
+        """Build the index from the loaded commands.
+
+        Args:
+            commands (iterable): the loaded commands.
+
+        This method resets all levels and views.
+
+        """
+        commands = list(commands)
+        self.levels.clear()
+        self.views.clear()
+        root = Level(None)
+        for command in commands:
+            if command.parent is None:
+                root.add(command, get_names(command), EXACT)
+
+        for command in commands:
+            if command.parent is not None:
+                if aliases := as_tuple(command.global_alias):
+                    root.add(command, aliases, GLOBAL)
+
+        root.sort()
+        self.levels[None] = root
+        for command in commands:
+            self._build_level(command)
+
+    def invalidate(self) -> None:
+        """Forget about cached views."""
+        self.views.clear()
+
+    def get_view(
+        self, parent: Type[Command] | None, permissions: frozenset[str]
+    ) -> View | None:
+        """Return the view for this level and these permissions.
+
+        Args:
+            parent (subclass of Command or None): the parent command.
+            permissions (frozenset): the permissions to filter.
+
+        Returns:
+            view (View or None): the view, None if the level is empty.
+
+        """
+        key = (parent, permissions)
+        if (view := self.views.get(key)) is None:
+            if (level := self.levels.get(parent)) is None:
+                return None
+
+            if len(self.views) >= self.max_views:
+                del self.views[next(iter(self.views))]
+
+            view = self.views[key] = View(level, permissions)
+
+        return view
+
+    def match(
+        self,
+        character: "Character",
+        user_input: str,
+        exits: Sequence[Type[Command]] = (),
+    ) -> Match | None:
+        """Find the command matching the user input.
+
+        Args:
+            character (Character): the character sending input.
+            user_input (str): the user input.
+            exits (sequence): the exit commands of the current room.
+
+        Returns:
+            match (tuple or None): None if no command could be found,
+                    otherwise a tuple `(command, sep, after, method)`,
+                    `method` being None for a standard call,
+                    or the name of the method to call.
+
+        """
+        permissions = character.permissions.frozen
+        exits = [cls for cls in exits if cls.can_run(character)]
+        exit_names = {}
+        for order, command in enumerate(exits):
+            record_names(
+                exit_names, get_names(command), command, EXACT, PARTIAL, order
+            )
+
+        parent = command = method = sep = None
+        after = ""
+        while True:
+            view = self.get_view(parent, permissions)
+            if view is None and not exits:
+                break
+
+            dynamic = ()
+            seps = {}
+            if exits:
+                for cls in exits:
+                    seps.update(dict.fromkeys(cls.seps))
+
+            if view is not None:
+                dynamic = {
+                    cls for cls in view.dynamic if cls.can_run(character)
+                }
+                seps.update(dict.fromkeys(view.seps))
+                for cls, cls_seps in view.dynamic_seps:
+                    if cls in dynamic:
+                        seps.update(dict.fromkeys(cls_seps))
+
+            command = None
+            for try_sep in seps:
+                try:
+                    before, try_after = user_input.split(try_sep, 1)
+                except ValueError:
+                    before, try_after = user_input, ""
+
+                command = self._find(view, before, dynamic, exit_names)
+                if command is not None:
+                    parent = command
+                    user_input = after = try_after
+                    sep = try_sep
+                    break
+
+            exits = exit_names = None
+            if command is None:
+                if parent is None:
+                    return None
+
+                command = parent
+                method = "display_sub_commands"
+                break
+
+        if command is None:
+            return None
+
+        return command, sep, after, method
+
+    def _build_level(self, parent: Type[Command]) -> None:
+        """Build the level of sub-commands of a command, recursively."""
+        if parent in self.levels or not parent.sub_commands:
+            return
+
+        level = Level(parent)
+        for command in sorted(parent.sub_commands, key=lambda c: c.name):
+            level.add(command, get_names(command), EXACT)
+
+        level.sort()
+        self.levels[parent] = level
+        for command in level.commands:
+            self._build_level(command)
+
+    @staticmethod
+    def _find(
+        view: View | None,
+        before: str,
+        dynamic: set[Type[Command]],
+        exit_names: dict[str, list] | None,
+    ) -> Type[Command] | None:
+        """Find the command in a view and in exits."""
+        found = None
+        rank = None
+        if view is not None:
+            for rank, command in view.names.get(before, ()):
+                if command not in view.dynamic or command in dynamic:
+                    found = command
+                    break
+
+        if exit_names and (candidates := exit_names.get(before)):
+            (exit_rank, _), exit = min(candidates, key=lambda c: c[0])
+
+            # Exact names of commands override exits, exits
+            # are prefered to other commands for shortened names.
+            if found is None or exit_rank < rank:
+                found = exit
+            elif exit_rank == rank and rank != EXACT:
+                found = exit
+
+        return found
+
+
+def as_tuple(names: str | Sequence[str]) -> tuple[str, ...]:
+    """Return the name(s) as a tuple."""
+    if isinstance(names, str):
+        return (names,)
+
+    return tuple(names)
+
+
+def get_names(command: Type[Command]) -> tuple[str, ...]:
+    """Return the name and aliases of a command."""
+    return (command.name,) + as_tuple(command.alias)
+
+
+def can_shorten(command: Type[Command]) -> bool:
+    """Can this command be shortened, using aliases?"""
+    return settings.CAN_SHORTEN_COMMANDS and command.can_shorten
+
+
+def is_dynamic(command: Type[Command]) -> bool:
+    """Return whether `can_run` is overridden in this command or parents.
+
+    Such commands cannot be filtered using permissions only,
+    they have to be checked for each input.
+
+    """
+    while command is not None:
+        if command.can_run.__func__ is not Command.can_run.__func__:
+            return True
+
+        command = command.parent
+
+    return False
+
+
+def is_permitted(command: Type[Command], permissions: frozenset[str]) -> bool:
+    """Return whether these permissions allow to run this command.
+
+    This is the default behavior of `Command.can_run`.
+
+    """
+    while command is not None:
+        if command.permissions and command.permissions not in permissions:
+            return False
+
+        command = command.parent
+
+    return True
+
+
+def record_names(
+    names: dict[str, list],
+    command_names: Iterable[str],
+    command: Type[Command],
+    rank: int,
+    partial: int,
+    order: int,
+) -> None:
+    """Record the names for the given command.
+
+    Args:
+        names (dict): the names to update.
+        command_names (iterable): the names to add.
+        command (subclass of Command): the command matching these names.
+        rank (int): the rank of exact names.
+        partial (int): the rank of shortened names.
+        order (int): the order in which the command was added.
+
+    If the command can be shortened, also add partial names.  The last
+    command added wins for exact names, the first one for partial names.
+
+    """
+    shorten = can_shorten(command)
+    for name in command_names:
+        names.setdefault(name, []).append(((rank, -order), command))
+
+        if shorten:
+            for i in range(len(name) - 1, 0, -1):
+                partial_name = name[:i]
+                names.setdefault(partial_name, []).append(
+                    ((partial, order), command)
+                )
@@ -45,14 +45,16 @@ a single context: the one that interprets commands.
 
 """
 
+import asyncio
 import inspect
 from textwrap import dedent
 import traceback
-from typing import Any, Optional, TYPE_CHECKING
+from typing import Any, Callable, Optional, TYPE_CHECKING
 
 from context.log import logger
 from data.decorators import lazy_property
 from tools.delay import Delay
+from tools.hasher import PasswordHasherBusy
 
 if TYPE_CHECKING:
     from data.character import Character
@@ -382,3 +384,43 @@ class Context:
 
         """
         return Delay.schedule(*args, **kwargs)
+
+    def suspend(self, function: Callable[..., Any], *args, resume: str):
+        """Run a slow function without blocking the game.
+
+        The function (usually hashing a password) is run outside of
+        the game loop.  In the meantime, input from this session
+        is suspended.  When the function returns, the method
+        `resume` is called on the session's context with the result,
+        then input handling resumes.
+
+        Args:
+            function (callable): the function to run.
+            resume (str): the name of the method to call with the result.
+
+        Additional positional arguments are sent to the function.
+
+        If the game isn't running (no event loop), the function
+        and the resume method are called right away.
+
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            getattr(self, resume)(function(*args))
+        else:
+            type(self).service.suspend(self.session, function, args, resume)
+
+    def suspend_failed(self, error: Exception):
+        """Called when the function given to `suspend` has failed.
+
+        Args:
+            error (Exception): the raised exception.
+
+        """
+        if isinstance(error, PasswordHasherBusy):
+            self.msg("The game is busy right now, please try again.")
+        else:
+            trace = "".join(traceback.format_exception(error)).strip()
+            logger.error(f"An error occurred while suspended:\n{trace}")
+            self.msg("An error occurred, please try again.")
@@ -59,7 +59,22 @@ class Password(Context):
             self.msg("Please wait, you can't retry your password just yet.")
             return
 
-        if not account.test_password(hashed_password, password):
+        self.suspend(
+            account.test_password,
+            hashed_password,
+            password,
+            resume="check_password",
+        )
+
+    def check_password(self, match: bool):
+        """The password has been checked (see `suspend`).
+
+        Args:
+            match (bool): whether the password was correct.
+
+        """
+        if not match:
+            account = self.session.db.account
             self.msg("Incorrect password.  Please wait.")
             self.call_in(3, self.allow_new_password, account)
             return
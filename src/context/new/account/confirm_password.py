@@ -54,7 +54,21 @@ class ConfirmPassword(Context):
 
     def other_input(self, password: str):
         """The user entered something else."""
-        if not Account.test_password(self.session.db.password, password):
+        self.suspend(
+            Account.test_password,
+            self.session.db.password,
+            password,
+            resume="check_password",
+        )
+
+    def check_password(self, match: bool):
+        """The password has been checked (see `suspend`).
+
+        Args:
+            match (bool): whether both passwords are the same.
+
+        """
+        if not match:
             self.msg(
                 "This password isn't the same as the one you entered "
                 "at the previous step."
@@ -86,5 +86,14 @@ class Password(Context):
             )
             return
 
-        self.session.db.password = Account.hash_password(password)
+        self.suspend(Account.hash_password, password, resume="store_password")
+
+    def store_password(self, hashed_password: bytes):
+        """The password has been hashed (see `suspend`).
+
+        Args:
+            hashed_password (bytes): the hashed password.
+
+        """
+        self.session.db.password = hashed_password
         self.move("new.account.confirm_password")
@@ -59,10 +59,13 @@ tables.  Both can also contain additional information which is serialized
 from typing import Callable
 
 from data.base.sql.engine import SqliteEngine
+from data.base.sql.policy import CachePolicy
 
 
 def handle_data(
-    logging: Callable[[str, str], None] = None, memory: bool = False
+    logging: Callable[[str, str], None] = None,
+    memory: bool = False,
+    cache_policy: CachePolicy | None = None,
 ) -> SqliteEngine:
     """Connect to the database and bind models."""
     from data.account import Account
@@ -78,7 +81,12 @@ def handle_data(
     from data.session import Session
 
     engine = SqliteEngine()
-    kwargs = dict(file_name="talismud.db", memory=memory, logging=logging)
+    kwargs = dict(
+        file_name="talismud.db",
+        memory=memory,
+        logging=logging,
+        cache_policy=cache_policy,
+    )
     engine.init(**kwargs)
     engine.bind(
         {
@@ -30,13 +30,22 @@
 """Module containing the `Model` class from which all models should inherit."""
 
 from itertools import chain
-import pickle
-from typing import Any, Optional, Type, TYPE_CHECKING
+from typing import (
+    Any,
+    Collection,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    Type,
+    TYPE_CHECKING,
+)
 
 from pydantic import Field
 from pydantic.main import ModelMetaclass as BaseModelMetaclass
 from sqlalchemy.sql.roles import SQLRole
 
+from data.base.schema import NO_DEFAULT, Schema
 from data.base.sql.registry import BASE
 
 if TYPE_CHECKING:
@@ -49,6 +58,7 @@ class ModelMetaclass(BaseModelMetaclass):
 
     models = set()
     paths = {}
+    schemas = {}
     engine = None
 
     def __new__(
@@ -108,6 +118,26 @@ class ModelMetaclass(BaseModelMetaclass):
         """Return whether this model is a first class model."""
         return cls.base_model is cls
 
+    @property
+    def schema(cls) -> Schema:
+        """Return the compiled schema of this class."""
+        schema = ModelMetaclass.schemas.get(cls)
+        if schema is None:
+            schema = cls.compile_schema()
+
+        return schema
+
+    def compile_schema(cls) -> Schema:
+        """Compile (or compile again) the schema of this class.
+
+        Returns:
+            schema (Schema): the new schema.
+
+        """
+        schema = Schema.compile(cls)
+        ModelMetaclass.schemas[cls] = schema
+        return schema
+
     @property
     def table(cls) -> BASE:
         """Return the class table from the engine."""
@@ -152,7 +182,7 @@ class ModelMetaclass(BaseModelMetaclass):
             primary_key (bool): whether this field is a primary key.
 
         """
-        return field.field_info.extra.get("primary_key", False)
+        return field.name in cls.schema.primary_fields
 
     def is_external(cls, field: Field) -> bool:
         """Return whether this field is external (stored in another table).
@@ -164,12 +194,7 @@ class ModelMetaclass(BaseModelMetaclass):
             external (bool): whether this field is an external field or not.
 
         """
-        if cls.is_primary_key(field):
-            external = False
-        else:
-            external = field.field_info.extra.get("external", False)
-
-        return external
+        return field.name in cls.schema.external
 
     def is_safe(cls, field: Field) -> bool:
         """Return whether this field is safe.
@@ -196,6 +221,47 @@ class ModelMetaclass(BaseModelMetaclass):
         """
         return ModelMetaclass.engine.create_model(cls, **kwargs)
 
+    def hydrate(
+        cls, attrs: dict[str, Any], deferred: Collection[str] = ()
+    ) -> "Model":
+        """Build a model from trusted attributes, without validating them.
+
+        This is used by the engine to build models from stored data,
+        which was validated before being stored.  Fields missing
+        from `attrs` get their default value: default factories
+        (like handlers) are only called for them.  Models created
+        with `create` and attribute assignments are still validated.
+
+        Args:
+            attrs (dict): the field names and values, already converted
+                    (see `SqliteEngine.as_attributes`).
+            deferred (collection): the names of fields which will be
+                    set later on.  Their default factory isn't called,
+                    but shared default values are still set (the cache
+                    might need them before the field is set).
+
+        Returns:
+            model (Model): the new model.
+
+        """
+        values = {}
+        for name, default, factory in cls.schema.defaults:
+            if name in attrs:
+                values[name] = attrs[name]
+            elif factory is not None:
+                if name not in deferred:
+                    values[name] = factory()
+            elif default is not NO_DEFAULT:
+                values[name] = default
+
+        model = cls.__new__(cls)
+        object.__setattr__(model, "__dict__", values)
+        object.__setattr__(model, "__fields_set__", set(attrs))
+        if cls.__private_attributes__:
+            model._init_private_attributes()
+
+        return model
+
     def get(cls, **kwargs):
         """Try to retrieve the object from storage, raises NotFound if error.
 
@@ -213,13 +279,30 @@ class ModelMetaclass(BaseModelMetaclass):
         kwargs["raise_not_found"] = False
         return ModelMetaclass.engine.get_model(cls, **kwargs)
 
+    def get_many(cls, keys: Iterable[Any]) -> list["Model"]:
+        """Retrieve several objects from storage, in one query.
+
+        Models found in cache are returned directly, all the others
+        are fetched with a single query.  Models that cannot be
+        found are silently skipped.
+
+        Args:
+            keys (iterable): the primary key values (IDs, for nodes).
+
+        Returns:
+            objects (list of Model): the models, in the order of keys.
+
+        """
+        return ModelMetaclass.engine.get_models(cls, keys)
+
     def all(cls) -> list["Model"]:
         """Retrieve the list of all stored models.
 
         WARNING:
             Do this only if you are quite confident the table
             isn't big or loading absolutely every row is necessary.
-            In doubt, prefer using `select` with a filter query.
+            In doubt, prefer using `select` with a filter query,
+            or `iter_select` to go over the models by chunk.
 
         Returns:
             objects (list of Model): the list of all model objects.
@@ -264,35 +347,59 @@ class ModelMetaclass(BaseModelMetaclass):
         """
         return ModelMetaclass.engine.select_models(cls, query)
 
+    def iter_select(
+        cls,
+        query: SQLRole | None = None,
+        chunk_size: int = 500,
+        retain: bool = True,
+    ) -> Iterator["Model"]:
+        """Iterate over model objects, loading them by chunk.
+
+        Unlike `all` or `select`, only `chunk_size` models are loaded
+        at a time, so this can go over big tables.  Models are
+        returned in primary key order.  The iteration should be
+        consumed within a single transaction.
+
+        Args:
+            query (query, optional): the SQL query object.
+            chunk_size (int, optional): the number of models to load
+                    at a time.
+            retain (bool, optional): whether the engine cache should
+                    keep the loaded models in memory.  Set it to False
+                    to go over all models with bounded memory.
+
+        Yields:
+            model (Model): the model objects.
+
+        Example:
+
+            >>> for room in Room.iter_select(retain=False):
+            ...     room.title = room.title.strip()
+
+        """
+        return ModelMetaclass.engine.iter_models(
+            cls, query, chunk_size=chunk_size, retain=retain
+        )
+
     def delete(self, model: "Model"):
         """Delete the specified model."""
         ModelMetaclass.engine.delete(model)
 
     def get_primary_keys_from_class(
         cls, unique: bool = False
-    ) -> dict[str, Field]:
-        """Return the primary key fields in a dictionary.
+    ) -> Mapping[str, Field]:
+        """Return the primary key fields in a read-only dictionary.
 
         Args:
             unique (bool, optional): also return unique fields.
 
         Returns:
-            primary_keys (dict): the primary key fields, with field names
-                    as keys and fields as values.
+            primary_keys (mapping): the primary key fields, with field
+                    names as keys and fields as values.
 
         """
-        pkeys = {}
-        for field in cls.__fields__.values():
-            store = False
-            if field.field_info.extra.get("primary_key", False):
-                store = True
-            elif unique and field.field_info.extra.get("unique", False):
-                store = True
-
-            if store:
-                pkeys[field.name] = field
-
-        return pkeys
+        schema = cls.schema
+        return schema.key_fields if unique else schema.primary_fields
 
     def get_primary_keys_from_values(cls, *values) -> dict[str, Any]:
         """Return the primary key fields from values in a dictionary.
@@ -307,14 +414,7 @@ class ModelMetaclass(BaseModelMetaclass):
                     as keys and matching values as values.
 
         """
-        pkeys = {}
-        primary_fields = cls.get_primary_keys_from_class()
-        values = iter(list(values))
-        for key, field in primary_fields.items():
-            value = next(values)
-            pkeys[key] = value
-
-        return pkeys
+        return dict(zip(cls.schema.primary_keys, values))
 
     def get_primary_keys_from_attrs(
         cls, attrs: dict[str, Any], sanitize: bool = True
@@ -335,14 +435,9 @@ class ModelMetaclass(BaseModelMetaclass):
         if sanitize:
             attrs = ModelMetaclass.engine.as_fields(cls, attrs)
 
-        pkeys = {}
-        primary_fields = cls.get_primary_keys_from_class()
-        for key, field in primary_fields.items():
-            value = attrs.get(key, ...)
-            if value is not ...:
-                pkeys[key] = value
-
-        return pkeys
+        return {
+            key: attrs[key] for key in cls.schema.primary_keys if key in attrs
+        }
 
     def get_primary_keys_and_uniques_from_attrs(
         cls, attrs: dict[str, Any], sanitize: bool = True
@@ -363,15 +458,10 @@ class ModelMetaclass(BaseModelMetaclass):
         if sanitize:
             attrs = ModelMetaclass.engine.as_fields(cls, attrs)
 
-        keys = {}
-        for key, value in attrs.items():
-            field = cls.__fields__[key]
-            pk = field.field_info.extra.get("primary_key", False)
-            unique = field.field_info.extra.get("unique", False)
-            if pk or unique:
-                keys[key] = value
-
-        return keys
+        key_fields = cls.schema.key_fields
+        return {
+            key: value for key, value in attrs.items() if key in key_fields
+        }
 
     def get_primary_keys_from_model(
         cls,
@@ -397,17 +487,23 @@ class ModelMetaclass(BaseModelMetaclass):
                     is set to `True`, return a flattened tuple instead.
 
         """
-        pkeys = {}
-        for key in cls.get_primary_keys_from_class(unique=unique).keys():
-            value = getattr(model, key)
-            pkeys[key] = value
+        schema = cls.schema
+        if as_tuple and not sanitize and not unique:
+            return tuple(
+                chain.from_iterable(
+                    (key, getattr(model, key)) for key in schema.sorted_keys
+                )
+            )
 
+        keys = schema.key_fields if unique else schema.primary_keys
+        pkeys = {key: getattr(model, key) for key in keys}
         if sanitize:
             pkeys = ModelMetaclass.engine.as_fields(cls, pkeys)
 
         if as_tuple:
-            pkeys = sorted([(key, value) for key, value in pkeys.items()])
-            pkeys = tuple(chain.from_iterable(pkeys))
+            pkeys = tuple(
+                chain.from_iterable((key, pkeys[key]) for key in sorted(pkeys))
+            )
 
         return pkeys
 
@@ -429,14 +525,19 @@ class ModelMetaclass(BaseModelMetaclass):
             ValueError if the model has more than one primary keys.
 
         """
-        pkeys = cls.get_primary_keys_from_model(model, sanitize=sanitize)
-        if len(pkeys) != 1:
+        primary_keys = cls.schema.primary_keys
+        if len(primary_keys) != 1:
             raise ValueError(
-                f"there is {len(pkeys)} primary key attributes "
+                f"there is {len(primary_keys)} primary key attributes "
                 f"on {cls}, only one is supported"
             )
 
-        return list(pkeys.values())[0]
+        key = primary_keys[0]
+        value = getattr(model, key)
+        if sanitize:
+            value = ModelMetaclass.engine.as_fields(cls, {key: value})[key]
+
+        return value
 
     def search_attributes(cls, name: str, value: Any) -> tuple[Any]:
         """Search objects with an attribute with this value.
@@ -460,9 +561,7 @@ class ModelMetaclass(BaseModelMetaclass):
             list: a list of primary keys of objects with a matching attribute.
 
         """
-        nattr = cls.nattr
-        query = (nattr.name == name) & (nattr.value == pickle.dumps(value))
-        return cls.engine.select_values(cls, nattr.model, query=query)
+        return cls.engine.search_attributes(cls, name, value)
 
     def get_attributes(
         cls, name: str, query: SQLRole | None = None
@@ -477,19 +576,7 @@ class ModelMetaclass(BaseModelMetaclass):
             values (list): the values.
 
         """
-        nattr = cls.nattr
-        if query is None:
-            query = nattr.name == name
-        else:
-            query &= nattr.name == name
-
-        raw = cls.engine.select_values(cls, nattr.value, query)
-        values = []
-        for value in raw:
-            value = pickle.loads(value)
-            values.append(value)
-
-        return values
+        return cls.engine.get_attributes(cls, name, query)
 
     @staticmethod
     def get_class_from_path(
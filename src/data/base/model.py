@@ -46,32 +46,35 @@ class Model(BaseModel, metaclass=ModelMetaclass):
 
     """
 
+    # Models are weakly referenced by the engine cache.
+    # Their primary keys (as a tuple) are cached in `_pkeys`,
+    # their lazy property values in `_lazy_values`.
+    __slots__ = ("__weakref__", "_pkeys", "_lazy_values")
+
     def __repr_args__(self):
         attrs = type(self).get_primary_keys_from_model(self, unique=True)
         return tuple(attrs.items())
 
     def __hash__(self):
-        return hash(
-            type(self).get_primary_keys_from_model(self, as_tuple=True)
-        )
+        return hash(self._get_pkeys())
 
     def __eq__(self, other: Any) -> bool:
-        eq = False
-        keys = type(self).get_primary_keys_from_model(self, as_tuple=True)
         if isinstance(other, type(self)):
-            eq = keys == type(other).get_primary_keys_from_model(
-                other, as_tuple=True
-            )
+            return self._get_pkeys() == other._get_pkeys()
 
-        return eq
+        return False
 
     def __setattr__(self, key: str, value: Any) -> None:
         """Update the object."""
-        cls_attr = getattr(type(self), key, None)
+        cls = type(self)
+        cls_attr = getattr(cls, key, None)
         if isinstance(cls_attr, (property, LazyPropertyDescriptor)):
             object.__setattr__(self, key, value)
         else:
             old_value = object.__getattribute__(self, key)
+            if key in cls.schema.primary_fields:
+                object.__setattr__(self, "_pkeys", None)
+
             super().__setattr__(key, value)
             try:
                 ModelMetaclass.engine.update(self, key, value)
@@ -84,6 +87,21 @@ class Model(BaseModel, metaclass=ModelMetaclass):
         attrs = cls.get_primary_keys_from_model(self)
         return (fetch, (cls, attrs))
 
+    def _get_pkeys(self) -> tuple[Any, ...]:
+        """Return the primary keys of this model as a flat tuple.
+
+        The tuple is computed once and cached, as it is used to hash
+        models and compare them.  It is forgotten if a primary key
+        is modified.
+
+        """
+        pkeys = getattr(self, "_pkeys", None)
+        if pkeys is None:
+            pkeys = type(self).get_primary_keys_from_model(self, as_tuple=True)
+            object.__setattr__(self, "_pkeys", pkeys)
+
+        return pkeys
+
     def is_from(self, class_path: str) -> bool:
         """Return whether this model is from a class with this class path.
 
@@ -35,7 +35,7 @@ behind the scenes.
 
 """
 
-from typing import Optional
+from typing import Any, Optional
 
 from pydantic import Field
 
@@ -45,6 +45,9 @@ from data.base.sql.nattr import Nattr
 from data.base.sql.node import Node as SQLNode
 from data.handler.locator import LocationHandler
 
+# Fields used to name nodes in search groups.
+NAME_FIELDS = frozenset({"name", "singular", "plural", "prototype"})
+
 
 class Node(Model):
 
@@ -56,6 +59,14 @@ class Node(Model):
     location_filter: str | None
     locator: LocationHandler = Field(default_factory=LocationHandler)
 
+    def __setattr__(self, key: str, value: Any) -> None:
+        """Update the node, discarding search groups if it's renamed."""
+        super().__setattr__(key, value)
+        if key in NAME_FIELDS:
+            from data.search.group import Group
+
+            Group.discard(self)
+
     @property
     def location(self) -> Optional["Node"]:
         return self.locator.get()
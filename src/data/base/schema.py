@@ -0,0 +1,187 @@
+# Copyright (c) 2022, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Schema of a model class, compiled once from its fields.
+
+Reading the fields of a model class (`__fields__` and the extra
+information of each field) is slow compared to the frequency at
+which the engine needs it: primary keys are read to hash a model,
+to compare two models, to cache a model, external fields are checked
+whenever a model is created or updated.  A `Schema` holds this
+information for one model class, computed once.
+
+Schemas are compiled lazily (see `ModelMetaclass.schema`) and
+compiled again when models are bound to an engine, since binding
+can change which fields are external and resolves forward references.
+
+"""
+
+from dataclasses import dataclass
+import pickle
+from types import MappingProxyType
+from typing import Any, Callable, ForwardRef, Mapping, Type, TYPE_CHECKING
+
+from pydantic import BaseModel
+from pydantic.fields import ModelField, SHAPE_SINGLETON
+
+from data.base.sql.types import SQL_TYPES
+
+if TYPE_CHECKING:
+    from data.base.model import Model
+
+# Default values which can be shared by all models.
+IMMUTABLE_DEFAULTS = (type(None), bool, int, float, str, bytes)
+
+# Marker of a field without default value.
+NO_DEFAULT = object()
+
+
+@dataclass(frozen=True, slots=True)
+class Schema:
+
+    """Field metadata of a model class."""
+
+    primary_keys: tuple[str, ...]
+    sorted_keys: tuple[str, ...]
+    primary_fields: Mapping[str, ModelField]
+    key_fields: Mapping[str, ModelField]
+    uniques: tuple[str, ...]
+    external: frozenset[str]
+    references: tuple[str, ...]
+    to_store: Mapping[str, Callable[[Any], Any] | None]
+    to_load: Mapping[str, Callable[[Any], Any] | None]
+    defaults: tuple[tuple[str, Any, Callable[[], Any] | None], ...]
+
+    @classmethod
+    def compile(cls, model_class: Type["Model"]) -> "Schema":
+        """Compile the schema of a model class.
+
+        Args:
+            model_class (subclass of Model): the model class.
+
+        Returns:
+            schema (Schema): the compiled schema.
+
+        """
+        primary_fields = {}
+        key_fields = {}
+        uniques = []
+        external = set()
+        references = []
+        to_store = {}
+        to_load = {}
+        defaults = []
+        for name, field in model_class.__fields__.items():
+            extra = field.field_info.extra
+            primary_key = extra.get("primary_key", False)
+            unique = extra.get("unique", False)
+            if primary_key:
+                primary_fields[name] = field
+            if primary_key or unique:
+                key_fields[name] = field
+            if unique:
+                uniques.append(name)
+            if not primary_key and extra.get("external", False):
+                external.add(name)
+            if cls._may_hold_model(field):
+                references.append(name)
+
+            _, _, store, load = SQL_TYPES.get(
+                field.type_, (..., ..., pickle.dumps, pickle.loads)
+            )
+            if name not in external:
+                to_store[name] = store if store is not ... else None
+            to_load[name] = load if load is not ... else None
+            defaults.append(cls._get_default(field))
+
+        return cls(
+            primary_keys=tuple(primary_fields),
+            sorted_keys=tuple(sorted(primary_fields)),
+            primary_fields=MappingProxyType(primary_fields),
+            key_fields=MappingProxyType(key_fields),
+            uniques=tuple(uniques),
+            external=frozenset(external),
+            references=tuple(references),
+            to_store=MappingProxyType(to_store),
+            to_load=MappingProxyType(to_load),
+            defaults=tuple(defaults),
+        )
+
+    @staticmethod
+    def _may_hold_model(field: ModelField) -> bool:
+        """Return whether this field can directly contain a model.
+
+        Args:
+            field (ModelField): the field.
+
+        Returns:
+            may (bool): whether the field value can be a model.  Fields
+                    whose type can't be determined are included.
+
+        """
+        if field.shape != SHAPE_SINGLETON:
+            return False
+
+        type_ = field.type_
+        if type_ is Any or type_ is object or isinstance(type_, ForwardRef):
+            return True
+
+        if not isinstance(type_, type):
+            return True
+
+        return issubclass(type_, BaseModel)
+
+    @staticmethod
+    def _get_default(
+        field: ModelField,
+    ) -> tuple[str, Any, Callable[[], Any] | None]:
+        """Return the default value of a field.
+
+        Immutable default values are shared, other default values
+        are copied (or created by their factory) for every model.
+
+        Args:
+            field (ModelField): the field.
+
+        Returns:
+            (name, default, factory): `factory` is `None` if `default`
+                    can be shared.  `default` is `NO_DEFAULT` if
+                    the field has no default value.
+
+        """
+        if field.default_factory is not None:
+            return (field.name, NO_DEFAULT, field.default_factory)
+
+        if field.required is True:
+            return (field.name, NO_DEFAULT, None)
+
+        if type(field.default) in IMMUTABLE_DEFAULTS:
+            return (field.name, field.default, None)
+
+        return (field.name, NO_DEFAULT, field.get_default)
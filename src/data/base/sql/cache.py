@@ -29,20 +29,36 @@
 
 """Module containing the database cache for TalisMUD."""
 
-from collections import defaultdict
-from typing import Callable, Type
+from collections import Counter, defaultdict
+from typing import Any, Callable, Iterable, Type
+from weakref import finalize, WeakValueDictionary
 
 from data.base.model import Model
+from data.base.sql.policy import CachePolicy
 
 
 class Cache:
 
-    """Cache for the database engine."""
+    """Cache for the database engine.
 
-    def __init__(self):
-        self.models = defaultdict(dict)
-        self.uniques = {}
+    The cache is an identity map: a given row in the database
+    is represented by only one model object.  Models are weakly
+    referenced, the cache policy decides which ones to keep in memory.
+
+    """
+
+    def __init__(self, policy: CachePolicy | None = None):
+        self.models = defaultdict(WeakValueDictionary)
+        self.uniques = WeakValueDictionary()
         self.linked_cache = defaultdict(set)
+        self.links = defaultdict(set)
+        self.policy = policy if policy is not None else CachePolicy()
+        self.pins = Counter()
+        self.pinned = {}
+        self.collected = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
     def put(self, model: Model) -> None:
         """Cache the given model object.
@@ -53,26 +69,38 @@ class Cache:
         Write the model in cache, so it can be retrieved later if necessary.
 
         """
+        self._purge()
         cls = type(model)
         base = cls.base_model
-        pkeys = cls.get_primary_keys_from_model(model, as_tuple=True)
-        self.models[base][pkeys] = model
+        pkeys = model._get_pkeys()
+        pkey = cls.get_primary_key_from_model(model)
+        models = self.models[base]
+        if models.get(pkeys) is not model:
+            models[pkeys] = model
+            finalize(model, self.collected.append, (cls, base, pkeys, pkey))
 
-        # Cache unique attributes.
-        for key, field in cls.__fields__.items():
-            if field.field_info.extra.get("unique", False):
-                value = getattr(model, key)
-                self.uniques[(cls, key, value)] = model
+        key = (base, pkeys)
+        if key in self.pins:
+            self.pinned[key] = model
 
-        # Cache the linked models.
-        pkey = cls.get_primary_key_from_model(model)
-        for key, field in cls.__fields__.items():
+        self.evictions += len(self.policy.add(key, model))
+
+        # Cache unique attributes.
+        schema = cls.schema
+        for key in schema.uniques:
             value = getattr(model, key)
+            self.uniques[(cls, key, value)] = model
+
+        # Cache the linked models.  Fields can be missing while
+        # the model is being loaded (see `ModelMetaclass.hydrate`).
+        for key in schema.references:
+            value = getattr(model, key, None)
             if isinstance(value, Model):
                 vkey = type(value).get_primary_key_from_model(value)
                 self.linked_cache[(type(value), vkey)].add(
                     (type(model), pkey, key)
                 )
+                self.links[(cls, pkey)].add((type(value), vkey))
 
     def get(self, model_class: Type[Model], **kwargs) -> Model | None:
         """Return an object from cache or None.
@@ -94,8 +122,70 @@ class Cache:
             if obj is None:
                 obj = self.uniques.get((model_class, key, value))
 
+            if obj is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.policy.access((base, (key, value)))
+
             return obj
 
+    def pin(self, model: Model) -> None:
+        """Pin a model, so that it is always kept in memory.
+
+        Pins are counted: a model pinned twice has to be unpinned
+        twice before it can be evicted.  Online characters
+        and the rooms they stand in are pinned.
+
+        Args:
+            model (Model): the model to pin.
+
+        """
+        key = self._get_key(model)
+        self.pins[key] += 1
+        self.pinned[key] = model
+
+    def unpin(self, model: Model) -> None:
+        """Unpin a model, the cache policy can evict it again.
+
+        Args:
+            model (Model): the model to unpin.
+
+        """
+        key = self._get_key(model)
+        if key in self.pins:
+            self.pins[key] -= 1
+            if self.pins[key] <= 0:
+                del self.pins[key]
+                self.pinned.pop(key, None)
+
+    def release(self, models: Iterable[Model]) -> None:
+        """Stop retaining these models, unless they are pinned.
+
+        The models stay in cache as long as they are referenced
+        elsewhere: the cache policy just doesn't keep them in memory.
+
+        Args:
+            models (iterable of Model): the models to release.
+
+        """
+        for model in models:
+            key = self._get_key(model)
+            if key not in self.pins:
+                self.policy.remove(key)
+
+    def is_pinned(self, model: Model) -> bool:
+        """Return whether this model is pinned.
+
+        Args:
+            model (Model): the model.
+
+        Returns:
+            pinned (bool): whether this model is pinned.
+
+        """
+        return self._get_key(model) in self.pins
+
     def delete(
         self, model: Model, linked_callback: Callable[[Model, str], None]
     ) -> None:
@@ -111,21 +201,53 @@ class Cache:
                     This allows to clear up the cache of deleted models.
 
         """
-        cls = type(model)
-        base = cls.base_model
-        pkey = cls.get_primary_key_from_model(model)
-        self.models.get(base, {}).pop(
-            cls.get_primary_keys_from_model(model, as_tuple=True), False
-        )
+        key = self._get_key(model)
+        self.pins.pop(key, None)
+        self.forget((model,), linked_callback)
+
+    def forget(
+        self,
+        models: Iterable[Model],
+        linked_callback: Callable[[Model, str], None],
+    ) -> None:
+        """Remove several models from cache, keeping their pins.
+
+        This is used when the models in memory cannot be trusted anymore
+        (their transaction was rolled back, for instance).
+        Unlike `delete`, models are reloaded (and pinned again, if
+        they were pinned) the next time they are needed.  Cached models
+        referring to the forgotten models are refreshed through the
+        callback once all models have been removed.
+
+        Args:
+            models (iterable of Model): the models to remove from cache.
+            linked_Callback (callable): the callback to call for
+                    every cached model referring to a forgotten model.
 
-        # Remove unique fields.
-        for key, field in cls.__fields__.items():
-            if field.field_info.extra.get("unique", False):
-                value = getattr(model, key)
-                self.uniques.pop((cls, key, value), False)
+        """
+        self._purge()
+        linked = []
+        for model in models:
+            cls = type(model)
+            base = cls.base_model
+            pkeys = model._get_pkeys()
+            key = (base, pkeys)
+            pkey = cls.get_primary_key_from_model(model)
+            if self.models.get(base, {}).get(pkeys) is model:
+                self.models[base].pop(pkeys, None)
+                self.policy.remove(key)
+                self.pinned.pop(key, None)
+
+            # Remove unique fields.
+            for name in cls.schema.uniques:
+                value = getattr(model, name)
+                if self.uniques.get((cls, name, value)) is model:
+                    self.uniques.pop((cls, name, value), None)
+
+            self._unlink(cls, pkey)
+            linked.extend(self.linked_cache.pop((cls, pkey), []))
 
         # Update the linked references.
-        linked = self.linked_cache.pop((cls, pkey), [])
         for model_class, vkey, field_name in linked:
             vkeys = model_class.get_primary_keys_from_values(vkey)
             if model := self.get(model_class, **vkeys):
@@ -136,3 +258,51 @@ class Cache:
         self.models.clear()
         self.uniques.clear()
         self.linked_cache.clear()
+        self.links.clear()
+        self.policy.clear()
+        self.pinned.clear()
+        self.collected.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Return the cache statistics.
+
+        Returns:
+            stats (dict): the cache statistics, with the number of
+                    cached models (`size`), models retained by
+                    the cache policy (`retained`), pinned models (`pinned`),
+                    cache `hits` and `misses` and models evicted
+                    by the cache policy (`evictions`).
+
+        """
+        return {
+            "size": sum(len(models) for models in self.models.values()),
+            "retained": len(self.policy),
+            "pinned": len(self.pinned),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _get_key(self, model: Model) -> tuple:
+        """Return the cache key of a model."""
+        cls = type(model)
+        pkeys = model._get_pkeys()
+        return (cls.base_model, pkeys)
+
+    def _unlink(self, model_class: Type[Model], pkey: Any) -> None:
+        """Remove the links from a model that isn't cached anymore."""
+        for target in self.links.pop((model_class, pkey), ()):
+            if referrers := self.linked_cache.get(target):
+                for referrer in list(referrers):
+                    if referrer[:2] == (model_class, pkey):
+                        referrers.discard(referrer)
+
+                if not referrers:
+                    del self.linked_cache[target]
+
+    def _purge(self):
+        """Remove the links of models that were garbage-collected."""
+        while self.collected:
+            cls, base, pkeys, pkey = self.collected.pop()
+            if pkeys not in self.models.get(base, {}):
+                self._unlink(cls, pkey)
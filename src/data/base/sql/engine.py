@@ -53,16 +53,26 @@ another row on the same table.
 
 """
 
+from collections import defaultdict
 from contextlib import contextmanager
 from itertools import count
 from pathlib import Path
 import pickle
 from queue import Queue
-from typing import Any, Callable, Type, Union
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Sequence,
+    Type,
+    Union,
+)
 from warnings import warn
 
 from pydantic import Field
 from sqlalchemy import (
+    bindparam,
     create_engine,
     delete,
     func,
@@ -73,6 +83,7 @@ from sqlalchemy import (
 )
 from sqlalchemy import Column, Index, UniqueConstraint
 from sqlalchemy import ForeignKey, Integer, LargeBinary, String
+from sqlalchemy.dialects.sqlite import insert as upsert
 from sqlalchemy.sql.roles import SQLRole
 from sqlalchemy.sql.type_api import TypeEngine
 
@@ -80,35 +91,56 @@ from data.base.abc import ModelMetaclass
 from data.base.model import Model
 from data.base.sql.cache import Cache
 from data.base.sql.locator import Locator
+from data.base.sql.policy import CachePolicy
 from data.base.sql.registry import BASE, REGISTRY
 from data.base.sql.session import TalisMUDSession
-from data.base.sql.types import SQL_TYPES
+from data.base.sql.spatial import SpatialIndex
+from data.base.sql.typed import dump_value, get_typed, load_value
+from data.base.sql.types import SQL_TYPES, Typed
 from data.decorators import LazyPropertyDescriptor
 from data.handler.abc import BaseHandler
 
+# Marker of a deleted handler key.
+_DELETED = object()
+
 
 class SqliteEngine:
 
     """A data storage engine using Sqlite."""
 
+    # Maximum number of values to send in a single `IN (...)` clause.
+    max_variables = 500
+
     def __init__(self):
         self.file_name = ""
         self.tables = {}
         self.models = {}
         self.engine = None
+        self._logging = False
+        self.query_listeners = []
+        self.statements = None
         self.metadata = REGISTRY.metadata
         self.cache = Cache()
         self.locator = Locator(self)
+        self.spatial = SpatialIndex(self)
         self.session = None
         self.loading = 0
         self.transaction_counter = count(1)
         self.current_transaction = None
+        self.write_behind = True
+        self.unit_of_work = False
+        self.pending_attrs = {}
+        self.pending_keys = {}
+        self.pending_fields = {}
+        self.touched = {}
 
     def init(
         self,
         file_name: str | Path | None = None,
         memory: bool = False,
         logging: bool | Callable[[str, tuple[Any]], None] = True,
+        write_behind: bool = True,
+        cache_policy: CachePolicy | None = None,
     ) -> None:
         """Initialize the data engine.
 
@@ -125,10 +157,22 @@ class SqliteEngine:
                     the callable will be called whenever a query is
                     being sent, with two arguments: the query itself
                     as a string and the tuple of optional arguments (any type).
+                    A `QueryLog` object (see `data.base.sql.query_log`)
+                    can also be given, queries are then timed.
+                    If false, no listener is installed.
+            write_behind (bool): if True (the default), updates performed
+                    inside a transaction (`session.begin()`) are kept
+                    in memory and written in batches when the transaction
+                    is committed, or before the next read query.
+            cache_policy (CachePolicy, optional): the policy deciding
+                    which cached models to keep in memory.  By default,
+                    all cached models are kept.
 
         """
         self.file_name = file_name if not memory else None
         self.logging = logging
+        self.write_behind = write_behind
+        self.cache = Cache(cache_policy)
 
         # Connect to the database.
         if memory:
@@ -155,13 +199,7 @@ class SqliteEngine:
             dbapi_connection.create_function("pylower", 1, str.lower)
 
         # Intercept requests to log them, if set.
-        @event.listens_for(self.engine, "before_cursor_execute")
-        def log_query(conn, cr, statement, parameters, *_):
-            log = self.logging
-            log = log if callable(log) else print
-            if self.logging:
-                log(statement.strip(), parameters)
-
+        self.listen_queries()
         self.connection = self.engine.connect()
         self.tables = {}
         self.attr_tables = {}
@@ -220,6 +258,7 @@ class SqliteEngine:
                     if not model.is_base_field(field):
                         field.field_info.extra["external"] = True
 
+            model.compile_schema()
             base_model = getattr(model.__config__, "base_model", "")
             path = model.class_path
             self.models[path] = model
@@ -244,8 +283,10 @@ class SqliteEngine:
 
         self.metadata.create_all(self.engine)
 
+        # Forward references are now resolved: compile the schemas again.
         for model in names.values():
             model.update_forward_refs(**names)
+            model.compile_schema()
 
     def bind_model(self, model: Type[Model]) -> None:
         """Bind a new model, creating one or several tables.
@@ -320,12 +361,16 @@ class SqliteEngine:
                 "id": Column(Integer, primary_key=True),
                 "name": Column(String),
                 "value": Column(LargeBinary),
+                "typed": Column(Typed),
                 "model": Column(
                     pkey_column,
                     ForeignKey(f"{table.__tablename__}.{pkey_name}"),
                 ),
-                "uix_nn": UniqueConstraint("name", "model", name="uix_nn"),
-                "un_nn": Index("un_nn", "name", "model", unique=True),
+                "__table_args__": (
+                    Index(f"un_nn_{model_name}", "name", "model", unique=True),
+                    Index(f"ix_model_{model_name}", "model"),
+                    Index(f"ix_typed_{model_name}", "name", "typed"),
+                ),
             }
             nattr = type(table_name, (BASE,), fields)
             nattr.metadata = self.metadata
@@ -339,6 +384,7 @@ class SqliteEngine:
                     "id": Column(Integer, primary_key=True),
                     "name": Column(String),
                     "value": Column(LargeBinary),
+                    "typed": Column(Typed),
                     "class_path": Column(String),
                     "model": Column(
                         pkey_column,
@@ -350,6 +396,14 @@ class SqliteEngine:
                     "un_inn": Index(
                         "un_inn", "name", "value", "class_path", unique=True
                     ),
+                    "__table_args__": (
+                        Index(
+                            f"ix_ityped_{model_name}",
+                            "name",
+                            "typed",
+                            "class_path",
+                        ),
+                    ),
                 }
                 inattr = type(table_name, (BASE,), fields)
                 inattr.metadata = self.metadata
@@ -359,7 +413,118 @@ class SqliteEngine:
         """Clear all the engine's cache."""
         self.cache.clear()
         self.locator.clear()
-        LazyPropertyDescriptor.memory.clear()
+        self.spatial.clear()
+        self.touched.clear()
+        LazyPropertyDescriptor.clear()
+
+    def rollback_cache(self):
+        """Forget the models modified by a rolled back transaction.
+
+        Instead of clearing the entire cache, only the models that
+        were created, modified or refreshed during the transaction
+        are removed from the cache (they will be reloaded from the
+        database when needed).  Cached models referring to them
+        are refreshed.
+
+        """
+        touched = list(self.touched.values())
+        self.touched.clear()
+        self.locator.clear()
+        self.spatial.clear()
+        LazyPropertyDescriptor.clear()
+        self.cache.forget(touched, self.refresh_field_for)
+
+    @property
+    def logging(self) -> bool | Callable[[str, tuple[Any]], None]:
+        """Return the query log (see `init`)."""
+        return self._logging
+
+    @logging.setter
+    def logging(self, logging: bool | Callable[[str, tuple[Any]], None]):
+        """Change the query log, installing listeners if needed."""
+        self._logging = logging
+        self.listen_queries()
+
+    def listen_queries(self) -> None:
+        """Install or remove the listeners to log queries.
+
+        No listener is installed if `logging` is false.  If it's
+        a timed query log (a `QueryLog` object), queries are timed
+        and recorded after they are executed.  Otherwise, they
+        are logged before being executed.
+
+        """
+        for engine, name, listener in self.query_listeners:
+            event.remove(engine, name, listener)
+        self.query_listeners.clear()
+
+        if self.engine is None or not (log := self._logging):
+            return
+
+        if getattr(log, "timed", False):
+            listeners = (
+                ("before_cursor_execute", self._start_query),
+                ("after_cursor_execute", self._record_query),
+                ("handle_error", self._record_failed_query),
+            )
+        else:
+            listeners = (("before_cursor_execute", self._log_query),)
+
+        for name, listener in listeners:
+            event.listen(self.engine, name, listener)
+            self.query_listeners.append((self.engine, name, listener))
+
+    def _log_query(self, conn, cursor, statement, parameters, *_):
+        """Log a query before it is executed."""
+        log = self._logging
+        log = log if callable(log) else print
+        log(statement.strip(), parameters)
+
+    def _start_query(self, conn, cursor, statement, parameters, *_):
+        """Note the time at which a query starts."""
+        conn.info["query_started"] = self._logging.start()
+
+    def _record_query(self, conn, cursor, statement, parameters, *_):
+        """Record an executed query."""
+        started = conn.info.pop("query_started", None)
+        self._logging.record(statement, parameters, started)
+
+    def _record_failed_query(self, context):
+        """Record a failed query."""
+        started = None
+        if (conn := context.connection) is not None:
+            started = conn.info.pop("query_started", None)
+
+        if context.statement is not None:
+            self._logging.record(
+                context.statement, context.parameters, started, failed=True
+            )
+
+    def count_statements(self, counting: bool = True) -> None:
+        """Start or stop counting SQL statements.
+
+        While counting, `statements` is the number of statements
+        sent to the database since counting started.  When not
+        counting, `statements` is `None` and no listener is installed.
+
+        Args:
+            counting (bool): whether to count statements.
+
+        """
+        if counting and self.statements is None:
+            event.listen(
+                self.engine, "before_cursor_execute", self._count_statement
+            )
+            self.statements = 0
+        elif not counting and self.statements is not None:
+            event.remove(
+                self.engine, "before_cursor_execute", self._count_statement
+            )
+            self.statements = None
+
+    def _count_statement(self, *_):
+        """Count a statement about to be executed."""
+        self.statements += 1
 
     def log(self, message: str, arguments: list[Any] | None = None):
         """Log the message, if appropriate.
@@ -369,7 +534,8 @@ class SqliteEngine:
             arguments (list, optional): the list of arguments.
 
         """
-        if log := self.logging:
+        if log := self._logging:
+            log = log if callable(log) else print
             log(message, arguments)
 
     def get_model_column(
@@ -430,45 +596,33 @@ class SqliteEngine:
         result = self.session.execute(statement)
 
         # Iterate over primary key fields.
+        schema = model_class.schema
         values = iter(tuple(result.inserted_primary_key))
         pkey = None
         pkeys = {}
-        for field in model_class.__fields__.values():
-            is_pk = field.field_info.extra.get("primary_key", False)
-            if field.name not in kwargs and is_pk:
+        for name in schema.primary_keys:
+            if name not in kwargs:
                 value = next(values)
-                pkeys[field.name] = value
+                pkeys[name] = value
                 pkey = value
 
         # Save the model external attributes.
         if nattr:
             for key, value in kwargs.items():
-                field = model_class.__fields__[key]
-                is_pk = model_class.is_primary_key(field)
-                is_external = model_class.is_external(field)
-                if is_pk or not is_external:
+                if key not in schema.external:
                     continue
 
-                statement = insert(nattr).values(
-                    name=key,
-                    value=pickle.dumps(value),
-                    model=pkey,
-                )
-                self.session.execute(statement)
+                self._write_attr(nattr, pkey, key, value)
 
         # Save the indexed node attributes (INattr.
         if inattr:
             for key, value in kwargs.items():
-                field = model_class.__fields__[key]
-                is_pk = model_class.is_primary_key(field)
-                is_external = model_class.is_external(field)
-                is_unique = field.field_info.extra.get("unique", False)
-                if is_pk or not is_external or not is_unique:
+                if key not in schema.external or key not in schema.uniques:
                     continue
-                value = kwargs[key]
                 statement = insert(inattr).values(
                     name=key,
                     value=pickle.dumps(value),
+                    typed=get_typed(value),
                     class_path=path,
                     model=pkey,
                 )
@@ -481,20 +635,14 @@ class SqliteEngine:
         with self._load_model():
             model = model_class(**kwargs)
         self.cache.put(model)
+        if self.unit_of_work:
+            self.touched[id(model)] = model
 
         # Write the optional fields.
         if nattr:
             for key, value in model.__dict__.items():
-                field = model_class.__fields__[key]
-                is_pk = model_class.is_primary_key(field)
-                is_external = model_class.is_external(field)
-                if not is_pk and is_external and key not in kwargs:
-                    statement = insert(nattr).values(
-                        name=key,
-                        value=pickle.dumps(value),
-                        model=pkey,
-                    )
-                    self.session.execute(statement)
+                if key in schema.external and key not in kwargs:
+                    self._write_attr(nattr, pkey, key, value)
 
         self._prepare_model(model)
         return model
@@ -523,28 +671,17 @@ class SqliteEngine:
         """
         model = self.cache.get(model_class, **kwargs)
         if model is None:
+            self.flush()
             table, nattr, inattr = self._get_three_tables(model_class)
             pkeys = model_class.get_primary_keys_from_attrs(kwargs)
             keys = model_class.get_primary_keys_and_uniques_from_attrs(kwargs)
             if not pkeys and inattr:
-                statement = (
-                    select(table, nattr)
-                    .join_from(table, nattr)
-                    .join_from(table, inattr)
-                )
-
+                statement = select(table).join_from(table, inattr)
                 for name, value in kwargs.items():
                     statement = statement.where(
                         (inattr.name == name)
-                        & (inattr.value == pickle.dumps(value))
+                        & self._match_value(inattr, value)
                     )
-            elif nattr:
-                where = [
-                    getattr(table, key) == value for key, value in keys.items()
-                ]
-                statement = (
-                    select(table, nattr).join_from(table, nattr).where(*where)
-                )
             else:
                 where = [
                     getattr(table, key) == value for key, value in keys.items()
@@ -557,7 +694,8 @@ class SqliteEngine:
                 )
 
             with self._load_model():
-                rows = self.session.execute(statement).all()
+                rows = self.session.execute(statement.limit(1)).scalars()
+                rows = rows.all()
 
             if len(rows) == 0:
                 if raise_not_found:
@@ -565,43 +703,56 @@ class SqliteEngine:
 
                 return None
 
-            obj = rows[0][0]
-            if not model_class.is_first_class:
-                model_class = ModelMetaclass.get_class_from_path(
-                    obj.class_path
-                )
+            # Querying a base model (like `Node`) should still
+            # build the stored subclass (like `Room`).
+            model = self._build_models(model_class, rows)[0]
 
-            # Build and cache the object immediately.
-            # No external attributes are read at this point.
-            attrs = {
-                column.name: getattr(obj, column.name)
-                for column in obj.__table__.columns
-                if getattr(obj, column.name, None) is not None
-            }
-            attrs.pop("class_path", ...)
-            attrs = self.as_attributes(model_class, attrs)
+        return model
 
-            with self._load_model():
-                model = model_class(**attrs)
+    def get_models(
+        self, model_class: Type[Model], keys: Iterable[Any]
+    ) -> list[Model]:
+        """Return the models with this class and primary keys.
 
-            self.cache.put(model)
+        The cache is looked up first.  All models that cannot be
+        found in the cache are fetched with a single query
+        (`WHERE id IN (...)`), followed by a single query
+        for their attributes.
 
-            # Build attributes.
-            for row in rows:
-                try:
-                    attr = row[1]
-                except IndexError:
-                    pass
-                else:
-                    with self._load_model():
-                        object.__setattr__(
-                            model, attr.name, pickle.loads(attr.value)
-                        )
+        Args:
+            model_class (Model subclass): the class.
+            keys (iterable): the primary key values.
 
-            self._prepare_model(model)
-            return model
+        Returns:
+            models (list of Model): the models in the order of keys.
+                    Models that couldn't be found are not present.
 
-        return model
+        """
+        pkey_name = tuple(model_class.get_primary_keys_from_class())[0]
+        keys = list(keys)
+        found = {}
+        missing = []
+        for key in keys:
+            if (
+                model := self.cache.get(model_class, **{pkey_name: key})
+            ) is None:
+                missing.append(key)
+            else:
+                found[key] = model
+
+        if missing:
+            table, _, _ = self._get_three_tables(model_class)
+            pkey_column = getattr(table, pkey_name)
+            missing = [
+                self.as_fields(model_class, {pkey_name: key})[pkey_name]
+                for key in dict.fromkeys(missing)
+            ]
+            for i in range(0, len(missing), self.max_variables):
+                query = pkey_column.in_(missing[i : i + self.max_variables])
+                for model in self.select_models(model_class, query):
+                    found[getattr(model, pkey_name)] = model
+
+        return [found[key] for key in keys if key in found]
 
     def count_models(
         self, model_class: Type[Model], query: SQLRole | None = None
@@ -621,6 +772,7 @@ class SqliteEngine:
         class.
 
         """
+        self.flush()
         table, nattr, inattr = self._get_three_tables(model_class)
         if not model_class.is_first_class:
             additional_filter = table.class_path == model_class.class_path
@@ -659,6 +811,7 @@ class SqliteEngine:
             [...]
 
         """
+        self.flush()
         table, nattr, inattr = self._get_three_tables(model_class)
 
         if not model_class.is_first_class:
@@ -668,61 +821,78 @@ class SqliteEngine:
             else:
                 query = additional_filter
 
-        if nattr:
-            statement = select(table, nattr).join_from(table, nattr)
-        else:
-            statement = select(table)
-
+        statement = select(table)
         if query is not None:
             statement = statement.where(query)
 
         with self._load_model():
-            rows = self.session.execute(statement).all()
+            rows = self.session.execute(statement).scalars().all()
 
-        already = set()
-        models = []
-        for row in rows:
-            if path := getattr(row[0], "class_path", None):
-                model_class = ModelMetaclass.get_class_from_path(path)
+        return self._build_models(model_class, rows)
+
+    def iter_models(
+        self,
+        model_class: Type[Model],
+        query: SQLRole | None = None,
+        chunk_size: int = 500,
+        retain: bool = True,
+    ) -> Iterator[Model]:
+        """Iterate over model objects, loading them by chunk.
+
+        Rows are read in primary key order, `chunk_size` at a time,
+        using keyset pagination (`WHERE id > last ORDER BY id LIMIT n`),
+        so every chunk costs the same, however far the iteration goes.
+        The iteration has to be consumed in a single transaction.
+
+        Args:
+            model_class (subclass of Model): the model class.
+            query (query, optional): the SQL query object.
+            chunk_size (int, optional): the number of models to load
+                    at a time.
+            retain (bool, optional): whether the cache policy should
+                    retain the loaded models.  If False, models are
+                    garbage-collected once they're not referenced
+                    anymore, which keeps memory bounded.
+
+        Yields:
+            model (Model): the model objects, in primary key order.
 
-            if len(row) > 1:
-                external = row[1:]
-                row = row[0]
+        """
+        table, _, _ = self._get_three_tables(model_class)
+        if not model_class.is_first_class:
+            additional_filter = table.class_path == model_class.class_path
+            if query is not None:
+                query &= additional_filter
             else:
-                external = ()
-                row = row[0]
+                query = additional_filter
 
-            # Check whether the object is cached.
-            attrs = {
-                column.name: getattr(row, column.name)
-                for column in row.__table__.columns
-                if getattr(row, column.name, None) is not None
-            }
-            attrs.pop("class_path", False)
-            pkeys = model_class.get_primary_keys_from_attrs(attrs)
-            model = self.cache.get(model_class, **pkeys)
-            if model is None:
-                attrs = self.as_attributes(model_class, attrs)
+        pkey_name = tuple(model_class.get_primary_keys_from_class())[0]
+        pkey_column = getattr(table, pkey_name)
+        last = None
+        while True:
+            self.flush()
+            statement = select(table)
+            if query is not None:
+                statement = statement.where(query)
 
-                with self._load_model():
-                    model = model_class(**attrs)
+            if last is not None:
+                statement = statement.where(pkey_column > last)
 
-                self.cache.put(model)
+            statement = statement.order_by(pkey_column).limit(chunk_size)
+            with self._load_model():
+                rows = self.session.execute(statement).scalars().all()
 
-                # Build attributes.
-                for attr in external:
-                    with self._load_model():
-                        object.__setattr__(
-                            model, attr.name, pickle.loads(attr.value)
-                        )
+            if not rows:
+                break
 
-            self._prepare_model(model)
-            pkeys = tuple(pkeys.items())
-            if pkeys not in already:
-                models.append(model)
-                already.add(pkeys)
+            last = getattr(rows[-1], pkey_name)
+            complete = len(rows) == chunk_size
+            models = self._build_models(model_class, rows, retain=retain)
+            del rows
+            yield from models
 
-        return models
+            if not complete:
+                break
 
     def select_values(
         self, model_class: Type[Model], origin: SQLRole, query: SQLRole
@@ -737,6 +907,7 @@ class SqliteEngine:
             values (list): the results.
 
         """
+        self.flush()
         table, nattr, inattr = self._get_three_tables(model_class)
         if not model_class.is_first_class:
             additional_filter = table.class_path == model_class.class_path
@@ -758,6 +929,60 @@ class SqliteEngine:
 
         return values
 
+    def search_attributes(
+        self, model_class: Type[Model], name: str, value: Any
+    ) -> list[Any]:
+        """Return the primary keys of models with this attribute value.
+
+        The lookup uses the `(name, typed)` index of the attribute
+        table when the value can be indexed.
+
+        Args:
+            model_class (subclass of Model): the model class.
+            name (str): the attribute name.
+            value (Any): the attribute value to match.
+
+        Returns:
+            pkeys (list): the primary keys of matching models.
+
+        """
+        _, nattr, _ = self._get_three_tables(model_class)
+        query = (nattr.name == name) & self._match_value(nattr, value)
+        return self.select_values(model_class, nattr.model, query)
+
+    def get_attributes(
+        self, model_class: Type[Model], name: str, query: SQLRole | None
+    ) -> list[Any]:
+        """Return the values of an attribute, matching a query.
+
+        Args:
+            model_class (subclass of Model): the model class.
+            name (str): the attribute name.
+            query (SQLRole): the query to match.
+
+        Returns:
+            values (list): the attribute values.
+
+        """
+        self.flush()
+        table, nattr, _ = self._get_three_tables(model_class)
+        if query is None:
+            query = nattr.name == name
+        else:
+            query &= nattr.name == name
+
+        if not model_class.is_first_class:
+            query &= table.class_path == model_class.class_path
+
+        statement = (
+            select(nattr.value, nattr.typed)
+            .join_from(table, nattr)
+            .where(query)
+        )
+        with self._load_model():
+            rows = self.session.execute(statement).all()
+            return [load_value(pickled, typed) for pickled, typed in rows]
+
     def update(self, model: Model, key: str, value: Any):
         """Update the object.
 
@@ -768,6 +993,9 @@ class SqliteEngine:
 
         """
         if not self.loading:
+            if self.unit_of_work:
+                self.touched[id(model)] = model
+
             cls = type(model)
             field = cls.__fields__[key]
             info = field.field_info
@@ -776,33 +1004,30 @@ class SqliteEngine:
             is_external = cls.is_external(field)
             pkey = cls.get_primary_key_from_model(model, sanitize=True)
             if nattr and is_external:
-                statement = select(func.count(nattr.id)).where(
-                    (nattr.name == key) & (nattr.model == pkey)
-                )
-                number = self.session.execute(statement).scalar_one()
-                if number == 0:
-                    statement = insert(nattr).values(
-                        name=key, model=pkey, value=pickle.dumps(value)
-                    )
-                else:
-                    statement = (
-                        update(nattr)
-                        .where((nattr.name == key) & (nattr.model == pkey))
-                        .values(value=pickle.dumps(value))
-                    )
+                self._write_attr(nattr, pkey, key, value)
             else:
                 pkeys = self.as_fields(
                     cls, cls.get_primary_keys_from_model(model)
                 )
-                pkey_column = getattr(table, list(pkeys.keys())[0])
+                pkey_name = list(pkeys.keys())[0]
                 pkey_value = list(pkeys.values())[0]
-                attrs = self.as_fields(type(model), {key: value})
-                statement = (
-                    update(table)
-                    .where(pkey_column == pkey_value)
-                    .values(**attrs)
-                )
-            self.session.execute(statement)
+                if self.unit_of_work and self.write_behind:
+                    # Handlers are serialized only once, when flushing.
+                    if not isinstance(value, BaseHandler):
+                        value = self.as_fields(cls, {key: value})[key]
+
+                    self.pending_fields[
+                        (table, pkey_name, pkey_value, key)
+                    ] = value
+                else:
+                    attrs = self.as_fields(cls, {key: value})
+                    pkey_column = getattr(table, pkey_name)
+                    statement = (
+                        update(table)
+                        .where(pkey_column == pkey_value)
+                        .values(**attrs)
+                    )
+                    self.session.execute(statement)
 
             # Update unique indexes.
             if inattr and info.extra.get("unique", False):
@@ -813,13 +1038,43 @@ class SqliteEngine:
                         & (inattr.class_path == path)
                         & (inattr.model == pkey)
                     )
-                    .values(value=pickle.dumps(value))
+                    .values(value=pickle.dumps(value), typed=get_typed(value))
                 )
 
                 self.session.execute(statement)
 
         self.cache.put(model)
 
+    def update_key(self, model: Model, key: str, name: str, value: Any):
+        """Update a single key of a handler stored by key.
+
+        Handlers storing their data by key (their `delta` class attribute
+        is set to `True`) can save a single key instead of being
+        entirely serialized.  Each key is stored in its own row in
+        the attribute table, named `{field}.{key}`.  If the field
+        cannot be stored by key (it is not external, for instance),
+        the entire handler is saved instead.
+
+        Args:
+            model (Model): the model object.
+            key (str): the field name.
+            name (str): the key of the handler to update.
+            value (Any): the new value.
+
+        """
+        self._write_key(model, key, name, value)
+
+    def delete_key(self, model: Model, key: str, name: str):
+        """Delete a single key of a handler stored by key.
+
+        Args:
+            model (Model): the model object.
+            key (str): the field name.
+            name (str): the key of the handler to remove.
+
+        """
+        self._write_key(model, key, name, _DELETED)
+
     def delete(self, model: Model):
         """Delete the specified model.
 
@@ -835,6 +1090,30 @@ class SqliteEngine:
         pkeys = cls.get_primary_keys_from_model(model)
         pkey_column = getattr(table, list(pkeys.keys())[0])
         pkey_value = list(self.as_fields(type(model), pkeys).values())[0]
+
+        # Forget about the pending updates for this model.
+        self.pending_attrs = {
+            (attr_table, model_key, name): value
+            for (attr_table, model_key, name), value in (
+                self.pending_attrs.items()
+            )
+            if attr_table is not nattr or model_key != pkey_value
+        }
+        self.pending_keys = {
+            (attr_table, model_key, name): value
+            for (attr_table, model_key, name), value in (
+                self.pending_keys.items()
+            )
+            if attr_table is not nattr or model_key != pkey_value
+        }
+        self.pending_fields = {
+            (row_table, pkey_name, model_key, name): value
+            for (row_table, pkey_name, model_key, name), value in (
+                self.pending_fields.items()
+            )
+            if row_table is not table or model_key != pkey_value
+        }
+
         statement = delete(table).where(pkey_column == pkey_value)
         self.session.execute(statement)
 
@@ -853,32 +1132,392 @@ class SqliteEngine:
 
     def refresh_field_for(self, model: Model, key: str):
         """Refresh the model field from database."""
+        self.flush()
         cls = type(model)
         table, nattr, inattr = self._get_three_tables(cls)
-        pkey = cls.get_primary_key_from_model(model)
+        pkey = cls.get_primary_key_from_model(model, sanitize=True)
         field = cls.__fields__[key]
         is_external = cls.is_external(field)
         if is_external:
-            statement = select(nattr.value).where(
+            statement = select(nattr.value, nattr.typed).where(
                 (nattr.name == key) & (nattr.model == pkey)
             )
         else:
             column = list(cls.get_primary_keys_from_class().keys())[0]
             pkey_column = getattr(table, column)
             statement = select(getattr(table, key)).where(pkey_column == pkey)
-        self.session.execute(statement)
 
         with self._load_model():
-            values = self.session.execute(statement).one()
+            values = self.session.execute(statement).one_or_none()
             if not values:
                 return
 
         value = values[0]
         old_value = getattr(model, key, ...)
-        new_value = pickle.loads(value)
+        if is_external:
+            new_value = load_value(*values)
+        else:
+            new_value = self.as_attributes(cls, {key: value})[key]
+
         if old_value is not new_value:
             # Update the model.
             object.__setattr__(model, key, new_value)
+            if self.unit_of_work:
+                self.touched[id(model)] = model
+
+    def flush(self):
+        """Write all pending updates in the database.
+
+        In write-behind mode, updates performed inside a transaction
+        are not sent to the database right away.  They are kept in
+        memory (only the last value of a given field is remembered)
+        and written in batches: one upsert per attribute table and
+        one update per table and column.  This method is called
+        before the transaction is committed and before any query
+        reading from the database, so that reads are always up-to-date.
+
+        """
+        if self.pending_attrs or self.pending_keys:
+            pending, self.pending_attrs = self.pending_attrs, {}
+            keys, self.pending_keys = self.pending_keys, {}
+            cleared = defaultdict(list)
+            removed = defaultdict(list)
+            batches = defaultdict(list)
+            for (nattr, pkey, key), value in pending.items():
+                if getattr(value, "delta", False):
+                    cleared[nattr].append(
+                        dict(b_model=pkey, b_prefix=self._key_prefix(key))
+                    )
+                    for name, raw in value.get_raw_keys().items():
+                        batches[nattr].append(
+                            dict(
+                                name=f"{key}.{name}",
+                                model=pkey,
+                                value=raw,
+                                typed=None,
+                            )
+                        )
+                    value = (pickle.dumps(value.shell()), None)
+                elif isinstance(value, BaseHandler):
+                    value = (pickle.dumps(value), None)
+
+                value, typed = value
+                batches[nattr].append(
+                    dict(name=key, model=pkey, value=value, typed=typed)
+                )
+
+            for (nattr, pkey, name), value in keys.items():
+                if value is _DELETED:
+                    removed[nattr].append(dict(b_model=pkey, b_name=name))
+                else:
+                    batches[nattr].append(
+                        dict(name=name, model=pkey, value=value, typed=None)
+                    )
+
+            for nattr, values in cleared.items():
+                statement = (
+                    delete(nattr)
+                    .where(
+                        (nattr.model == bindparam("b_model"))
+                        & nattr.name.like(bindparam("b_prefix"), escape="/")
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                self.session.execute(statement, values)
+
+            for nattr, values in removed.items():
+                statement = (
+                    delete(nattr)
+                    .where(
+                        (nattr.model == bindparam("b_model"))
+                        & (nattr.name == bindparam("b_name"))
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                self.session.execute(statement, values)
+
+            for nattr, values in batches.items():
+                self.session.execute(self._upsert_attr(nattr), values)
+
+        if self.pending_fields:
+            pending, self.pending_fields = self.pending_fields, {}
+            batches = defaultdict(list)
+            for (table, pkey_name, pkey, key), value in pending.items():
+                if isinstance(value, BaseHandler):
+                    value = pickle.dumps(value)
+
+                batches[(table, pkey_name, key)].append(
+                    dict(b_pkey=pkey, b_value=value)
+                )
+
+            for (table, pkey_name, key), values in batches.items():
+                statement = (
+                    update(table)
+                    .where(getattr(table, pkey_name) == bindparam("b_pkey"))
+                    .values({key: bindparam("b_value")})
+                )
+                self.session.execute(statement, values)
+
+    def discard(self):
+        """Forget about all pending updates, as the transaction is aborted."""
+        self.pending_attrs.clear()
+        self.pending_keys.clear()
+        self.pending_fields.clear()
+
+    def _write_attr(self, nattr: BASE, pkey: Any, key: str, value: Any):
+        """Write or schedule the write of an external attribute.
+
+        Args:
+            nattr (BASE): the attribute table.
+            pkey (Any): the model's primary key, ready to be stored.
+            key (str): the attribute name.
+            value (Any): the attribute value.
+
+        Handlers are serialized when the pending updates are flushed,
+        so a handler modified several times in a transaction
+        is only serialized once.  Other values are serialized immediately
+        (see `data.base.sql.typed.dump_value`).
+
+        """
+        if not isinstance(value, BaseHandler):
+            value = dump_value(value)
+
+        if self.unit_of_work and self.write_behind:
+            self.pending_attrs[(nattr, pkey, key)] = value
+            for pending in [
+                pending
+                for pending in self.pending_keys
+                if pending[:2] == (nattr, pkey)
+                and pending[2].startswith(f"{key}.")
+            ]:
+                del self.pending_keys[pending]
+        else:
+            self.pending_attrs[(nattr, pkey, key)] = value
+            self.flush()
+
+    def _write_key(self, model: Model, key: str, name: str, value: Any):
+        """Write or schedule the write of a handler key."""
+        if self.loading:
+            return
+
+        cls = type(model)
+        field = cls.__fields__[key]
+        table, nattr, inattr = self._get_three_tables(cls)
+        if not nattr or not cls.is_external(field):
+            self.update(model, key, getattr(model, key))
+            return
+
+        if self.unit_of_work:
+            self.touched[id(model)] = model
+
+        pkey = cls.get_primary_key_from_model(model, sanitize=True)
+        if value is not _DELETED:
+            value = pickle.dumps(value)
+
+        self.pending_keys[(nattr, pkey, f"{key}.{name}")] = value
+        if not (self.unit_of_work and self.write_behind):
+            self.flush()
+
+    def _build_models(
+        self,
+        model_class: Type[Model],
+        rows: Sequence[BASE],
+        retain: bool = True,
+    ) -> list[Model]:
+        """Build models from rows of their table.
+
+        Models are loaded in two phases: the rows of the model table
+        have already been read.  The attribute rows of models that
+        aren't cached are then read with one query for every
+        `max_variables` models (`WHERE model IN (...)`) and grouped
+        by model.  All models are built and cached before their
+        attributes are unpickled, since attributes can refer
+        to other models of the same batch.
+
+        Args:
+            model_class (subclass of Model): the model class.  It can be
+                    a base class (like `Node`): each row stores
+                    its actual class.
+            rows (sequence): the rows of the model table.
+            retain (bool, optional): whether the cache policy should
+                    retain the models that weren't cached yet.
+
+        Returns:
+            models (list of Model): the models, in the order of rows,
+                    without duplicates.
+
+        """
+        models = []
+        missing = {}
+        for row in rows:
+            row_class = model_class
+            if path := getattr(row, "class_path", None):
+                row_class = ModelMetaclass.get_class_from_path(path)
+
+            attrs = {
+                column.name: getattr(row, column.name)
+                for column in row.__table__.columns
+                if getattr(row, column.name, None) is not None
+            }
+            attrs.pop("class_path", None)
+            pkeys = row_class.get_primary_keys_from_attrs(attrs)
+
+            # Check whether the model is cached.
+            model = self.cache.get(row_class, **pkeys)
+            if model is None:
+                pkey = next(iter(pkeys.values()))
+                if pkey not in missing:
+                    missing[pkey] = (len(models), row_class, attrs)
+                    models.append(None)
+            else:
+                models.append(model)
+
+        if missing:
+            _, nattr, _ = self._get_three_tables(model_class)
+            external = {}
+            if nattr is not None:
+                external = self._select_attributes(nattr, list(missing))
+
+            # Build and cache all models, without their attributes.
+            loaded = []
+            for pkey, (index, row_class, attrs) in missing.items():
+                attrs = self.as_attributes(row_class, attrs)
+                attributes = external.get(pkey, ())
+                with self._load_model():
+                    model = row_class.hydrate(
+                        attrs, deferred=self._get_attribute_names(attributes)
+                    )
+
+                self.cache.put(model)
+                models[index] = model
+                loaded.append((model, attributes))
+
+            # Build attributes.
+            for model, attributes in loaded:
+                self._load_attributes(model, attributes)
+
+            if not retain:
+                self.cache.release(model for model, _ in loaded)
+
+        unique = []
+        already = set()
+        for model in models:
+            if id(model) not in already:
+                already.add(id(model))
+                self._prepare_model(model)
+                unique.append(model)
+
+        return unique
+
+    def _select_attributes(
+        self, nattr: BASE, pkeys: Sequence[Any]
+    ) -> dict[Any, list[BASE]]:
+        """Read the attribute rows of several models.
+
+        Args:
+            nattr (BASE): the attribute table.
+            pkeys (sequence): the primary keys of the models.
+
+        Returns:
+            attributes (dict): the attribute rows, grouped by primary key.
+                    Rows are not ORM objects but `(model, name, value,
+                    typed)` tuples, which are much faster to build.
+
+        """
+        attributes = defaultdict(list)
+        with self._load_model():
+            for i in range(0, len(pkeys), self.max_variables):
+                chunk = pkeys[i : i + self.max_variables]
+                query = (
+                    nattr.model == chunk[0]
+                    if len(chunk) == 1
+                    else nattr.model.in_(chunk)
+                )
+                statement = select(
+                    nattr.model, nattr.name, nattr.value, nattr.typed
+                )
+                for attr in self.session.execute(statement.where(query)):
+                    attributes[attr.model].append(attr)
+
+        return attributes
+
+    @staticmethod
+    def _get_attribute_names(attrs: Iterable[BASE]) -> set[str]:
+        """Return the names of the fields stored in these attribute rows.
+
+        Handlers stored by key (rows named `{field}.{key}`) are
+        not included: they are created, then given their keys.
+
+        Args:
+            attrs (iterable): the attribute rows.
+
+        Returns:
+            names (set of str): the field names.
+
+        """
+        return {attr.name for attr in attrs if "." not in attr.name}
+
+    def _load_attributes(self, model: Model, attrs: Iterable[BASE]) -> None:
+        """Place the attributes read from the database in the model.
+
+        The model should already be cached: unpickling an attribute
+        can fetch other models referring to this one.  Rows named
+        `{field}.{key}` contain a single key of a handler stored
+        by key: they are given to the handler, still serialized.
+
+        Args:
+            model (Model): the model.
+            attrs (iterable): the attribute rows.
+
+        """
+        values = {}
+        keys = defaultdict(dict)
+        with self._load_model():
+            for attr in attrs:
+                field, sep, name = attr.name.partition(".")
+                if sep:
+                    keys[field][name] = attr.value
+                else:
+                    values[attr.name] = load_value(attr.value, attr.typed)
+
+            model.__dict__.update(values)
+            for field, raw in keys.items():
+                handler = getattr(model, field, None)
+                if getattr(handler, "delta", False):
+                    handler.restore_keys(raw)
+
+    @staticmethod
+    def _key_prefix(key: str) -> str:
+        """Return the escaped LIKE pattern to match handler keys."""
+        for char in "/%_":
+            key = key.replace(char, f"/{char}")
+
+        return f"{key}.%"
+
+    @staticmethod
+    def _match_value(attr_table: BASE, value: Any) -> SQLRole:
+        """Return the clause matching the value of an attribute row.
+
+        Values that can be indexed are compared through their typed
+        value.  Other values are compared through their pickled bytes.
+
+        """
+        if (typed := get_typed(value)) is not None:
+            return attr_table.typed == typed
+
+        return attr_table.value == pickle.dumps(value)
+
+    @staticmethod
+    def _upsert_attr(nattr: BASE) -> SQLRole:
+        """Return an insert statement updating on conflict."""
+        statement = upsert(nattr)
+        return statement.on_conflict_do_update(
+            index_elements=[nattr.name, nattr.model],
+            set_=dict(
+                value=statement.excluded.value,
+                typed=statement.excluded.typed,
+            ),
+        )
 
     @contextmanager
     def _load_model(self):
@@ -967,15 +1606,13 @@ class SqliteEngine:
             fields (dict): the field keys and values.
 
         """
+        schema = model_class.schema
         fields = {}
-        default = (..., ..., pickle.dumps, ...)
         for key, value in attributes.items():
-            field = model_class.__fields__[key]
-            if model_class.is_external(field):
+            if key in schema.external:
                 continue
 
-            _, _, convert, _ = SQL_TYPES.get(field.type_, default)
-            if convert is not ...:
+            if (convert := schema.to_store[key]) is not None:
                 value = convert(value)
             fields[key] = value
 
@@ -999,12 +1636,10 @@ class SqliteEngine:
             attributes (dict): the attribute keys and values.
 
         """
+        to_load = model_class.schema.to_load
         attributes = {}
-        default = (...,) * 3 + (pickle.loads,)
         for key, value in fields.items():
-            field = model_class.__fields__[key]
-            _, _, _, convert = SQL_TYPES.get(field.type_, default)
-            if convert is not ...:
+            if (convert := to_load[key]) is not None:
                 value = convert(value)
             attributes[key] = value
 
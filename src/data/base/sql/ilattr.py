@@ -40,6 +40,7 @@ from sqlalchemy import (
 )
 
 from data.base.sql.registry import BASE
+from data.base.sql.types import Typed
 
 
 class ILattr(BASE):
@@ -51,7 +52,9 @@ class ILattr(BASE):
     id = Column(Integer, primary_key=True)
     name = Column(String)
     value = Column(LargeBinary)
+    typed = Column(Typed)
     class_path = Column(String)
     model = Column(Integer, ForeignKey("link.id"))
     UniqueConstraint("name", "value", "class_path", name="uix_iln")
     Index("un_iln", name, value, class_path, unique=True)
+    Index("ix_iln_typed", name, typed, class_path)
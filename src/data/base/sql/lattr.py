@@ -40,6 +40,7 @@ from sqlalchemy import (
 )
 
 from data.base.sql.registry import BASE
+from data.base.sql.types import Typed
 
 
 class Lattr(BASE):
@@ -51,6 +52,9 @@ class Lattr(BASE):
     id = Column(Integer, primary_key=True)
     name = Column(String)
     value = Column(LargeBinary)
+    typed = Column(Typed)
     model = Column(Integer, ForeignKey("link.id"))
     UniqueConstraint("name", "model", name="uix_ln")
     Index("un_ln", name, model, unique=True)
+    Index("ix_ln_model", model)
+    Index("ix_ln_typed", name, typed)
@@ -29,7 +29,10 @@
 
 """Module containing the locator object."""
 
-from typing import TYPE_CHECKING
+from itertools import count
+from typing import Iterable, TYPE_CHECKING
+
+from sqlalchemy import func, select
 
 from data.base.node import Node
 from data.base.sql.node import Node as SQLNode
@@ -40,15 +43,66 @@ if TYPE_CHECKING:
 
 class Locator:
 
-    """Locator, sub-engine to keep track of node locations."""
+    """Locator, sub-engine to keep track of node locations.
+
+    The locator keeps four caches:
+        contents: for each loaded location ID, the nodes in this
+                location (as keys of a dictionary, in order).
+        next_index: for each location ID, the next index to give
+                to a node moving in this location.
+        parents: for each node ID, the ID of its location, used
+                to check that a move doesn't create a loop.
+        versions: for each location ID, the version of its contents.
+                This version changes each time a node enters or leaves
+                this location and can be used to check whether
+                a cached view of the contents is still valid.
+
+    """
 
     def __init__(self, engine: "SqliteEngine") -> None:
         self.engine = engine
         self.contents = {}
+        self.next_index = {}
+        self.parents = {}
+        self.versions = {}
+        self._counter = count(1)
+        self._base_version = 0
 
     def clear(self):
         """Clear all contents."""
         self.contents.clear()
+        self.next_index.clear()
+        self.parents.clear()
+        self.versions.clear()
+        self._base_version = next(self._counter)
+
+    def get_version(self, location_id: int | None) -> int:
+        """Return the version of this location's contents.
+
+        Versions are unique across locations and are never reused,
+        even after the cache has been cleared.  Two calls returning
+        the same version therefore mean the contents didn't change.
+
+        Args:
+            location_id (int): the location ID.
+
+        Returns:
+            version (int): the version of this location's contents.
+
+        """
+        return self.versions.get(location_id, self._base_version)
+
+    def touch(self, *location_ids: int | None) -> None:
+        """Mark the contents of these locations as changed.
+
+        Args:
+            location_ids (int): the location IDs whose contents changed.
+
+        """
+        version = next(self._counter)
+        for location_id in location_ids:
+            if location_id is not None:
+                self.versions[location_id] = version
 
     def get_at(
         self, location_id: int, filter: str | None = None
@@ -67,26 +121,54 @@ class Locator:
         The cache is used, if it exists.
 
         """
-        if nodes := self.contents.get(location_id):
-            if filter is not None:
-                return [
-                    node
-                    for node in nodes.keys()
-                    if node.location_filter == filter
-                ]
-
-            return list(nodes.keys())
-
-        nodes = self.engine.select_models(
-            Node, SQLNode.location_id == location_id
-        )
-        nodes.sort(key=lambda node: node.location_index)
-        self.contents[location_id] = {node: 1 for node in nodes}
+        if (nodes := self.contents.get(location_id)) is None:
+            self.preload((location_id,))
+            nodes = self.contents[location_id]
 
         if filter is not None:
-            nodes = [node for node in nodes if node.location_filter == filter]
+            return [node for node in nodes if node.location_filter == filter]
+
+        return list(nodes)
+
+    def preload(self, location_ids: Iterable[int]) -> None:
+        """Load the contents of several locations at once.
+
+        Locations already in the cache are not loaded again.
+
+        Args:
+            location_ids (iterable of int): the location IDs.
 
-        return nodes
+        """
+        location_ids = [
+            location_id
+            for location_id in dict.fromkeys(location_ids)
+            if location_id not in self.contents
+        ]
+        if not location_ids:
+            return
+
+        if len(location_ids) == 1:
+            query = SQLNode.location_id == location_ids[0]
+        else:
+            query = SQLNode.location_id.in_(location_ids)
+
+        nodes = self.engine.select_models(Node, query)
+        nodes.sort(key=lambda node: node.location_index)
+        contents = {location_id: {} for location_id in location_ids}
+        for node in nodes:
+            contents[node.location_id][node] = 1
+            self.parents[node.id] = node.location_id
+
+        for location_id, nodes in contents.items():
+            self.contents[location_id] = nodes
+            if location_id not in self.next_index:
+                self.next_index[location_id] = (
+                    max(
+                        (node.location_index for node in nodes),
+                        default=-1,
+                    )
+                    + 1
+                )
 
     def remove(self, node: "Node"):
         """Remove the node from any location.
@@ -97,10 +179,13 @@ class Locator:
         """
         old_location_id = node.location_id
 
-        if nodes := self.contents.get(old_location_id):
+        if (nodes := self.contents.get(old_location_id)) is not None:
             nodes.pop(node, 0)
 
+        self._move_pin(node, old_location_id, None)
         node.location_id = None
+        self.parents[node.id] = None
+        self.touch(old_location_id)
 
     def move(
         self, node: "Node", new_location_id: int, filter: str | None = None
@@ -125,9 +210,9 @@ class Locator:
 
         # First, check that the movement is allowed.
         # An object A cannot move inside B if B contains A.
-        parent = self.engine.get_model(Node, id=new_location_id)
-        while parent is not None:
-            if parent.id == node.id:
+        location_id = new_location_id
+        while location_id is not None:
+            if location_id == node.id:
                 raise ValueError(
                     f"cannot move node[{node.id}] into "
                     f"node[{new_location_id}], because "
@@ -135,24 +220,91 @@ class Locator:
                     f"node[{node.id}]"
                 )
 
-            if (parent_id := parent.location_id) is not None:
-                parent = self.engine.get_model(Node, id=parent_id)
-            else:
-                break
+            location_id = self._get_parent_id(location_id)
 
-        if nodes := self.contents.get(old_location_id):
+        if (nodes := self.contents.get(old_location_id)) is not None:
             nodes.pop(node, 0)
 
-        if nodes := self.contents.get(new_location_id):
-            node.location_index = (
-                max(n.location_index for n in nodes.keys()) + 1
-            )
+        node.location_index = self._get_next_index(new_location_id)
+        if (nodes := self.contents.get(new_location_id)) is not None:
             nodes[node] = 1
-        else:
-            node.location_index = 0
-            self.contents[new_location_id] = {node: 1}
 
+        self._move_pin(node, old_location_id, new_location_id)
         node.location_id = new_location_id
+        self.parents[node.id] = new_location_id
+        self.touch(old_location_id, new_location_id)
 
         if filter is not None:
             node.location_filter = filter
+
+    def _get_parent_id(self, node_id: int) -> int | None:
+        """Return the location ID of a node, using the cache if possible.
+
+        Args:
+            node_id (int): the node ID.
+
+        Returns:
+            location_id (int or None): the node's location ID.
+
+        """
+        try:
+            return self.parents[node_id]
+        except KeyError:
+            parent = self.engine.get_model(Node, id=node_id)
+            parent_id = self.parents[node_id] = parent.location_id
+            return parent_id
+
+    def _get_next_index(self, location_id: int) -> int:
+        """Return the next index in this location and increment it.
+
+        If the location isn't in the cache, query the greatest
+        index (this query uses the index on the node table).
+
+        Args:
+            location_id (int): the location ID.
+
+        Returns:
+            index (int): the index to use for a node moving there.
+
+        """
+        index = self.next_index.get(location_id)
+        if index is None:
+            self.engine.flush()
+            statement = select(func.max(SQLNode.location_index)).where(
+                SQLNode.location_id == location_id
+            )
+            index = self.engine.session.execute(statement).scalar_one()
+            index = 0 if index is None else index + 1
+
+        self.next_index[location_id] = index + 1
+        return index
+
+    def _move_pin(
+        self,
+        node: "Node",
+        old_location_id: int | None,
+        new_location_id: int | None,
+    ) -> None:
+        """Move the pin of a location, if the moving node is pinned.
+
+        Pinned nodes (like online characters) keep their location
+        pinned in the cache.
+
+        """
+        cache = self.engine.cache
+        if not cache.is_pinned(node):
+            return
+
+        if old_location_id is not None:
+            old_location = self.engine.get_model(
+                Node, raise_not_found=False, id=old_location_id
+            )
+            if old_location is not None:
+                cache.unpin(old_location)
+
+        if new_location_id is not None:
+            new_location = self.engine.get_model(
+                Node, raise_not_found=False, id=new_location_id
+            )
+            if new_location is not None:
+                cache.pin(new_location)
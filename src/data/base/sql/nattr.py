@@ -40,6 +40,7 @@ from sqlalchemy import (
 )
 
 from data.base.sql.registry import BASE
+from data.base.sql.types import Typed
 
 
 class Nattr(BASE):
@@ -51,6 +52,9 @@ class Nattr(BASE):
     id = Column(Integer, primary_key=True)
     name = Column(String)
     value = Column(LargeBinary)
+    typed = Column(Typed)
     model = Column(Integer, ForeignKey("node.id"))
     UniqueConstraint("name", "model", name="uix_nn")
     Index("un_nn", name, model, unique=True)
+    Index("ix_nn_model", model)
+    Index("ix_nn_typed", name, typed)
@@ -29,7 +29,14 @@
 
 """Module containing the Node database table."""
 
-from sqlalchemy import Column, ForeignKey, Integer, LargeBinary, String
+from sqlalchemy import (
+    Column,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+)
 
 from data.base.sql.registry import BASE
 
@@ -39,6 +46,9 @@ class Node(BASE):
     """Node class, to represent a node in storage."""
 
     __tablename__ = "node"
+    __table_args__ = (
+        Index("ix_node_location", "location_id", "location_index"),
+    )
 
     id = Column(Integer, primary_key=True)
     class_path = Column(String)
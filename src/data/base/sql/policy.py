@@ -0,0 +1,168 @@
+# Copyright (c) 2023, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Module containing the cache policies of the database engine.
+
+The database cache (see `data.base.sql.cache`) is an identity map:
+it only holds weak references to models, so that loading a model
+twice returns the same object, as long as this object is used somewhere.
+A cache policy decides which models should be kept in memory even
+when nobody uses them anymore.  Three policies are available:
+
+1.  `CachePolicy` (the default): all cached models are kept in memory.
+    This is the most efficient policy in terms of queries, but
+    memory will grow as the world is explored.
+2.  `LRUPolicy`: only keep the most recently-used models, up to
+    a given size.  Models that are not kept but are still referenced
+    (by a character, a room...) remain in the cache.
+3.  `WeakPolicy`: do not keep any model in memory.  Models are
+    removed from the cache as soon as they are not used anymore.
+
+Note that, regardless of the policy, pinned models (see `Cache.pin`)
+are always kept in memory.
+
+"""
+
+from collections import OrderedDict
+from typing import Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from data.base.model import Model
+
+
+class CachePolicy:
+
+    """Unbounded cache policy, keep all cached models in memory."""
+
+    def __init__(self):
+        self.retained = {}
+
+    def __len__(self):
+        return len(self.retained)
+
+    def add(self, key: Any, model: "Model") -> list["Model"]:
+        """Retain a model that has just been cached.
+
+        Args:
+            key (Any): the model's cache key.
+            model (Model): the model to retain.
+
+        Returns:
+            evicted (list of Model): the models that shouldn't be
+                    retained anymore.
+
+        """
+        self.retained[key] = model
+        return []
+
+    def access(self, key: Any) -> None:
+        """Mark the model with this key as recently accessed.
+
+        Args:
+            key (Any): the model's cache key.
+
+        """
+
+    def remove(self, key: Any) -> None:
+        """Stop retaining the model with this key.
+
+        Args:
+            key (Any): the model's cache key.
+
+        """
+        self.retained.pop(key, None)
+
+    def clear(self) -> None:
+        """Stop retaining any model."""
+        self.retained.clear()
+
+
+class LRUPolicy(CachePolicy):
+
+    """Least-recently used policy, keep a given number of models."""
+
+    def __init__(self, max_size: int = 10_000):
+        self.retained = OrderedDict()
+        self.max_size = max_size
+
+    def add(self, key: Any, model: "Model") -> list["Model"]:
+        """Retain a model that has just been cached.
+
+        Args:
+            key (Any): the model's cache key.
+            model (Model): the model to retain.
+
+        Returns:
+            evicted (list of Model): the least-recently used models
+                    that shouldn't be retained anymore.
+
+        """
+        self.retained[key] = model
+        self.retained.move_to_end(key)
+        evicted = []
+        while len(self.retained) > self.max_size:
+            _, old = self.retained.popitem(last=False)
+            evicted.append(old)
+
+        return evicted
+
+    def access(self, key: Any) -> None:
+        """Mark the model with this key as recently accessed.
+
+        Args:
+            key (Any): the model's cache key.
+
+        """
+        if key in self.retained:
+            self.retained.move_to_end(key)
+
+
+class WeakPolicy(CachePolicy):
+
+    """Weak policy, do not retain any model."""
+
+    def add(self, key: Any, model: "Model") -> list["Model"]:
+        """Do not retain the model.
+
+        Args:
+            key (Any): the model's cache key.
+            model (Model): the model to retain.
+
+        Returns:
+            evicted (list of Model): always an empty list.
+
+        """
+        return []
+
+
+POLICIES = {
+    "all": CachePolicy,
+    "lru": LRUPolicy,
+    "weak": WeakPolicy,
+}
@@ -0,0 +1,188 @@
+# Copyright (c) 2023, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Module containing the SQL query log of the database engine.
+
+Logging SQL queries is a capability of the engine: when the engine's
+`logging` attribute is false, no listener is installed at all and
+queries are sent without any overhead.  When `logging` is set
+to a `QueryLog` object, queries are timed and recorded as `Query`
+objects, which are only formatted if they are written by a handler.
+
+Three modes are available:
+
+1.  "off": queries are not logged.  `QueryLog.create` returns `None`
+    in this mode, so that no listener is installed.
+2.  "debug": all queries are logged.
+3.  "sample": one query in `sample` is logged, plus all queries
+    that take `slow` seconds or more (and queries that have failed).
+
+"""
+
+from time import perf_counter
+from typing import Any, Callable
+
+MODES = ("off", "debug", "sample")
+
+
+class Query:
+
+    """A SQL query to log, only formatted when needed."""
+
+    __slots__ = ("statement", "parameters", "duration", "failed", "slow")
+
+    def __init__(
+        self,
+        statement: str,
+        parameters: Any,
+        duration: float | None = None,
+        failed: bool = False,
+        slow: bool = False,
+    ):
+        self.statement = statement
+        self.parameters = parameters
+        self.duration = duration
+        self.failed = failed
+        self.slow = slow
+
+    def __repr__(self):
+        return f"<Query {self.statement[:40]!r}>"
+
+    def __str__(self):
+        indent = "\n" + " " * 4
+        statement = self.statement.strip().replace("\t", " " * 4)
+        statement = indent.join(statement.splitlines())
+        if self.parameters:
+            statement += f"{indent}{self.parameters}"
+
+        if self.failed:
+            statement += f"{indent}(failed)"
+        elif self.duration is not None:
+            statement += f"{indent}({self.duration * 1000:.2f} ms)"
+
+        return indent + statement
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> "Query":
+        return self
+
+
+class QueryLog:
+
+    """Record SQL queries and send them to a log function.
+
+    The engine checks the `timed` attribute to decide which listeners
+    to install: queries are timed and `record` is called after they
+    have been executed (or have failed).  Other messages (like
+    "COMMIT" or "ROLLBACK") are sent by calling the object itself.
+
+    """
+
+    timed = True
+
+    def __init__(
+        self,
+        log: Callable[[Query], None],
+        mode: str = "debug",
+        sample: int = 100,
+        slow: float = 0.1,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"invalid query log mode: {mode!r}")
+
+        self.log = log
+        self.mode = mode
+        self.sample = max(sample, 1)
+        self.slow = slow
+        self.count = 0
+
+    def __repr__(self):
+        return f"<QueryLog mode={self.mode}>"
+
+    def __call__(self, statement: str, parameters: Any = None) -> None:
+        """Log a message that isn't a query, like a transaction event."""
+        if self.mode == "debug":
+            self.log(Query(statement, parameters))
+
+    @classmethod
+    def create(
+        cls,
+        log: Callable[[Query], None],
+        mode: str = "debug",
+        sample: int = 100,
+        slow: float = 0.1,
+    ) -> "QueryLog | None":
+        """Create a query log, or return `None` if the mode is "off".
+
+        Args:
+            log (callable): the function to call with a `Query` object.
+            mode (str): the log mode ("off", "debug" or "sample").
+            sample (int): in "sample" mode, log one query in `sample`.
+            slow (float): in "sample" mode, always log queries
+                    taking `slow` seconds or more.
+
+        Returns:
+            query_log (QueryLog or None): the query log to give
+                    to the engine.
+
+        """
+        if mode == "off":
+            return None
+
+        return cls(log, mode=mode, sample=sample, slow=slow)
+
+    @staticmethod
+    def start() -> float:
+        """Return the time at which a query starts."""
+        return perf_counter()
+
+    def record(
+        self,
+        statement: str,
+        parameters: Any,
+        started: float | None,
+        failed: bool = False,
+    ) -> None:
+        """Record an executed query.
+
+        Args:
+            statement (str): the query statement.
+            parameters (any): the query parameters.
+            started (float or None): the time the query started,
+                    as returned by `start`.
+            failed (bool): whether the query has failed.
+
+        """
+        duration = None if started is None else perf_counter() - started
+        slow = duration is not None and duration >= self.slow
+        if self.mode == "sample" and not (failed or slow):
+            self.count += 1
+            if self.count % self.sample:
+                return
+
+        self.log(Query(statement, parameters, duration, failed, slow))
@@ -47,6 +47,7 @@ class TalisMUDSession(Session):
         self.talismud_engine.current_transaction = next(
             self.talismud_engine.transaction_counter
         )
+        self.talismud_engine.unit_of_work = True
         return transaction
 
 
@@ -58,12 +59,20 @@ class TalisMUDSessionTransaction(SessionTransaction):
 
     def commit(self, *args, **kwargs):
         transaction = self.talismud_engine.current_transaction
+        self.talismud_engine.flush()
         self.talismud_engine.log("COMMIT", (transaction,))
         super().commit(*args, **kwargs)
+        self.talismud_engine.unit_of_work = False
+        self.talismud_engine.touched.clear()
+        self.talismud_engine.current_transaction = None
+        logger.release(transaction)
 
     def rollback(self, *args, **kwargs):
         transaction = self.talismud_engine.current_transaction
         self.talismud_engine.log("ROLLBACK", (transaction,))
-        logger.group(transaction).log_group()
-        self.talismud_engine.clear_cache()
+        logger.release(transaction, flush=True)
+        self.talismud_engine.discard()
         super().rollback(*args, **kwargs)
+        self.talismud_engine.unit_of_work = False
+        self.talismud_engine.current_transaction = None
+        self.talismud_engine.rollback_cache()
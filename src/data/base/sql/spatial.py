@@ -0,0 +1,294 @@
+# Copyright (c) 2023, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Module containing the spatial index, to quickly find coordinates.
+
+The spatial index is a sub-engine keeping all valid coordinates
+in memory, in a uniform grid: space is divided in cubic cells
+of `cell_size` units and each cell remembers the nodes inside.
+Coordinates are loaded from the database (one query) the first
+time the index is used, then kept up to date by the coordinate
+handler (see `data.handler.coordinates`).
+
+Radius and box queries only browse the cells intersecting the
+bounding box of the query, and nearest-neighbour queries browse
+cells by growing distance, so a query doesn't depend on the total
+number of coordinates.
+
+"""
+
+from heapq import nsmallest
+from itertools import count, product
+from math import floor, sqrt
+from typing import TYPE_CHECKING
+
+from sqlalchemy import select
+
+from data.base.coordinates import Coordinates
+
+if TYPE_CHECKING:
+    from data.base.sql.engine import SqliteEngine
+
+Point = tuple[float, float, float]
+
+
+class SpatialIndex:
+
+    """Spatial index, sub-engine to keep track of coordinates."""
+
+    cell_size = 4
+
+    def __init__(self, engine: "SqliteEngine") -> None:
+        self.engine = engine
+        self.loaded = False
+        self.points = {}
+        self.cells = {}
+        self.positions = {}
+
+    def clear(self) -> None:
+        """Forget all coordinates, they will be loaded again if needed."""
+        self.loaded = False
+        self.points.clear()
+        self.cells.clear()
+        self.positions.clear()
+
+    def update(self, node_id: int, point: Point | None) -> None:
+        """Update the coordinates of a node.
+
+        Args:
+            node_id (int): the node ID.
+            point (tuple or None): the new coordinates (x, y, z),
+                    None if the coordinates aren't valid anymore.
+
+        """
+        if not self.loaded:
+            # The coordinates will be read from the database.
+            return
+
+        if (old := self.points.pop(node_id, None)) is not None:
+            self._discard(node_id, old)
+
+        if point is not None:
+            self.points[node_id] = point
+            self.cells.setdefault(self._get_cell(point), {})[node_id] = point
+            self.positions.setdefault(point, set()).add(node_id)
+
+    def at(self, point: Point) -> list[int]:
+        """Return the IDs of the nodes at these exact coordinates.
+
+        Args:
+            point (tuple): the coordinates (x, y, z).
+
+        Returns:
+            node_ids (list of int): the node IDs.
+
+        """
+        self._load()
+        return sorted(self.positions.get(point, ()))
+
+    def in_box(self, lower: Point, upper: Point) -> list[int]:
+        """Return the IDs of the nodes inside a box.
+
+        Args:
+            lower (tuple): the lower corner (x, y, z).
+            upper (tuple): the upper corner (x, y, z).
+
+        Returns:
+            node_ids (list of int): the node IDs (in no specific order).
+
+        """
+        self._load()
+        return [
+            node_id
+            for node_id, point in self._browse(lower, upper)
+            if all(low <= c <= up for low, c, up in zip(lower, point, upper))
+        ]
+
+    def around(self, center: Point, radius: float) -> list[tuple[float, int]]:
+        """Return the nodes at a maximum distance from a center.
+
+        Args:
+            center (tuple): the center (x, y, z).
+            radius (float): the maximum distance.
+
+        Returns:
+            distances (list of tuple): the list of `(distance, node_id)`
+                    tuples, sorted by distance.
+
+        """
+        self._load()
+        lower = tuple(c - radius for c in center)
+        upper = tuple(c + radius for c in center)
+        distances = []
+        for node_id, point in self._browse(lower, upper):
+            if (distance := get_distance(center, point)) <= radius:
+                distances.append((distance, node_id))
+
+        distances.sort()
+        return distances
+
+    def nearest(
+        self,
+        center: Point,
+        number: int,
+        radius: float | None = None,
+        exclude: set[int] | None = None,
+    ) -> list[tuple[float, int]]:
+        """Return the nearest nodes from a center.
+
+        Args:
+            center (tuple): the center (x, y, z).
+            number (int): the maximum number of nodes to return.
+            radius (float, optional): the maximum distance.
+            exclude (set of int, optional): the node IDs to ignore.
+
+        Returns:
+            distances (list of tuple): the list of `(distance, node_id)`
+                    tuples, sorted by distance.
+
+        """
+        self._load()
+        exclude = exclude or set()
+        if number <= 0 or not self.cells:
+            return []
+
+        size = self.cell_size
+        origin = self._get_cell(center)
+        found = []
+        for ring in count():
+            if 24 * ring * ring > len(self.cells):
+                # This ring has more cells than there are occupied cells.
+                found = []
+                for node_id, point in self.points.items():
+                    if node_id not in exclude:
+                        distance = get_distance(center, point)
+                        if radius is None or distance <= radius:
+                            found.append((distance, node_id))
+
+                break
+
+            for cell in self._get_ring(origin, ring):
+                for node_id, point in self.cells.get(cell, {}).items():
+                    if node_id not in exclude:
+                        distance = get_distance(center, point)
+                        if radius is None or distance <= radius:
+                            found.append((distance, node_id))
+
+            # Nodes in the next rings are at least this far.
+            reach = ring * size
+            if radius is not None and reach > radius:
+                break
+
+            close = [tup for tup in found if tup[0] <= reach]
+            if len(close) >= number:
+                break
+
+        return nsmallest(number, found)
+
+    def _load(self) -> None:
+        """Load all valid coordinates from the database, if needed."""
+        if self.loaded:
+            return
+
+        engine = self.engine
+        engine.flush()
+        table = Coordinates.table
+        statement = select(table.model, table.x, table.y, table.z).where(
+            table.valid.is_(True)
+        )
+        self.loaded = True
+        for node_id, x, y, z in engine.session.execute(statement):
+            self.update(node_id, (x, y, z))
+
+    def _discard(self, node_id: int, point: Point) -> None:
+        """Remove a node from its cell and position."""
+        cell = self._get_cell(point)
+        if (nodes := self.cells.get(cell)) is not None:
+            nodes.pop(node_id, None)
+            if not nodes:
+                del self.cells[cell]
+
+        if (nodes := self.positions.get(point)) is not None:
+            nodes.discard(node_id)
+            if not nodes:
+                del self.positions[point]
+
+    def _browse(self, lower: Point, upper: Point):
+        """Yield the nodes in cells intersecting this box."""
+        low = self._get_cell(lower)
+        up = self._get_cell(upper)
+        number = 1
+        for axis in range(3):
+            number *= up[axis] - low[axis] + 1
+
+        if number > len(self.cells):
+            # There are fewer occupied cells than cells in the box.
+            for cell, nodes in self.cells.items():
+                if all(low[a] <= cell[a] <= up[a] for a in range(3)):
+                    yield from nodes.items()
+        else:
+            for cell in product(*(range(low[a], up[a] + 1) for a in range(3))):
+                if (nodes := self.cells.get(cell)) is not None:
+                    yield from nodes.items()
+
+    def _get_cell(self, point: Point) -> tuple[int, int, int]:
+        """Return the cell containing these coordinates."""
+        size = self.cell_size
+        return (
+            floor(point[0] / size),
+            floor(point[1] / size),
+            floor(point[2] / size),
+        )
+
+    @staticmethod
+    def _get_ring(origin: tuple[int, int, int], ring: int):
+        """Yield the cells at exactly `ring` cells from the origin."""
+        if ring == 0:
+            yield origin
+            return
+
+        ox, oy, oz = origin
+        for dx in range(-ring, ring + 1):
+            for dy in range(-ring, ring + 1):
+                if abs(dx) == ring or abs(dy) == ring:
+                    dzs = range(-ring, ring + 1)
+                else:
+                    dzs = (-ring, ring)
+
+                for dz in dzs:
+                    yield (ox + dx, oy + dy, oz + dz)
+
+
+def get_distance(first: Point, second: Point) -> float:
+    """Return the distance between two points."""
+    return sqrt(
+        (first[0] - second[0]) ** 2
+        + (first[1] - second[1]) ** 2
+        + (first[2] - second[2]) ** 2
+    )
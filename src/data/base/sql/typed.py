@@ -0,0 +1,283 @@
+# Copyright (c) 2022, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Typed values of external attributes.
+
+External attributes are stored in attribute tables (like `nattr`).
+Each row has two value columns:
+
+- `value`: the pickled value, or NULL.
+- `typed`: a native SQLite value (integer, real, text or blob),
+  indexed with the attribute name, or NULL if the value
+  cannot be indexed.
+
+Strings, integers and floats are only stored in `typed`: they are
+not pickled at all.  Booleans, UUIDs and references to other models
+are pickled, but also get a typed value, so they can be searched
+through the index.  Other values (lists, dictionaries, handlers...)
+are only pickled.  Searching an attribute by value compares typed
+values when possible, which doesn't depend on pickle bytes.
+
+"""
+
+import io
+import pickle
+from typing import Any, Type
+from uuid import UUID
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql.expression import TableClause
+
+from data.base.abc import ModelMetaclass
+from data.base.model import fetch, Model
+
+# Values that are not pickled at all (exact types).
+NATIVE_TYPES = (str, int, float)
+
+# Range of integers SQLite can store.
+MIN_INT = -(2**63)
+MAX_INT = 2**63 - 1
+
+
+def get_typed(value: Any) -> Any:
+    """Return the typed value to store and index, or None.
+
+    Args:
+        value (Any): the attribute value.
+
+    Returns:
+        typed (int, float, str, bytes or None): the typed value.
+                Two equal values have the same typed value.
+                None is returned if this value cannot be indexed.
+
+    """
+    value_type = type(value)
+    if value_type is str:
+        return value
+    elif value_type is int or value_type is bool:
+        return int(value) if MIN_INT <= value <= MAX_INT else None
+    elif value_type is float:
+        # SQLite stores NaN as NULL.
+        return value if value == value else None
+    elif value_type is UUID:
+        return b"U" + value.bytes
+    elif isinstance(value_type, ModelMetaclass):
+        pkeys = value_type.get_primary_keys_from_model(value)
+        return get_reference(value_type, pkeys)
+
+    return None
+
+
+def get_reference(model_class: Type[Model], pkeys: dict[str, Any]) -> bytes:
+    """Return the typed value of a reference to a model.
+
+    Args:
+        model_class (subclass of Model): the model class.
+        pkeys (dict): the model's primary keys.
+
+    Returns:
+        typed (bytes): the typed value.
+
+    """
+    path = model_class.base_model.class_path
+    keys = ",".join(f"{key}={value!r}" for key, value in pkeys.items())
+    return f"M{path}:{keys}".encode()
+
+
+def dump_value(value: Any) -> tuple[bytes | None, Any]:
+    """Return the pickled and typed values to store.
+
+    Args:
+        value (Any): the attribute value.
+
+    Returns:
+        (pickled, typed) (tuple): the pickled value (None if
+                the value doesn't need to be pickled) and the typed
+                value (None if the value cannot be indexed).
+
+    """
+    typed = get_typed(value)
+    if typed is not None and type(value) in NATIVE_TYPES:
+        return None, typed
+
+    return pickle.dumps(value), typed
+
+
+def load_value(pickled: bytes | None, typed: Any) -> Any:
+    """Return the attribute value from its stored columns.
+
+    Args:
+        pickled (bytes or None): the pickled value.
+        typed (Any): the typed value.
+
+    Returns:
+        value (Any): the attribute value.
+
+    """
+    if pickled is None:
+        return typed
+
+    return pickle.loads(pickled)
+
+
+def convert_pickled(pickled: bytes) -> tuple[bytes | None, Any]:
+    """Convert a pickled value, stored before typed values existed.
+
+    Models referred to by the value aren't fetched: this conversion
+    can run before models are ready to be loaded.
+
+    Args:
+        pickled (bytes): the pickled value.
+
+    Returns:
+        (pickled, typed) (tuple): the values to store, as returned
+                by `dump_value`.  If the value cannot be unpickled,
+                it is kept as is, without a typed value.
+
+    """
+    try:
+        value = _ReferenceUnpickler(io.BytesIO(pickled)).load()
+    except Exception:
+        return pickled, None
+
+    if isinstance(value, _Reference):
+        return pickled, value.typed
+
+    typed = get_typed(value)
+    if typed is not None and type(value) in NATIVE_TYPES:
+        return None, typed
+
+    return pickled, typed
+
+
+def convert_table(
+    connection: Connection,
+    table: TableClause,
+    indexed: bool = False,
+    chunk_size: int = 500,
+) -> None:
+    """Compute the typed values of rows stored before they existed.
+
+    Rows are read and updated by chunk.  Native values (strings,
+    integers, floats) aren't pickled anymore, unless the table is
+    an indexed attribute table (whose unique index relies on
+    pickled values).  Handler keys (rows named `{field}.{key}`)
+    remain pickled.  This is used by a database migration.
+
+    Args:
+        connection (Connection): the database connection.
+        table (TableClause): the attribute table, with at least
+                `id`, `name`, `value` and `typed` columns.
+        indexed (bool, optional): whether it's an indexed attribute table.
+        chunk_size (int, optional): the number of rows to read at a time.
+
+    """
+    columns = table.c
+    statement = (
+        update(table)
+        .where(columns.id == bindparam("b_id"))
+        .values(value=bindparam("b_value"), typed=bindparam("b_typed"))
+    )
+    last = 0
+    while rows := connection.execute(
+        select(columns.id, columns.name, columns.value)
+        .where((columns.id > last) & columns.value.is_not(None))
+        .order_by(columns.id)
+        .limit(chunk_size)
+    ).all():
+        last = rows[-1].id
+        values = []
+        for row in rows:
+            if "." in row.name and not indexed:
+                continue
+
+            pickled, typed = convert_pickled(row.value)
+            if indexed:
+                pickled = row.value
+
+            values.append(dict(b_id=row.id, b_value=pickled, b_typed=typed))
+
+        if values:
+            connection.execute(statement, values)
+
+
+def revert_table(
+    connection: Connection, table: TableClause, chunk_size: int = 500
+) -> None:
+    """Pickle again the values only stored as typed values.
+
+    This is used to revert a database migration, before the typed
+    column is removed.
+
+    Args:
+        connection (Connection): the database connection.
+        table (TableClause): the attribute table, with at least
+                `id`, `value` and `typed` columns.
+        chunk_size (int, optional): the number of rows to read at a time.
+
+    """
+    columns = table.c
+    statement = (
+        update(table)
+        .where(columns.id == bindparam("b_id"))
+        .values(value=bindparam("b_value"))
+    )
+    while rows := connection.execute(
+        select(columns.id, columns.typed)
+        .where(columns.value.is_(None))
+        .limit(chunk_size)
+    ).all():
+        connection.execute(
+            statement,
+            [
+                dict(b_id=row.id, b_value=pickle.dumps(row.typed))
+                for row in rows
+            ],
+        )
+
+
+class _Reference:
+
+    """A reference to a model, read from a pickled value."""
+
+    def __init__(self, model_class: Type[Model], pkeys: dict[str, Any]):
+        self.typed = get_reference(model_class, pkeys)
+
+
+class _ReferenceUnpickler(pickle.Unpickler):
+
+    """Unpickler that doesn't fetch models."""
+
+    def find_class(self, module: str, name: str) -> Any:
+        obj = super().find_class(module, name)
+        if obj is fetch:
+            obj = _Reference
+
+        return obj
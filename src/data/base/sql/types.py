@@ -43,6 +43,7 @@ from sqlalchemy import (
     LargeBinary,
     String,
 )
+from sqlalchemy.types import UserDefinedType
 
 
 def str_or_none(value: Any | None) -> str | None:
@@ -50,6 +51,21 @@ def str_or_none(value: Any | None) -> str | None:
     return str(value) if value is not None else None
 
 
+class Typed(UserDefinedType):
+
+    """Column type holding native SQLite values without conversion.
+
+    The column is declared as `BLOB`, which doesn't convert values:
+    an integer is stored as an integer, a string as text.
+
+    """
+
+    cache_ok = True
+
+    def get_col_spec(self, **kwargs) -> str:
+        return "BLOB"
+
+
 SQL_TYPES = {
     bool: (Boolean, {}, ..., ...),
     bytes: (LargeBinary, {}, ..., ...),
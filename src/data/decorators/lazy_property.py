@@ -34,11 +34,27 @@ but it caches the data it retrieves the first time it's called
 and then will only return this cached data, unless a setter
 is called in the meantime.
 
+Cached values are stored on the instance itself (in a slot of models,
+in the instance dictionary otherwise), so they are collected with it,
+even if they refer back to the instance.
+
 """
 
+from typing import Any
+
+# Name of the instance attribute holding cached values.
+LAZY_ATTRIBUTE = "_lazy_values"
+
 _MISSING = object()
 
 
+class _LazyValues(dict):
+
+    """The cached values of an instance, with their generation."""
+
+    __slots__ = ("generation",)
+
+
 class LazyPropertyDescriptor:
 
     """Delays loading of property until first access.
@@ -68,37 +84,34 @@ class LazyPropertyDescriptor:
     Once initialized, the `AttributeHandler` will be available as a
     property "db" on the object.
 
+    Cached values can be forgotten explicitly, so the getter
+    is called again on the next access:
+
+        ```python
+        SomeTest.db.invalidate(obj)  # Forget `obj.db` only
+        LazyPropertyDescriptor.clear(obj)  # Forget all lazy values of `obj`
+        LazyPropertyDescriptor.clear()  # Forget all lazy values
+        ```
+
     """
 
-    memory = {}
+    # Values cached before the last global `clear` are outdated.
+    generation = 0
 
     def __init__(self, fget, fset=None):
         self.fget = fget
         self.fset = fset
+        self.name = fget.__name__
 
     def __get__(self, instance, owner=None):
         if instance is None:
             return self
 
-        # The value might be cached in `memory`
-        attr = self.fget.__name__
-        try:
-            identifier = hash((instance, attr))
-        except TypeError:
-            identifier = None
-            cached_attr = f"_cached_{attr}"
-
-        if identifier is not None:
-            value = self.memory.get(identifier, _MISSING)
-        else:
-            value = getattr(instance, cached_attr, _MISSING)
-
+        values = self._get_values(instance)
+        value = values.get(self.name, _MISSING)
         if value is _MISSING:
             value = self.fget(instance)
-            if identifier is not None:
-                self.memory[identifier] = value
-            else:
-                setattr(instance, cached_attr, value)
+            values[self.name] = value
 
         return value
 
@@ -106,24 +119,70 @@ class LazyPropertyDescriptor:
         if not self.fset:
             raise AttributeError("can't set attribute")
 
-        attr = self.fget.__name__
-        try:
-            identifier = hash((instance, attr))
-        except TypeError:
-            identifier = None
-            cached_attr = f"_cached_{attr}"
-
         self.fset(instance, value)
-
-        if identifier is not None:
-            self.memory[identifier] = value
-        else:
-            setattr(instance, cached_attr, value)
+        self._get_values(instance)[self.name] = value
 
     def setter(self, func):
         self.fset = func
         return self
 
+    def invalidate(self, instance: Any) -> None:
+        """Forget the cached value of this property for an instance.
+
+        The getter will be called again on next access.
+
+        Args:
+            instance (Any): the instance whose value should be forgotten.
+
+        """
+        self._get_values(instance).pop(self.name, None)
+
+    @classmethod
+    def clear(cls, instance: Any = None) -> None:
+        """Forget cached values.
+
+        Args:
+            instance (Any, optional): the instance whose values should
+                    be forgotten.  If not set, forget the lazy values
+                    of all instances.
+
+        """
+        if instance is None:
+            cls.generation += 1
+        else:
+            cls._get_values(instance).clear()
+
+    @classmethod
+    def _get_values(cls, instance: Any) -> dict[str, Any]:
+        """Return the dictionary of cached values for this instance.
+
+        The dictionary is created if it doesn't exist, or replaced
+        if it was created before the last global `clear`.  Classes
+        (when the lazy property is defined on a metaclass) store
+        their own values, not inherited by subclasses.
+
+        Args:
+            instance (Any): the instance.
+
+        Returns:
+            values (dict): the cached values of this instance.
+
+        """
+        if isinstance(instance, type):
+            values = instance.__dict__.get(LAZY_ATTRIBUTE)
+        else:
+            values = getattr(instance, LAZY_ATTRIBUTE, None)
+
+        if values is None or values.generation != cls.generation:
+            values = _LazyValues()
+            values.generation = cls.generation
+            if isinstance(instance, type):
+                type.__setattr__(instance, LAZY_ATTRIBUTE, values)
+            else:
+                object.__setattr__(instance, LAZY_ATTRIBUTE, values)
+
+        return values
+
 
 def lazy_property(func):
     return LazyPropertyDescriptor(func)
@@ -31,16 +31,21 @@
 
 from typing import Any
 
+from data.decorators.lazy_property import LAZY_ATTRIBUTE
+
 
 class BaseHandler:
 
     """Base class for all handlers."""
 
+    # Handlers storing their data by key (see `NamespaceHandler`).
+    delta = False
+
     def __getstate__(self):
         return {
             key: value
             for key, value in self.__dict__.items()
-            if key.startswith("_")
+            if key.startswith("_") and key != LAZY_ATTRIBUTE
         }
 
     def __setstate__(self, attrs):
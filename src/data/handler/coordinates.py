@@ -32,8 +32,6 @@
 from math import sqrt
 from typing import Type
 
-from sqlalchemy import func
-
 from data.base.coordinates import Coordinates, closure
 from data.base.node import Node
 from data.direction import Direction
@@ -156,17 +154,7 @@ class CoordinateHandler(BaseHandler):
 
         """
         self._fetch_coordinates()
-        table = Coordinates.table
-        query = (
-            table.valid.is_(True)
-            & (table.x == x)
-            & (table.y == y)
-            & (table.z == z)
-        )
-
-        at = Coordinates.engine.select_values(
-            Coordinates, Coordinates.table.model, query
-        )
+        at = Coordinates.engine.spatial.at((x, y, z))
 
         model, _ = self.model
         model = type(model)
@@ -229,16 +217,6 @@ class CoordinateHandler(BaseHandler):
         if any(c is None for c in (x, y, z)):
             x, y, z = self.x, self.y, self.z
 
-        table = Coordinates.table
-        query = table.valid.is_(True) & (
-            func.sqrt(
-                func.pow((table.x - x), 2)
-                + func.pow((table.y - y), 2)
-                + func.pow((table.z - z), 2)
-            )
-            <= radius
-        )
-
         if only is ...:
             model = type(self.model[0])
         elif only is None:
@@ -246,28 +224,102 @@ class CoordinateHandler(BaseHandler):
         else:
             model = only
 
-        close = Coordinates.engine.select_values(
-            Coordinates, Coordinates.table.model, query
-        )
+        close = Coordinates.engine.spatial.around((x, y, z), radius)
+        return self._get_nodes(close, model, exclude)
 
-        # Remove nodes to exclude.
-        if exclude is ...:
-            exclude, _ = self.model
-            close.remove(exclude.id)
-        elif isinstance(exclude, Node):
-            close.remove(exclude.id)
+    def nearest(
+        self,
+        number: int,
+        radius: int | float | None = None,
+        x: int | float | None = None,
+        y: int | float | None = None,
+        z: int | float | None = None,
+        only: Type[Node] | None = ...,
+        exclude: Node | list[Node] | None = ...,
+    ) -> list[tuple[float, Node]]:
+        """Return the nearest node objects with coordinates.
+
+        Args:
+            number (int): the maximum number of nodes to return.
+            radius (int or float, optional): the maximum distance.
+            x (int or float, optional): the overridden X coordinate.
+            y (int or float, optional): the overridden Y coordinate.
+            z (int or float, optional): the overridden Z coordinate.
+            only (subclass of Node): only return nodes of this subclass.
+                    By default, return only the nodes of the parent model.
+            exclude (Node or list of nodes): the node(s) to exclude.
+                    If unset, exclude the model calling
+                    `coordinates.nearest`.
+
+        Returns:
+            distances (list of tuple): the distances ordered by distance,
+                    as returned by `around`.
+
+        """
+        self._fetch_coordinates()
+        if any(c is None for c in (x, y, z)):
+            x, y, z = self.x, self.y, self.z
+
+        if only is ...:
+            model = type(self.model[0])
+        elif only is None:
+            model = Node
         else:
-            for node in exclude:
-                close.remove(node.id)
+            model = only
+
+        # Nodes of other classes might be closer, keep looking.
+        spatial = Coordinates.engine.spatial
+        excluded = self._get_excluded(exclude)
+        distances = []
+        while len(distances) < number:
+            close = spatial.nearest(
+                (x, y, z),
+                number - len(distances),
+                radius=radius,
+                exclude=excluded,
+            )
+            if not close:
+                break
 
-        # Fetch the nodes with these IDs.
-        nodes = model.select(model.table.id.in_(close))
+            excluded.update(node_id for _, node_id in close)
+            distances += self._get_nodes(close, model, ())
 
-        # Sort by distances.
-        distances = [(self.distance(node), node) for node in nodes]
-        distances.sort(key=lambda tup: tup[0])
         return distances
 
+    def in_box(
+        self,
+        lower: tuple[int | float, int | float, int | float],
+        upper: tuple[int | float, int | float, int | float],
+        only: Type[Node] | None = ...,
+    ) -> list[Node]:
+        """Return the node objects with coordinates inside a box.
+
+        Args:
+            lower (tuple): the lower corner of the box (x, y, z).
+            upper (tuple): the upper corner of the box (x, y, z).
+            only (subclass of Node): only return nodes of this subclass.
+                    By default, return only the nodes of the parent model.
+
+        Returns:
+            nodes (list of Node): the nodes inside the box (limits
+                    included), in no specific order.
+
+        """
+        if only is ...:
+            model = type(self.model[0])
+        elif only is None:
+            model = Node
+        else:
+            model = only
+
+        node_ids = Coordinates.engine.spatial.in_box(lower, upper)
+        return [
+            node
+            for _, node in self._get_nodes(
+                [(0, node_id) for node_id in node_ids], model, ()
+            )
+        ]
+
     def distance(
         self, coordinates: Node | tuple[int | float, int | float, int | float]
     ) -> int | float:
@@ -378,6 +430,11 @@ class CoordinateHandler(BaseHandler):
                 row.valid = self._valid
 
             self._has_valid = self._valid
+            model, _ = self.model
+            Coordinates.engine.spatial.update(
+                model.id,
+                (row.x, row.y, row.z) if self._valid else None,
+            )
 
     def from_blueprint(self, coordinates: dict[str, int | float]) -> None:
         """Recover the description from a blueprint."""
@@ -385,6 +442,56 @@ class CoordinateHandler(BaseHandler):
             case {"x": x, "y": y, "z": z}:
                 self.update(x, y, z)
 
+    def _get_excluded(self, exclude: Node | list[Node] | None) -> set[int]:
+        """Return the IDs of the nodes to exclude."""
+        if exclude is ...:
+            model, _ = self.model
+            return {model.id}
+        elif exclude is None:
+            return set()
+        elif isinstance(exclude, Node):
+            return {exclude.id}
+
+        return {node.id for node in exclude}
+
+    def _get_nodes(
+        self,
+        distances: list[tuple[float, int]],
+        model: Type[Node],
+        exclude: Node | list[Node] | None,
+    ) -> list[tuple[float, Node]]:
+        """Fetch the nodes from their IDs.
+
+        Args:
+            distances (list of tuple): the `(distance, node_id)` tuples.
+            model (subclass of Node): the node class to return.
+            exclude (Node or list of nodes): the node(s) to exclude.
+
+        Returns:
+            distances (list of tuple): the `(distance, node)` tuples.
+
+        """
+        excluded = self._get_excluded(exclude)
+        distances = [
+            (round(distance, PRECISION), node_id)
+            for distance, node_id in distances
+            if node_id not in excluded
+        ]
+        nodes = Coordinates.engine.get_models(
+            model, [node_id for _, node_id in distances]
+        )
+
+        # Only keep nodes of this class, like `model.select` would.
+        if not model.is_first_class:
+            nodes = [node for node in nodes if type(node) is model]
+
+        nodes = {node.id: node for node in nodes}
+        return [
+            (distance, nodes[node_id])
+            for distance, node_id in distances
+            if node_id in nodes
+        ]
+
     def _fetch_coordinates(self):
         """Fetch the object coordinates."""
         if self._row is None:
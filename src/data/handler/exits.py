@@ -33,6 +33,7 @@ from typing import Any, Optional, Type, TYPE_CHECKING
 
 from command.special.exit import ExitCommand
 from data.base.blueprint import logger
+from data.base.node import Node
 from data.decorators import lazy_property
 from data.direction import Direction
 from data.exit import Exit
@@ -50,6 +51,16 @@ class ExitHandler(BaseHandler):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._exits = None
+        self._destinations = None
+
+    def __getstate__(self):
+        attrs = super().__getstate__()
+        attrs.pop("_destinations", None)
+        return attrs
+
+    def __setstate__(self, attrs):
+        super().__setstate__(attrs)
+        self._destinations = None
 
     def __iter__(self):
         self.load_exits()
@@ -162,6 +173,7 @@ class ExitHandler(BaseHandler):
             aliases=aliases or (),
         )
         self._exits[direction] = exit
+        self._destinations.append(destination)
         self.commands = self._refresh_commands()
         self.save()
 
@@ -176,7 +188,7 @@ class ExitHandler(BaseHandler):
         return exit
 
     def load_exits(self):
-        """Load, if necessary, this room's exit."""
+        """Load, if necessary, this room's exits and their destinations."""
         if self._exits is None:
             room, _ = self.model
             query = (Exit.table.origin_id == room.id) & (
@@ -185,6 +197,18 @@ class ExitHandler(BaseHandler):
             exits = Exit.select(query)
             self._exits = {exit.direction: exit for exit in exits}
 
+        if self._destinations is None:
+            # Load all destinations at once.  They are kept referenced
+            # here, so the cache policy can't forget them before
+            # `Exit.destination` looks them up.
+            self._destinations = Node.get_many(
+                [
+                    exit.destination_id
+                    for exit in self._exits.values()
+                    if exit.destination_id is not None
+                ]
+            )
+
     def from_blueprint(self, exits: Any) -> None:
         """Create exits from a blueprint."""
         room_cls = type(self.model[0])
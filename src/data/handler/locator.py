@@ -59,12 +59,12 @@ class LocationHandler(BaseHandler):
         non_stackables = self.contents
         result = [(node, 1, node.location_filter) for node in non_stackables]
 
+        stackables = type(model).base_model.get_many(
+            [node_id for node_id, _ in self._stackables.keys()]
+        )
+        stackables = {stackable.id: stackable for stackable in stackables}
         for ((node_id, filter), quantity) in self._stackables.items():
-            stackable = type(model).engine.get_model(
-                type(model), raise_not_found=False, id=node_id
-            )
-
-            if stackable is not None:
+            if (stackable := stackables.get(node_id)) is not None:
                 result.append((stackable, quantity, filter))
 
         return result
@@ -176,6 +176,7 @@ class LocationHandler(BaseHandler):
             if quantity > 0:
                 self._stackables[(content.id, new_filter)] += quantity
                 self.save()
+                type(model).engine.locator.touch(model.id)
         else:
             type(model).engine.locator.move(
                 content, model.id, filter=new_filter
@@ -196,8 +197,10 @@ class LocationHandler(BaseHandler):
 
         """
         if self.is_stackable(content):
+            model, _ = self.model
             self._stackables[(content.id, filter)] += quantity
             self.save()
+            type(model).engine.locator.touch(model.id)
         else:
             raise ValueError(f"the node[{content.id}] isn't stackable")
 
@@ -224,7 +227,9 @@ class LocationHandler(BaseHandler):
             else:
                 self._stackables[(content.id, filter)] = current - quantity
 
+            model, _ = self.model
             self.save()
+            type(model).engine.locator.touch(model.id)
         else:
             quantity = 0
 
@@ -29,6 +29,7 @@
 
 """Namespace handler to store flexible data."""
 
+import pickle
 from typing import Any
 
 from data.handler.abc import BaseHandler
@@ -38,16 +39,44 @@ _NOT_SET = object()
 
 class NamespaceHandler(BaseHandler):
 
-    """A namespace, holding attribute-like flexible data."""
+    """A namespace, holding attribute-like flexible data.
+
+    When stored in an external field, each (string) key of the namespace
+    is stored in its own row, so modifying a key doesn't require
+    to save the entire namespace.  Keys read from the database
+    are only deserialized when they are first accessed.
+
+    """
+
+    delta = True
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._data = {}
+        self._raw = {}
+        self._compact = False
+
+    def __getstate__(self):
+        return {
+            "_data": self._data,
+            "_raw": self._raw,
+            "_by_key": getattr(self, "_by_key", False),
+        }
+
+    def __setstate__(self, attrs):
+        by_key = attrs.get("_by_key", False)
+        self._data = attrs.get("_data", {})
+        self._raw = attrs.get("_raw", {})
+
+        # A namespace saved entirely (before keys were stored separately)
+        # has to be saved entirely once more, to store its keys.
+        self._compact = bool(self._data) and not by_key
 
     def __getattr__(self, key):
         if key == "model" or key.startswith("_"):
             return object.__getattr__(self, key)
 
+        self._load(key)
         value = self._data[key]
         return value
 
@@ -55,75 +84,173 @@ class NamespaceHandler(BaseHandler):
         if key == "model" or key.startswith("_"):
             super().__setattr__(key, value)
         else:
+            self._raw.pop(key, None)
             self._data[key] = value
-            self.save()
+            self._save_key(key)
 
     def __delattr__(self, key):
-        if key in ("model", "_data"):
+        if key in ("model", "_data", "_raw"):
             object.__delattr__(self, key)
         else:
+            self._load(key)
             del self._data[key]
-            self.save()
+            self._save_key(key)
 
     def __contains__(self, element: Any) -> bool:
-        return element in self._data
+        return element in self._data or element in self._raw
 
     def __repr__(self):
+        self._load_all()
         return repr(self._data)
 
     def __str__(self):
+        self._load_all()
         return str(self._data)
 
     def __getitem__(self, key):
+        self._load(key)
         value = self._data[key]
         return value
 
     def __setitem__(self, key, value):
+        self._raw.pop(key, None)
         self._data[key] = value
-        self.save()
+        self._save_key(key)
 
     def __delitem__(self, key):
+        self._load(key)
         del self._data[key]
-        self.save()
+        self._save_key(key)
 
     def clear(self):
-        if self._data:
+        if self._data or self._raw:
             self._data.clear()
+            self._raw.clear()
             self.save()
 
     def get(self, key: str, value: Any = _NOT_SET):
+        self._load(key)
         if value is _NOT_SET:
             return self._data.get(key)
 
         return self._data.get(key, value)
 
     def items(self):
+        self._load_all()
         return self._data.items()
 
     def keys(self):
-        return self._data.keys()
+        return dict.fromkeys([*self._data, *self._raw]).keys()
 
     def pop(self, key: str, default: any = _NOT_SET):
+        self._load(key)
+        present = key in self._data
         if default is _NOT_SET:
             value = self._data.pop(key)
         else:
             value = self._data.pop(key, default)
-        self.save()
+
+        if present:
+            self._save_key(key)
+
         return value
 
     def popitem(self):
+        self._load_all()
         pair = self._data.popitem()
-        self.save()
+        self._save_key(pair[0])
         return pair
 
     def setdefault(self, key, default=None):
-        value = self._data.setdefault(key, default)
-        self.save()
-        return value
+        self._load(key)
+        if key in self._data:
+            return self._data[key]
+
+        self._data[key] = default
+        self._save_key(key)
+        return default
 
     def update(self, *args, **kwargs):
-        self._data.update(*args, **kwargs)
-        self.save()
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
 
     def values(self):
+        self._load_all()
         return self._data.values()
+
+    def shell(self) -> "NamespaceHandler":
+        """Return a copy of this namespace without the keys stored by row.
+
+        This copy is serialized to store the namespace, while string keys
+        are stored separately (see `get_raw_keys`).
+
+        """
+        shell = type(self).__new__(type(self))
+        shell.__setstate__(
+            {
+                "_data": {
+                    key: value
+                    for key, value in self._data.items()
+                    if not isinstance(key, str)
+                },
+                "_by_key": True,
+            }
+        )
+        shell._by_key = True
+        return shell
+
+    def get_raw_keys(self) -> dict[str, bytes]:
+        """Return the serialized keys to store separately.
+
+        Returns:
+            keys (dict): the serialized keys, with key names as keys
+                    and serialized values as values.
+
+        """
+        keys = {
+            key: pickle.dumps(value)
+            for key, value in self._data.items()
+            if isinstance(key, str)
+        }
+        keys.update(self._raw)
+        return keys
+
+    def restore_keys(self, keys: dict[str, bytes]) -> None:
+        """Restore the keys read from the database, still serialized.
+
+        Args:
+            keys (dict): the serialized keys.
+
+        """
+        for key in keys:
+            self._data.pop(key, None)
+
+        self._raw.update(keys)
+
+    def _load(self, key: Any) -> None:
+        """Deserialize a key, if needed."""
+        if (raw := self._raw.pop(key, None)) is not None:
+            self._data[key] = pickle.loads(raw)
+
+    def _load_all(self) -> None:
+        """Deserialize all keys."""
+        for key in tuple(self._raw):
+            self._load(key)
+
+    def _save_key(self, key: Any) -> None:
+        """Save a single key, if possible, or the entire namespace."""
+        model, attr = getattr(self, "model", (None, None))
+        if model is None or attr is None:
+            return
+
+        field = type(model).__fields__[attr]
+        if not field.field_info.extra.get("savable", True):
+            return
+
+        if self._compact or not isinstance(key, str):
+            self._compact = False
+            self.save()
+        elif key in self._data:
+            type(model).engine.update_key(model, attr, key, self._data[key])
+        else:
+            type(model).engine.delete_key(model, attr, key)
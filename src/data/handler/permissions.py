@@ -44,6 +44,17 @@ class PermissionHandler(BaseHandler):
         super().__init__(*args, **kwargs)
         self._permissions = set()
 
+    @property
+    def frozen(self) -> frozenset[str]:
+        """Return the permissions as a frozen (hashable) set.
+
+        This set is used as a key to cache permission-dependent data,
+        like the commands a character can run.  Since it reflects the
+        current permissions, changing them will also change the key.
+
+        """
+        return frozenset(self._permissions)
+
     def add(self, permission: str):
         """Add permissions.
 
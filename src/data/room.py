@@ -137,8 +137,6 @@ class Room(Node):
             barcode (str): the new (unique) barcode.
 
         """
-        barcodes = cls.get_attributes("barcode")
-
         try:
             prefix, suffix = barcode.rsplit(":", 1)
         except ValueError:
@@ -149,7 +147,11 @@ class Room(Node):
 
         i = 1
         prefix = f"{prefix}:" if prefix else ""
-        while (barcode := f"{prefix}{suffix}{i}") in barcodes:
+        # Look up candidates one by one (barcodes are indexed), rather
+        # than loading every barcode.
+        while cls.get_or_none(barcode=f"{prefix}{suffix}{i}") is not None:
             i += 1
 
+        barcode = f"{prefix}{suffix}{i}"
+
         return barcode
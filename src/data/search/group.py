@@ -32,14 +32,16 @@
 A character will use a group to display what she can see, and also what
 she can do.  A group links a character with a container and builds
 on the objects contained within this container to group them by name.
-Each time a character undergoes a change of perception (that would
-affect what she can see), the group should be cleared.  Groups aren't stored.
+Groups aren't stored, but they are cached in memory: a cached group
+remembers the version of each container's contents and is rebuilt
+when one of them changes.  Cached groups are discarded when a field used
+to name one of their nodes is modified (see `data.base.node.NAME_FIELDS`).
 Groups can be merged (this is particularly useful to handle manipulation
 in several containers).
 
 """
 
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from typing import Type, TYPE_CHECKING
 
 from parse import compile
@@ -75,9 +77,23 @@ class Group:
     or plural form will be used).  Nodes have a different way
     to handle grouping (see `Group.`).
 
+    Cached groups are kept in a LRU cache of `CACHE_SIZE` groups,
+    keyed by the IDs of the character and nodes.  A cached group
+    still references its character, nodes and their contents, so
+    these models are kept in memory as long as the group is cached.
+    Each group remembers the version of its containers' contents
+    (see `Locator.get_version`) and is discarded as soon as a node
+    enters or leaves one of them, or when one of the nodes used
+    to name its contents is renamed.  The parts of names used
+    for matching are cached independently of characters, since
+    many characters see the same names.
+
     """
 
-    CACHED = {}
+    CACHED = OrderedDict()
+    CACHE_SIZE = 1_000
+    MATCHES = OrderedDict()
+    MATCHES_SIZE = 4_096
 
     def __init__(
         self,
@@ -88,6 +104,11 @@ class Group:
         self.character = character
         self.nodes = nodes
         if contents is None:
+            if len(nodes) > 1:
+                type(nodes[0]).engine.locator.preload(
+                    node.id for node in nodes
+                )
+
             self.contents = sum(
                 [node.locator.all_contents for node in nodes], []
             )
@@ -99,6 +120,8 @@ class Group:
         self.names = defaultdict(list)
         self.matches = []
         self.pluralized = []
+        self.named_ids = set()
+        self.versions = self.get_versions(nodes)
 
     def group_by_name(self):
         """Group the nodes by name.
@@ -106,7 +129,12 @@ class Group:
         Not all nodes have singular and plural names.  These are kept unique.
 
         """
+        named_ids = self.named_ids
         for node, quantity, filter in self.contents:
+            named_ids.add(node.id)
+            if (prototype := getattr(node, "prototype", None)) is not None:
+                named_ids.add(prototype.id)
+
             name = getattr(node, "name", None)
             if method := getattr(node, "get_name_for", None):
                 name = method(self.character, 1)
@@ -120,7 +148,7 @@ class Group:
         self.matches = {
             match: tups
             for name, tups in self.pluralized
-            for match in self._get_matches(name)
+            for match in self._get_cached_matches(name)
         }
 
     def pluralize(
@@ -350,6 +378,86 @@ class Group:
 
         return parts
 
+    def _get_cached_matches(self, name: str) -> frozenset[str]:
+        """Return the parts of this name, using the shared cache.
+
+        The parts of a name only depend on the name itself (and
+        the group class, which could prepare names differently),
+        not on the character, so they are shared among groups.
+
+        Args:
+            name (str): the full name.
+
+        Returns:
+            parts (frozenset of str): the parts.
+
+        """
+        key = (type(self), name)
+        cache = Group.MATCHES
+        if (parts := cache.get(key)) is not None:
+            cache.move_to_end(key)
+        else:
+            parts = frozenset(self._get_matches(name))
+            cache[key] = parts
+            while len(cache) > Group.MATCHES_SIZE:
+                cache.popitem(last=False)
+
+        return parts
+
+    @staticmethod
+    def get_versions(nodes: tuple[Node, ...]) -> tuple[int, ...]:
+        """Return the versions of the contents of these nodes.
+
+        Args:
+            nodes (tuple of Node): the containers.
+
+        Returns:
+            versions (tuple of int): the version of each container.
+
+        """
+        if not nodes:
+            return ()
+
+        locator = type(nodes[0]).engine.locator
+        return tuple(locator.get_version(node.id) for node in nodes)
+
+    @classmethod
+    def clear(cls, character: "Character | None" = None) -> None:
+        """Clear the cached groups.
+
+        Args:
+            character (Character, optional): only clear the groups
+                    of this character.  If not set, clear all groups.
+
+        """
+        if character is None:
+            Group.CACHED.clear()
+        else:
+            char_id = character.id
+            for key in [key for key in Group.CACHED if key[0] == char_id]:
+                del Group.CACHED[key]
+
+    @classmethod
+    def discard(cls, node: Node) -> None:
+        """Discard the cached groups using this node to name contents.
+
+        Nodes call this method when one of the fields used to name
+        them is modified (see `data.base.node.NAME_FIELDS`).  Groups
+        containing this node are discarded, as well as groups
+        containing objects built on this node (if it's a prototype).
+
+        Args:
+            node (Node): the renamed node.
+
+        """
+        node_id = node.id
+        for key in [
+            key
+            for key, group in Group.CACHED.items()
+            if node_id in group.named_ids
+        ]:
+            del Group.CACHED[key]
+
     @classmethod
     def get_for(
         cls,
@@ -384,20 +492,34 @@ class Group:
             This is due to the fact that groups can be used for matches,
             and the order of nodes matter a lot for matches.
 
+        Note:
+            A cached group is only returned if the contents of its
+            nodes didn't change since it was built.  Otherwise,
+            the group is built again and replaces the cached one.
+
         Returns:
             group (Group): a cached or new group.
 
         """
         group = None
+        key = (character.id, tuple(node.id for node in nodes))
         if contents is None:
-            group = Group.CACHED.get((character, nodes))
+            group = Group.CACHED.get(key)
+            if group is not None:
+                if group.versions == Group.get_versions(nodes):
+                    Group.CACHED.move_to_end(key)
+                else:
+                    group = None
 
         if group is None:
             group = Group(character, *nodes, contents=contents)
             group.group_by_name()
 
             if contents is None:
-                Group.CACHED[(character, nodes)] = group
+                Group.CACHED[key] = group
+                Group.CACHED.move_to_end(key)
+                while len(Group.CACHED) > Group.CACHE_SIZE:
+                    Group.CACHED.popitem(last=False)
 
         return group
 
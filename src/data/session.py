@@ -110,6 +110,9 @@ class Session(Model):
         """Login to a character."""
         self.character = character
         character.session = self
+        cache = type(self).engine.cache
+        cache.pin(self)
+        cache.pin(character)
 
         # Browse contexts in context stack.
         for context in character.contexts:
@@ -142,3 +145,6 @@ class Session(Model):
         """Prepare the session for logout."""
         if character := self.character:
             (character.room, character.location) = (character.location, None)
+            cache = type(self).engine.cache
+            cache.unpin(character)
+            cache.unpin(self)
@@ -0,0 +1,44 @@
+"""add_model_index_to_attr_tables
+
+Revision ID: 3e9f41c7d2a8
+Revises: 5b7e2d9c4f13
+Create Date: 2026-10-17 16:05:23.718406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3e9f41c7d2a8"
+down_revision = "5b7e2d9c4f13"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("nattr", schema=None) as batch_op:
+        batch_op.create_index("ix_nn_model", ["model"], unique=False)
+
+    with op.batch_alter_table("lattr", schema=None) as batch_op:
+        batch_op.create_index("ix_ln_model", ["model"], unique=False)
+
+    with op.batch_alter_table("Account_attr", schema=None) as batch_op:
+        batch_op.create_index("ix_model_Account", ["model"], unique=False)
+
+    with op.batch_alter_table("Session_attr", schema=None) as batch_op:
+        batch_op.create_index("ix_model_Session", ["model"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("Session_attr", schema=None) as batch_op:
+        batch_op.drop_index("ix_model_Session")
+
+    with op.batch_alter_table("Account_attr", schema=None) as batch_op:
+        batch_op.drop_index("ix_model_Account")
+
+    with op.batch_alter_table("lattr", schema=None) as batch_op:
+        batch_op.drop_index("ix_ln_model")
+
+    with op.batch_alter_table("nattr", schema=None) as batch_op:
+        batch_op.drop_index("ix_nn_model")
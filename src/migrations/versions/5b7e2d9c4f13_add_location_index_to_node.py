@@ -0,0 +1,28 @@
+"""add_location_index_to_node
+
+Revision ID: 5b7e2d9c4f13
+Revises: 8c1d5e7b2a94
+Create Date: 2026-10-17 14:32:08.417925
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5b7e2d9c4f13"
+down_revision = "8c1d5e7b2a94"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("node", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_node_location", ["location_id", "location_index"], unique=False
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("node", schema=None) as batch_op:
+        batch_op.drop_index("ix_node_location")
@@ -0,0 +1,32 @@
+"""add_unique_index_to_attr_tables
+
+Revision ID: 8c1d5e7b2a94
+Revises: f3a0a2c0641a
+Create Date: 2026-10-17 09:12:41.503218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8c1d5e7b2a94"
+down_revision = "f3a0a2c0641a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("Account_attr", schema=None) as batch_op:
+        batch_op.create_index("un_nn_Account", ["name", "model"], unique=True)
+
+    with op.batch_alter_table("Session_attr", schema=None) as batch_op:
+        batch_op.create_index("un_nn_Session", ["name", "model"], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table("Session_attr", schema=None) as batch_op:
+        batch_op.drop_index("un_nn_Session")
+
+    with op.batch_alter_table("Account_attr", schema=None) as batch_op:
+        batch_op.drop_index("un_nn_Account")
@@ -0,0 +1,59 @@
+"""add_typed_value_to_attr_tables
+
+Revision ID: 9a4c6e1f8b35
+Revises: 3e9f41c7d2a8
+Create Date: 2026-10-17 16:42:10.284517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from data.base.sql.typed import convert_table, revert_table
+
+
+# revision identifiers, used by Alembic.
+revision = "9a4c6e1f8b35"
+down_revision = "3e9f41c7d2a8"
+branch_labels = None
+depends_on = None
+
+# Attribute tables: (table name, index name, indexed attribute table).
+TABLES = (
+    ("nattr", "ix_nn_typed", False),
+    ("lattr", "ix_ln_typed", False),
+    ("Account_attr", "ix_typed_Account", False),
+    ("Session_attr", "ix_typed_Session", False),
+    ("inattr", "ix_inn_typed", True),
+    ("ilattr", "ix_iln_typed", True),
+)
+
+
+def get_table(name: str) -> sa.sql.expression.TableClause:
+    """Return a lightweight table to convert values."""
+    return sa.table(
+        name,
+        sa.column("id", sa.Integer()),
+        sa.column("name", sa.String()),
+        sa.column("value", sa.LargeBinary()),
+        sa.column("typed"),
+    )
+
+
+def upgrade():
+    for name, index, indexed in TABLES:
+        columns = ["name", "typed"] + (["class_path"] if indexed else [])
+        with op.batch_alter_table(name, schema=None) as batch_op:
+            batch_op.add_column(
+                sa.Column("typed", sa.LargeBinary(), nullable=True)
+            )
+            batch_op.create_index(index, columns, unique=False)
+
+        convert_table(op.get_bind(), get_table(name), indexed=indexed)
+
+
+def downgrade():
+    for name, index, _ in reversed(TABLES):
+        revert_table(op.get_bind(), get_table(name))
+        with op.batch_alter_table(name, schema=None) as batch_op:
+            batch_op.drop_index(index)
+            batch_op.drop_column("typed")
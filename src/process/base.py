@@ -43,6 +43,7 @@ import psutil
 
 
 from tools.logging.frequent import FrequentLogger
+from tools.logging.writer import WRITER
 
 
 class Process(metaclass=ABCMeta):
@@ -206,3 +207,4 @@ class Process(metaclass=ABCMeta):
             self.should_stop.set()
         finally:
             loop.run_until_complete(self.stop())
+            WRITER.close()
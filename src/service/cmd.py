@@ -75,6 +75,13 @@ CRUX protocol:
         this message should be read by Fernet.  If the mode is signed,
         the message should be checked by itsdangerous before being unpickled.
 
+    Several commands can be sent in a single message (a batch).
+    In this case, the flag byte also contains the batch flag (64)
+    and the message contains a sequence of commands, encoded
+    with the compact codec (see `service/codec.py`) and signed as
+    a whole.  Commands sent to the same connection during the same
+    loop iteration are grouped in a single batch.
+
     A message, once unsigned, looks like a tuple containing
     the command name (as a string), the command ID (which is used
     for answers) and the command arguments (wrapped in a dictionary).
@@ -93,13 +100,13 @@ CRUX protocol:
 """
 
 import asyncio
+from collections import Counter
 from itertools import count
 import os.path
 import pickle
 import platform
 from struct import calcsize, error as struct_error, pack, unpack
-import time
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
 
 from async_timeout import timeout as async_timeout
 import keyring
@@ -108,6 +115,7 @@ from service.origin import Origin
 from service.message import MessageMode
 
 # Constants
+BATCH_FLAG = 64
 INITIAL_PACKET_FORMAT_STRING = "!bQ"
 INITIAL_PACKET_SIZE = calcsize(INITIAL_PACKET_FORMAT_STRING)
 
@@ -125,17 +133,31 @@ class CmdMixin:
     communication.
 
     Asynchronous methods:
-        write_cmd(writer, command name, arguments): send a command.
+        send_cmd(writer, command name, arguments): send a command.
+        send_cmds(writer, commands): send several commands at once.
+        queue_cmd(writer, command name, arguments): queue a command,
+                without waiting for it to be sent.
         answer(origin, arguments): answer to a specific command.
         wait_for_cmd(reader, command name, timeout): wait for a command
                 to be received.
+        wait_for_answer(writer, command name, arguments, timeout):
+                send a command and wait for its answer.
+
+    Requests waiting for an answer are kept in `pending`, a dictionary
+    of futures with command IDs as keys.  The future is resolved
+    as soon as the answer is read, so no polling is involved.
 
     """
 
+    compact_codec = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.commands = {}
-        self.answers = {}
+        self.outgoing = {}
+        self.sending = set()
+        self.pending = {}
+        self.request_stats = Counter()
         self.cmd_id = count(0)
 
     async def init(self):
@@ -227,8 +249,9 @@ class CmdMixin:
             flag, size = packet
 
             # Check that the flag is valid, build a MessageMode member.
+            batch = bool(flag & BATCH_FLAG)
             try:
-                mode = MessageMode(flag)
+                mode = MessageMode(flag & ~BATCH_FLAG)
             except ValueError:
                 self.logger.error(
                     f"a packet with an invalid flag of {flag} was received"
@@ -264,6 +287,23 @@ class CmdMixin:
                 await self.call_hook("error_read", reader)
                 return
 
+            # Unsign/decode a batch of commands.
+            if batch:
+                try:
+                    cmds = mode.get_batch(data)
+                except ValueError:
+                    self.logger.exception(
+                        "An error occurred while reading a CRUX batch:"
+                    )
+                    await self.call_hook("error_read", reader)
+                else:
+                    for obj in cmds:
+                        await self.parse_and_process_command(
+                            reader, writer, queue, obj
+                        )
+
+                continue
+
             # Unsign/unpickle the data.
             try:
                 obj = mode.get_content(data)
@@ -358,7 +398,15 @@ class CmdMixin:
         """
         # 'answer' is handled in a different way.
         if cmd == "answer":
-            self.answers[cmd_id] = kwargs
+            future = self.pending.get(cmd_id)
+            if future is None or future.done():
+                self.request_stats["late"] += 1
+                self.logger.debug(
+                    f"An answer to command ID {cmd_id} was received, "
+                    "but nobody is waiting for it anymore"
+                )
+            else:
+                future.set_result(kwargs)
             return
 
         service = self
@@ -401,25 +449,118 @@ class CmdMixin:
             cmd_id (int, optional): the command ID.
             mode (MessageMode): the message mode to send this message.
 
+        The command is sent with other commands queued for
+        the same writer during this loop iteration.  This method
+        returns when the command has been sent.
+
+        """
+        sent = await self.queue_cmd(writer, cmd_name, args, cmd_id, mode)
+        await asyncio.shield(sent)
+
+    async def send_cmds(
+        self,
+        writer: asyncio.StreamWriter,
+        commands: Iterable[tuple[str, dict[str, Any]]],
+        mode: MessageMode = MessageMode.SIGNED,
+    ):
+        """Send several commands to writer, in a single batch.
+
+        Args:
+            writer (StreamWriter): to whom to send these commands.
+            commands (iterable): the commands to send, each as
+                    a tuple (command name, arguments).
+            mode (MessageMode): the message mode to send these messages.
+
+        """
+        sent = set()
+        for cmd_name, args in commands:
+            sent.add(await self.queue_cmd(writer, cmd_name, args, mode=mode))
+
+        if sent:
+            await asyncio.shield(asyncio.gather(*sent))
+
+    async def queue_cmd(
+        self,
+        writer: asyncio.StreamWriter,
+        cmd_name: str,
+        args: Optional[dict[str, Any]] = None,
+        cmd_id: Optional[int] = None,
+        mode: MessageMode = MessageMode.SIGNED,
+    ) -> asyncio.Future:
+        """Queue a command to be sent to writer.
+
+        Commands queued for the same writer (and in the same mode)
+        during the same loop iteration are sent together, in a batch.
+
+        Args:
+            writer (StreamWriter): to whom to send this command.
+            cmd_name (str): the command name.
+            args (dict, opt): the arguments to pickle.
+            cmd_id (int, optional): the command ID.
+            mode (MessageMode): the message mode to send this message.
+
+        Returns:
+            sent (Future): a future, resolved when the batch containing
+                    this command is sent.  Its result is `True` if
+                    the batch could be sent, `False` otherwise.
+
         """
         cmd_id = next(self.cmd_id) if cmd_id is None else cmd_id
         args = args or {}
         await self.call_hook("send", writer, cmd_name, cmd_id, args)
-        encoded = mode.compose(cmd_name, cmd_id, args)
-        initial_packet = pack(
-            INITIAL_PACKET_FORMAT_STRING, mode.value, len(encoded)
-        )
-        stream = initial_packet + encoded
+        key = (writer, mode)
+        batch = self.outgoing.get(key)
+        if batch is None:
+            batch = ([], asyncio.get_running_loop().create_future())
+            self.outgoing[key] = batch
+            task = asyncio.create_task(self.send_batch(writer, mode))
+            self.sending.add(task)
+            task.add_done_callback(self.sending.discard)
+
+        commands, sent = batch
+        commands.append((cmd_name, cmd_id, args))
+        return sent
+
+    async def send_batch(
+        self,
+        writer: asyncio.StreamWriter,
+        mode: MessageMode,
+    ):
+        """Send the commands queued for a writer.
+
+        A single command is sent as a regular message, several
+        commands are sent in a batch (one header, one signature).
 
+        Args:
+            writer (StreamWriter): to whom to send the queued commands.
+            mode (MessageMode): the message mode of these commands.
+
+        """
+        commands, sent = self.outgoing.pop((writer, mode))
         try:
-            writer.write(stream)
+            if len(commands) == 1:
+                flag = mode.value
+                encoded = mode.compose(*commands[0])
+            else:
+                flag = mode.value | BATCH_FLAG
+                encoded = mode.compose_batch(
+                    commands, compact=self.compact_codec
+                )
+
+            initial_packet = pack(
+                INITIAL_PACKET_FORMAT_STRING, flag, len(encoded)
+            )
+            writer.write(initial_packet + encoded)
             await writer.drain()
         except (ConnectionError, asyncio.CancelledError):
+            sent.set_result(False)
             await self.call_hook("error_write", writer)
-        except Exception:
+        except Exception as err:
+            sent.set_exception(err)
             await self.call_hook("error_write", writer)
             self.logger.exception("An error occurred on sending a command:")
-            raise
+        else:
+            sent.set_result(True)
 
     async def wait_for_cmd(
         self,
@@ -442,20 +583,23 @@ class CmdMixin:
         somehow).
 
         """
-        begin = time.time()
-        while (queue := self.commands.get(reader)) is None and (
-            timeout is None or time.time() - begin < timeout
-        ):
-            await asyncio.sleep(0.1)
+        if reader is None:
+            if timeout is not None:
+                await asyncio.sleep(timeout)
 
-        if queue is None:
             return (None, {})
 
-        try:
-            if timeout is not None:
-                timeout = timeout - (time.time() - begin)
-                timeout = max(timeout, 0.5)
+        # The queue is created here if the reader isn't read yet,
+        # `read_commands` will then use it.
+        queue = self.commands.get(reader)
+        if queue is None:
+            queue = asyncio.Queue()
+            self.commands[reader] = queue
 
+        if timeout is not None:
+            timeout = max(timeout, 0.5)
+
+        try:
             async with async_timeout(timeout):
                 while received := await queue.get():
                     if received is None:
@@ -514,15 +658,39 @@ class CmdMixin:
 
         """
         args = {} if args is None else args
-        begin = time.time()
         cmd_id = next(self.cmd_id)
-        await self.send_cmd(writer, cmd_name, args, cmd_id=cmd_id)
-
-        # Wait for the answer, following the timeout.
-        while (result := self.answers.pop(cmd_id, None)) is None:
-            await asyncio.sleep(0.05)
-            if timeout is not None and time.time() - begin >= timeout:
-                # We have waited long enough, end here.
-                break
+        future = asyncio.get_running_loop().create_future()
+        self.pending[cmd_id] = future
+        self.request_stats["sent"] += 1
+        try:
+            await self.send_cmd(writer, cmd_name, args, cmd_id=cmd_id)
+            result = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.request_stats["timeouts"] += 1
+            result = None
+        except asyncio.CancelledError:
+            self.request_stats["cancelled"] += 1
+            raise
+        else:
+            self.request_stats["answered"] += 1
+        finally:
+            self.pending.pop(cmd_id, None)
 
         return result
+
+    def get_request_stats(self) -> dict[str, int]:
+        """Return statistics on the requests waiting for an answer.
+
+        Returns:
+            stats (dict): the number of requests sent, answered,
+                    timed out or cancelled, the number of answers
+                    received too late and the number of requests
+                    still waiting for an answer (outstanding).
+
+        """
+        stats = {
+            key: self.request_stats[key]
+            for key in ("sent", "answered", "timeouts", "cancelled", "late")
+        }
+        stats["outstanding"] = len(self.pending)
+        return stats
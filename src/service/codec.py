@@ -0,0 +1,210 @@
+# Copyright (c) 2021, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Compact binary codec for batches of CRUX commands.
+
+A batch is a sequence of commands, each a tuple of command name,
+command ID and arguments (a dictionary).  Each command in the batch
+is preceded by a single byte, identifying how it was encoded:
+
+    0   The command is pickled (this works for all commands).
+    1   An `output` command (session ID, input ID and output bytes),
+        packed with `struct`.
+    2   An `input` command (session ID, input ID, date of sending
+        and command bytes), packed with `struct`.
+
+`output` and `input` are, by far, the most frequent commands sent
+between the portal and the game process.  Packing them directly is
+both faster and smaller than pickling them.  Commands that
+don't have the expected arguments are pickled instead.
+
+"""
+
+from datetime import datetime, timedelta
+import pickle
+from struct import calcsize, error as struct_error, pack, unpack_from
+from typing import Any, Iterable
+from uuid import UUID
+
+# Constants
+EPOCH = datetime(1970, 1, 1)
+NO_INPUT_ID = -1
+PICKLED = 0
+OUTPUT = 1
+INPUT = 2
+PICKLED_FORMAT = "!BI"
+OUTPUT_FORMAT = "!BQ16sqI"
+INPUT_FORMAT = "!BQ16sqqI"
+PICKLED_SIZE = calcsize(PICKLED_FORMAT)
+OUTPUT_SIZE = calcsize(OUTPUT_FORMAT)
+INPUT_SIZE = calcsize(INPUT_FORMAT)
+OUTPUT_KEYS = {"session_id", "output", "input_id"}
+INPUT_KEYS = {"session_id", "command", "input_id", "sent"}
+
+Command = tuple[str, int, dict[str, Any]]
+
+
+def encode_batch(commands: Iterable[Command], compact: bool = True) -> bytes:
+    """Encode a batch of commands.
+
+    Args:
+        commands (iterable): the commands to encode, each
+                as a tuple of (name, ID, arguments).
+        compact (bool): if True, pack `output` and `input` commands
+                with `struct`, otherwise pickle all commands.
+
+    Returns:
+        encoded (bytes): the encoded batch.
+
+    """
+    parts = []
+    for cmd in commands:
+        name, cmd_id, args = cmd
+        if compact and name == "output" and _is_output(args):
+            input_id = args["input_id"]
+            output = args["output"]
+            parts.append(
+                pack(
+                    OUTPUT_FORMAT,
+                    OUTPUT,
+                    cmd_id,
+                    args["session_id"].bytes,
+                    NO_INPUT_ID if input_id is None else input_id,
+                    len(output),
+                )
+            )
+            parts.append(output)
+        elif compact and name == "input" and _is_input(args):
+            sent = (args["sent"] - EPOCH) // timedelta(microseconds=1)
+            command = args["command"]
+            parts.append(
+                pack(
+                    INPUT_FORMAT,
+                    INPUT,
+                    cmd_id,
+                    args["session_id"].bytes,
+                    args["input_id"],
+                    sent,
+                    len(command),
+                )
+            )
+            parts.append(command)
+        else:
+            pickled = pickle.dumps(cmd)
+            parts.append(pack(PICKLED_FORMAT, PICKLED, len(pickled)))
+            parts.append(pickled)
+
+    return b"".join(parts)
+
+
+def decode_batch(data: bytes) -> list[Command]:
+    """Decode a batch of commands.
+
+    Args:
+        data (bytes): the encoded batch.
+
+    Returns:
+        commands (list): the list of commands, each as a tuple
+                of (name, ID, arguments).
+
+    Raises:
+        ValueError: the batch is malformed.
+
+    """
+    commands = []
+    offset = 0
+    view = memoryview(data)
+    try:
+        while offset < len(data):
+            kind = data[offset]
+            if kind == OUTPUT:
+                _, cmd_id, session_id, input_id, size = unpack_from(
+                    OUTPUT_FORMAT, data, offset
+                )
+                offset += OUTPUT_SIZE
+                output = bytes(view[offset : offset + size])
+                offset += size
+                args = dict(
+                    session_id=UUID(bytes=session_id),
+                    output=output,
+                    input_id=None if input_id == NO_INPUT_ID else input_id,
+                )
+                commands.append(("output", cmd_id, args))
+            elif kind == INPUT:
+                _, cmd_id, session_id, input_id, sent, size = unpack_from(
+                    INPUT_FORMAT, data, offset
+                )
+                offset += INPUT_SIZE
+                command = bytes(view[offset : offset + size])
+                offset += size
+                args = dict(
+                    session_id=UUID(bytes=session_id),
+                    command=command,
+                    input_id=input_id,
+                    sent=EPOCH + timedelta(microseconds=sent),
+                )
+                commands.append(("input", cmd_id, args))
+            elif kind == PICKLED:
+                _, size = unpack_from(PICKLED_FORMAT, data, offset)
+                offset += PICKLED_SIZE
+                commands.append(pickle.loads(view[offset : offset + size]))
+                offset += size
+            else:
+                raise ValueError(f"unknown command kind: {kind}")
+    except (IndexError, struct_error, pickle.PickleError, EOFError) as err:
+        raise ValueError("malformed batch") from err
+
+    if offset != len(data):
+        raise ValueError("truncated batch")
+
+    return commands
+
+
+def _is_output(args: dict[str, Any]) -> bool:
+    """Return whether the arguments can be packed as an output."""
+    input_id = args.get("input_id")
+    return (
+        args.keys() == OUTPUT_KEYS
+        and isinstance(args["session_id"], UUID)
+        and isinstance(args["output"], bytes)
+        and (input_id is None or isinstance(input_id, int))
+    )
+
+
+def _is_input(args: dict[str, Any]) -> bool:
+    """Return whether the arguments can be packed as an input."""
+    sent = args.get("sent")
+    return (
+        args.keys() == INPUT_KEYS
+        and isinstance(args["session_id"], UUID)
+        and isinstance(args["command"], bytes)
+        and isinstance(args["input_id"], int)
+        and isinstance(sent, datetime)
+        and sent.tzinfo is None
+    )
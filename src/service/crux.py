@@ -200,8 +200,12 @@ class Service(CmdMixin, BaseService):
 
         """
         args = {} if args is None else args
+        sent = set()
         for writer in tuple(self.readers.values()):
-            await self.send_cmd(writer, cmd_name, args)
+            sent.add(await self.queue_cmd(writer, cmd_name, args))
+
+        if sent:
+            await asyncio.shield(asyncio.gather(*sent))
 
     async def error_read(self, reader):
         """An error occurred when reading from reader."""
@@ -37,11 +37,14 @@ from uuid import UUID
 from dynaconf import settings
 
 from data.base import handle_data
+from data.base.sql.policy import LRUPolicy, POLICIES
+from data.base.sql.query_log import Query, QueryLog
 from data.log import logger
 from data.session import Session
 from data.type.base import BaseType
 from service.base import BaseService
 from service.shell import Shell
+from tools.logging import Level
 
 
 class Service(BaseService):
@@ -79,7 +82,24 @@ class Service(BaseService):
             o_type.pyname = path
 
         # Connect to the database.
-        self.engine = handle_data(logging=self.log_query)
+        policy = POLICIES[settings.CACHE_POLICY]
+        if issubclass(policy, LRUPolicy):
+            policy = policy(settings.CACHE_SIZE)
+        else:
+            policy = policy()
+
+        # Only log SQL queries if they can be written.
+        mode = settings.SQL_LOG
+        if not logger.accepts(Level.DEBUG):
+            mode = "off"
+
+        self.query_log = QueryLog.create(
+            self.log_query,
+            mode=mode,
+            sample=settings.SQL_LOG_SAMPLE,
+            slow=settings.SQL_LOG_SLOW,
+        )
+        self.engine = handle_data(logging=self.query_log, cache_policy=policy)
         self.logger.debug(
             self.indented("Connected to the database", added_depth=1)
         )
@@ -141,20 +161,21 @@ class Service(BaseService):
 
         return False
 
-    def log_query(self, statement: str, args: tuple[str]):
-        """Log the specified query."""
+    def log_query(self, query: Query):
+        """Log the specified query.
+
+        The query is only formatted if it is written.  In "debug"
+        mode, queries sent during a transaction are grouped, unless
+        they are slow or failed: they are then logged right away.
+        Sampled queries are always logged right away.
+
+        """
         engine = getattr(self, "engine", None)
         transaction = getattr(engine, "current_transaction", None)
+        sampled = self.query_log.mode == "sample"
 
-        statement = statement.replace("\t", " " * 4)
-        statement = ("\n" + " " * 4).join(
-            [line for line in statement.splitlines()]
-        )
-        if args:
-            statement += f"\n{' ' * 4}{args}"
-
-        if transaction is None:
-            logger.debug(f"\n{' ' * 4}{statement}")
+        if transaction is None or sampled or query.slow or query.failed:
+            logger.debug(query)
         else:
             group = logger.group(transaction)
-            group.debug(f"\n{' ' * 4}{statement}")
+            group.debug(query)
@@ -31,7 +31,6 @@
 
 import asyncio
 from datetime import datetime
-import pickle
 from queue import Queue
 from typing import Any
 from uuid import UUID
@@ -40,7 +39,8 @@ from data.delay import Delay as DbDelay
 from service.base import BaseService
 from service.origin import Origin
 from service.shell import Shell
-from tools.delay import Delay
+from tools.delay import Delay, SCHEDULER
+from tools.hasher import HASHER
 
 # Portal commands.
 PORTAL_COMMANDS = Queue()
@@ -64,6 +64,7 @@ class Service(BaseService):
         """
         self.output_event = asyncio.Event()
         self.game_id = None
+        self.metrics = None
         self.console = Shell({})
 
     async def setup(self):
@@ -74,6 +75,7 @@ class Service(BaseService):
         self.world = self.services["world"]
         self.host.schedule_hook("connected", self.connected_to_CRUX)
         self.data.setup_shell(self.console)
+        SCHEDULER.start(self.call_delays)
 
         # Add all services to the Shell.
         services = Queue()
@@ -86,28 +88,41 @@ class Service(BaseService):
 
     async def cleanup(self):
         """Clean the service up before shutting down."""
+        if self.metrics is not None:
+            self.metrics.stop()
+
+        SCHEDULER.stop()
+        HASHER.shutdown()
 
     def restore_delays(self):
-        """Schedule all persistent delays."""
-        now = datetime.utcnow()
-        Delay._game_service = self
-        for persistent in DbDelay.all():
-            delta = persistent.expire_at - now
-            seconds = delta.total_seconds()
-            if seconds < 0:
-                seconds = 0
-
-            callback, args, kwargs = pickle.loads(persistent.pickled)
-            obj = Delay.schedule(seconds, callback, *args, **kwargs)
-            obj.persistent = persistent
-
-    def call_delay(self, delay: Delay):
-        """Call ths delay."""
+        """Schedule all persistent delays.
+
+        Callbacks are only unpickled when the delays are executed.
+        Stored delays are loaded by chunk: the scheduled delays
+        keep them in memory.
+
+        """
+        for persistent in DbDelay.iter_select(retain=False):
+            Delay.restore(persistent)
+
+    def call_delays(self, delays: list[Delay]):
+        """Call these delays in a single transaction.
+
+        Pending delays are written in the same transaction.
+
+        Args:
+            delays (list of Delay): the expired delays.
+
+        """
         with self.data.engine.session.begin():
-            delay._execute()
+            for delay in delays:
+                delay._execute()
 
-        loop = asyncio.get_event_loop()
-        loop.create_task(self.mudio.send())
+            SCHEDULER.flush()
+
+        if delays:
+            loop = asyncio.get_event_loop()
+            loop.create_task(self.mudio.send())
 
     async def connected_to_CRUX(self, writer):
         """The host is connected to the CRUX server."""
@@ -144,9 +159,11 @@ class Service(BaseService):
     async def send_portal_commands(self):
         """Send portal commands through CRUX."""
         host = self.services["host"]
+        commands = []
         while not PORTAL_COMMANDS.empty():
-            command, args = PORTAL_COMMANDS.get_nowait()
-            await host.send_cmd(host.writer, command, args)
+            commands.append(PORTAL_COMMANDS.get_nowait())
+
+        await host.send_cmds(host.writer, commands)
 
     # Command handlers
     async def handle_registered_game(
@@ -208,6 +225,9 @@ class Service(BaseService):
 
         """
         data = self.data
+        if (metrics := self.metrics) is not None:
+            statements = metrics.get_statements()
+
         try:
             with data.engine.session.begin():
                 session = self.data.get_session(session_id)
@@ -217,12 +237,14 @@ class Service(BaseService):
             self.logger.exception("Cannot process input")
         finally:
             try:
-                with data.engine.session.begin():
-                    await self.mudio.send_output(input_id)
-                    await self.send_portal_commands()
+                await self.mudio.send_output(input_id)
+                await self.send_portal_commands()
             except Exception:
                 self.logger.exception("Cannot send output")
 
+            if metrics is not None and metrics is self.metrics:
+                metrics.record(sent, statements)
+
     async def handle_new_session(
         self,
         origin: Origin,
@@ -258,8 +280,8 @@ class Service(BaseService):
 
             session.context.enter()
 
-            await self.mudio.send_output(0)
-            await self.send_portal_commands()
+        await self.mudio.send_output(0)
+        await self.send_portal_commands()
 
     async def handle_disconnect_session(
         self,
@@ -444,17 +444,29 @@ class Service(BaseService):
 
         # Display sessions in an ASCII table.
         table = BeautifulTable()
-        table.columns.header = ("Session ID", "IP", "Connection", "Secured")
+        table.columns.header = (
+            "Session ID",
+            "IP",
+            "Connection",
+            "Secured",
+            "Queued",
+            "Dropped",
+        )
         table.columns.header.alignment = BeautifulTable.ALIGN_LEFT
         table.columns.alignment["Session ID"] = BeautifulTable.ALIGN_LEFT
         table.columns.alignment["IP"] = BeautifulTable.ALIGN_LEFT
         table.columns.alignment["Connection"] = BeautifulTable.ALIGN_RIGHT
         table.columns.alignment["Secured"] = BeautifulTable.ALIGN_LEFT
+        table.columns.alignment["Queued"] = BeautifulTable.ALIGN_RIGHT
+        table.columns.alignment["Dropped"] = BeautifulTable.ALIGN_RIGHT
         table.set_style(BeautifulTable.STYLE_NONE)
 
-        for session_id, (ip, creation, secured) in sessions.items():
+        for session_id, info in sessions.items():
+            ip, creation, secured, queued, dropped = info
             secured = "Yes" if secured else "No"
-            table.rows.append((session_id.hex, ip, creation, secured))
+            table.rows.append(
+                (session_id.hex, ip, creation, secured, queued, dropped)
+            )
         print(table)
 
     async def action_net(self, args: argparse.ArgumentParser):
@@ -0,0 +1,274 @@
+# Copyright (c) 2022, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""MUD Client Compression Protocol (MCCP), versions 2 and 3.
+
+MCCP compresses the Telnet stream with zlib.  Both versions are
+negotiated through Telnet options:
+
+- MCCP2 (option 86) compresses what the server sends to the client.
+  The server offers it (`IAC WILL MCCP2`), the client accepts it
+  (`IAC DO MCCP2`), then the server sends `IAC SB MCCP2 IAC SE`
+  and everything it sends afterward is compressed.
+- MCCP3 (option 87) compresses what the client sends to the server.
+  The server offers it (`IAC WILL MCCP3`), the client accepts it
+  (`IAC DO MCCP3`) and starts compressing when it sends
+  `IAC SB MCCP3 IAC SE`.
+
+Each session has its own zlib streams.  The output stream
+is flushed (`Z_SYNC_FLUSH`) after each batch of output, so the client
+can display it right away.
+
+This module also contains a minimal Telnet parser, to separate
+Telnet commands from the text sent by clients.
+
+"""
+
+from telnetlib import DO, DONT, IAC, SB, SE, WILL, WONT
+import zlib
+
+# Telnet options
+MCCP2 = bytes([86])
+MCCP3 = bytes([87])
+
+# Parser states
+_DATA = 0
+_COMMAND = 1
+_OPTION = 2
+_SUB = 3
+_SUB_IAC = 4
+
+# Byte values
+_IAC = ord(IAC)
+_SB = ord(SB)
+_SE = ord(SE)
+_NEGOTIATIONS = {ord(WILL), ord(WONT), ord(DO), ord(DONT)}
+
+
+class Compressor:
+
+    """Compressor of the output of a session (MCCP2).
+
+    The number of bytes before and after compression is kept,
+    to compute the compression ratio.
+
+    """
+
+    def __init__(self, level: int = 6):
+        self.stream = zlib.compressobj(level)
+        self.raw = 0
+        self.compressed = 0
+
+    def __repr__(self):
+        return (
+            f"<Compressor {self.raw} -> {self.compressed} bytes "
+            f"({self.ratio:.1%})>"
+        )
+
+    @property
+    def ratio(self) -> float:
+        """Return the compressed size divided by the raw size."""
+        return self.compressed / self.raw if self.raw else 1.0
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress and flush a batch of output.
+
+        Args:
+            data (bytes): the data to compress.
+
+        Returns:
+            compressed (bytes): the compressed data, which the client
+                    can decompress entirely.
+
+        """
+        compressed = self.stream.compress(data)
+        compressed += self.stream.flush(zlib.Z_SYNC_FLUSH)
+        self.raw += len(data)
+        self.compressed += len(compressed)
+        return compressed
+
+    def finish(self, data: bytes = b"") -> bytes:
+        """Compress the last data and end the stream.
+
+        Args:
+            data (bytes, optional): the last data to compress.
+
+        Returns:
+            compressed (bytes): the end of the compressed stream.
+                    Data sent after it isn't compressed.
+
+        """
+        compressed = self.stream.compress(data)
+        compressed += self.stream.flush(zlib.Z_FINISH)
+        self.raw += len(data)
+        self.compressed += len(compressed)
+        return compressed
+
+
+class Decompressor:
+
+    """Decompressor of the input of a session (MCCP3)."""
+
+    def __init__(self):
+        self.stream = zlib.decompressobj()
+
+    def decompress(self, data: bytes) -> tuple[bytes, bytes | None]:
+        """Decompress data sent by the client.
+
+        Args:
+            data (bytes): the compressed data.
+
+        Returns:
+            (decompressed, rest) (tuple): the decompressed data and,
+                    if the client ended the compressed stream,
+                    the uncompressed data that follows it
+                    (`None` if the stream continues).
+
+        Raises:
+            zlib.error: the data is corrupted.
+
+        """
+        decompressed = self.stream.decompress(data)
+        rest = self.stream.unused_data if self.stream.eof else None
+        return decompressed, rest
+
+
+class Compression:
+
+    """Compression state of a session.
+
+    Attributes:
+        offered (bool): whether MCCP2 and MCCP3 were offered to the client.
+        compressor (Compressor): the output compressor, if the client
+                accepted MCCP2.
+        input_accepted (bool): whether the client accepted MCCP3.
+        decompressor (Decompressor): the input decompressor, if the client
+                is compressing its input.
+
+    """
+
+    def __init__(self, offered: bool = False):
+        self.offered = offered
+        self.compressor = None
+        self.input_accepted = False
+        self.decompressor = None
+
+
+class TelnetParser:
+
+    """Separate Telnet commands from text, as sent by a client.
+
+    The parser keeps its state between calls to `feed`, so a command
+    split between two reads is handled.
+
+    """
+
+    def __init__(self):
+        self.state = _DATA
+        self.command = None
+        self.option = None
+        self.payload = bytearray()
+
+    def feed(self, data: bytes) -> tuple[bytes, list[tuple], bytes]:
+        """Parse data sent by the client.
+
+        Args:
+            data (bytes): the data to parse.
+
+        Returns:
+            (text, commands, rest) (tuple): the text (Telnet commands
+                    removed, `IAC IAC` replaced by `IAC`), the list
+                    of Telnet commands as tuples `(command, option,
+                    payload)` (bytes, option and payload being empty
+                    if not relevant), and the data following
+                    `IAC SB MCCP3 IAC SE`, which is compressed
+                    and wasn't parsed.
+
+        """
+        if self.state == _DATA and _IAC not in data:
+            return data, [], b""
+
+        text = bytearray()
+        commands = []
+        index = 0
+        length = len(data)
+        while index < length:
+            state = self.state
+            if state == _DATA:
+                end = data.find(IAC, index)
+                if end < 0:
+                    text += data[index:]
+                    break
+
+                text += data[index:end]
+                index = end + 1
+                self.state = _COMMAND
+                continue
+
+            byte = data[index]
+            index += 1
+            if state == _COMMAND:
+                if byte == _IAC:
+                    text.append(_IAC)
+                    self.state = _DATA
+                elif byte in _NEGOTIATIONS:
+                    self.command = bytes([byte])
+                    self.state = _OPTION
+                elif byte == _SB:
+                    self.command = SB
+                    self.option = None
+                    self.payload.clear()
+                    self.state = _SUB
+                else:
+                    commands.append((bytes([byte]), b"", b""))
+                    self.state = _DATA
+            elif state == _OPTION:
+                commands.append((self.command, bytes([byte]), b""))
+                self.state = _DATA
+            elif state == _SUB:
+                if byte == _IAC:
+                    self.state = _SUB_IAC
+                elif self.option is None:
+                    self.option = bytes([byte])
+                else:
+                    self.payload.append(byte)
+            elif state == _SUB_IAC:
+                if byte == _SE:
+                    option = self.option or b""
+                    commands.append((SB, option, bytes(self.payload)))
+                    self.payload.clear()
+                    self.state = _DATA
+                    if option == MCCP3:
+                        # What follows is compressed.
+                        return bytes(text), commands, data[index:]
+                else:
+                    self.payload.append(byte)
+                    self.state = _SUB
+
+        return bytes(text), commands, b""
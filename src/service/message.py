@@ -33,7 +33,9 @@ from enum import Flag
 import pickle
 from typing import Any
 
-from itsdangerous import Serializer
+from itsdangerous import BadSignature, Serializer, Signer
+
+from service.codec import Command, decode_batch, encode_batch
 
 
 class MessageMode(Flag):
@@ -170,6 +172,52 @@ class MessageMode(Flag):
         """
         return self.serializer.dumps((cmd, cmd_id, args))
 
+    def get_batch(self, message: bytes) -> list[Command]:
+        """Read a batch of commands, handling the message mode.
+
+        The batch is signed as a whole, the signature is checked
+        before any command is decoded.
+
+        Args:
+            message (bytes): the batch as a string of bytes.
+
+        Returns:
+            commands (list): the list of commands, each as a tuple
+                    (command name, command ID, command arguments).
+
+        Raises:
+            ValueError: the batch is not correctly signed or is malformed.
+
+        """
+        if MessageMode.SIGNED in self:
+            try:
+                message = self.signer.unsign(message)
+            except BadSignature:
+                raise ValueError("the batch is not correctly signed")
+
+        return decode_batch(message)
+
+    def compose_batch(
+        self, commands: list[Command], compact: bool = True
+    ) -> bytes:
+        """Return a batch of commands, following the message mode.
+
+        Args:
+            commands (list): the commands to send, each as a tuple
+                    (command name, command ID, command arguments).
+            compact (bool): if True, use the compact codec for
+                    the most frequent commands.
+
+        Returns:
+            message (bytes): the batch as a string of bytes.
+
+        """
+        message = encode_batch(commands, compact=compact)
+        if MessageMode.SIGNED in self:
+            message = self.signer.sign(message)
+
+        return message
+
     @classmethod
     def setup(cls, sign_key: bytes, encryption_key: bytes):
         """Setup the enumeration, adding class variables (but not members).
@@ -183,3 +231,4 @@ class MessageMode(Flag):
 
         """
         cls.serializer = Serializer(sign_key, serializer=pickle)
+        cls.signer = Signer(sign_key, salt="crux-batch")
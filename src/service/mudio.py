@@ -30,21 +30,24 @@
 """MudIO service, set to handle input/output on the game level"""
 
 import asyncio
-from collections import defaultdict
+from collections import defaultdict, deque
 from datetime import datetime
 from importlib import import_module
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Optional
+from uuid import UUID
 
 from channel.base import Channel
 from channel.log import logger as chn_logger
 from command.base import Command
+from command.index import CommandIndex
 from command.log import logger as cmd_logger
 from context.base import Context, CONTEXTS
 from context.log import logger as ctx_logger
 from data.session import Session, OUTPUT_QUEUE
 from service.base import BaseService
 from service.list import CHANNELS
+from tools.hasher import HASHER
 
 
 class Service(BaseService):
@@ -72,8 +75,10 @@ class Service(BaseService):
         self.output_lock = asyncio.Lock()
         self.contexts = {}
         self.commands = {}
+        self.command_index = CommandIndex()
         self.channels = CHANNELS
         self.stats = []
+        self.suspended = {}
 
     async def setup(self):
         """Set the MudIO up."""
@@ -215,6 +220,7 @@ class Service(BaseService):
                 Path("command/args"),
                 Path("command/abc.py"),
                 Path("command/base.py"),
+                Path("command/index.py"),
                 Path("command/log.py"),
                 Path("command/namespace.py"),
                 Path("command/special"),
@@ -231,6 +237,7 @@ class Service(BaseService):
             command.extrapolate(command.file_path)
 
         Command.service = self
+        self.index_commands()
 
     def load_channels(self):
         """Dynamically load channels."""
@@ -255,6 +262,16 @@ class Service(BaseService):
             channel.create_commands()
 
         Channel.service = self
+        self.index_commands()
+
+    def index_commands(self):
+        """Build the command index from the loaded commands.
+
+        This method should be called whenever commands are added
+        or reloaded, as the index would be out of date otherwise.
+
+        """
+        self.command_index.build(self.commands.values())
 
     def handle_input(self, session: Session, command: str, sent: datetime):
         """Handle input from a session.
@@ -264,6 +281,11 @@ class Service(BaseService):
             command (str): the sent command as a string.
 
         """
+        if (pending := self.suspended.get(session.uuid)) is not None:
+            # Input is suspended, keep it for later.
+            pending.append((command, sent))
+            return
+
         received = datetime.utcnow()
         context = session.context
         context.handle_input(command)
@@ -273,41 +295,144 @@ class Service(BaseService):
         executed = datetime.utcnow()
         self.record_stat(session, command, sent, received, executed)
 
+    def suspend(
+        self,
+        session: Session,
+        function: Callable[..., Any],
+        args: tuple[Any, ...],
+        resume: str,
+    ) -> None:
+        """Suspend input from a session while running a function.
+
+        The function is run in the password hasher (see `tools.hasher`).
+        Input sent by the session in the meantime is kept and handled,
+        in order, once the function has returned.
+
+        Args:
+            session (Session): the session to suspend.
+            function (callable): the function to run.
+            args (tuple): the positional arguments of the function.
+            resume (str): the name of the context method to call
+                    with the function's result.
+
+        """
+        self.suspended[session.uuid] = deque()
+        asyncio.create_task(self.resume(session.uuid, function, args, resume))
+
+    async def resume(
+        self,
+        session_id: UUID,
+        function: Callable[..., Any],
+        args: tuple[Any, ...],
+        resume: str,
+    ) -> None:
+        """Run the function, then resume input handling.
+
+        Args:
+            session_id (UUID): the ID of the suspended session.
+            function (callable): the function to run.
+            args (tuple): the positional arguments of the function.
+            resume (str): the name of the context method to call
+                    with the function's result.
+
+        """
+        result = error = None
+        try:
+            result = await HASHER.run(function, *args)
+        except Exception as exc:
+            error = exc
+
+        data = self.parent.data
+        try:
+            with data.engine.session.begin():
+                pending = self.suspended.pop(session_id, deque())
+                session = data.get_session(session_id)
+                if session is None:
+                    return
+
+                context = session.context
+                if error is None:
+                    getattr(context, resume)(result)
+                else:
+                    context.suspend_failed(error)
+
+                # Handle the input sent in the meantime.
+                while pending:
+                    if session_id in self.suspended:
+                        self.suspended[session_id].extend(pending)
+                        break
+
+                    self.handle_input(session, *pending.popleft())
+        except Exception:
+            self.logger.exception("Cannot resume input")
+        finally:
+            try:
+                await self.send_output()
+                await self.parent.send_portal_commands()
+            except Exception:
+                self.logger.exception("Cannot send output")
+
     async def send_output(self, input_id: Optional[int] = None):
-        """Send output synchronously."""
+        """Send output synchronously.
+
+        The output is prepared in its own transaction, which is closed
+        before sending it to the portal: another coroutine can open
+        a transaction while this one waits for the portal.
+
+        Args:
+            input_id (int, optional): the input ID this output answers.
+
+        """
         host = self.parent.host
         data = self.parent.data
-        to_send = defaultdict(list)
-
         async with self.output_lock:
-            while not OUTPUT_QUEUE.empty():
-                ssid, msg, options = OUTPUT_QUEUE.get_nowait()
-                to_send[ssid].append((msg, options))
+            with data.engine.session.begin():
+                commands = self.prepare_output(input_id)
 
-            # At this point, messages have been sorted by session.
-            for ssid, messages in to_send.items():
-                session = data.get_session(ssid)
-                if session is None:
-                    continue
+            await host.send_cmds(host.writer, commands)
 
-                options = [msg[1] for msg in messages]
-                messages = [msg[0] for msg in messages]
-                msg = b"\n".join(messages)
+    def prepare_output(
+        self, input_id: Optional[int] = None
+    ) -> list[tuple[str, dict]]:
+        """Empty the output queue and prepare the commands to send.
 
-                # Display the context prompt.
-                if all(option.get("prompt", False) for option in options):
-                    prompt = session.context.get_prompt()
-                    if isinstance(prompt, str):
-                        prompt = prompt.encode(
-                            session.encoding, errors="replace"
-                        )
+        Args:
+            input_id (int, optional): the input ID this output answers.
 
-                    if prompt:
-                        msg = msg + b"\n\n" + prompt
+        Returns:
+            commands (list): the output commands, one per session.
 
-                # Send the output to the session.
-                await host.send_cmd(
-                    host.writer,
+        """
+        data = self.parent.data
+        to_send = defaultdict(list)
+
+        commands = []
+        while not OUTPUT_QUEUE.empty():
+            ssid, msg, options = OUTPUT_QUEUE.get_nowait()
+            to_send[ssid].append((msg, options))
+
+        # At this point, messages have been sorted by session.
+        for ssid, messages in to_send.items():
+            session = data.get_session(ssid)
+            if session is None:
+                continue
+
+            options = [msg[1] for msg in messages]
+            messages = [msg[0] for msg in messages]
+            msg = b"\n".join(messages)
+
+            # Display the context prompt.
+            if all(option.get("prompt", False) for option in options):
+                prompt = session.context.get_prompt()
+                if isinstance(prompt, str):
+                    prompt = prompt.encode(session.encoding, errors="replace")
+
+                if prompt:
+                    msg = msg + b"\n\n" + prompt
+
+            # Output to all sessions is sent in a single batch.
+            commands.append(
+                (
                     "output",
                     dict(
                         session_id=session.uuid,
@@ -315,11 +440,12 @@ class Service(BaseService):
                         input_id=input_id,
                     ),
                 )
+            )
+
+        return commands
 
     async def send(self):
         """Send output, handle portal commands."""
         game = self.parent
-        data = game.data
-        with data.engine.session.begin():
-            await self.send_output(0)
-            await game.send_portal_commands()
+        await self.send_output(0)
+        await game.send_portal_commands()
@@ -0,0 +1,312 @@
+# Copyright (c) 2021, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Outbound queue, to write to a single connection without blocking others.
+
+Each Telnet session owns an `Outbound` queue.  Messages are added
+to the queue without waiting and a writer task (one per session)
+sends them in batches, waiting for the connection to accept
+the data before sending more.  A slow client will therefore only
+delay its own output, not the output of other sessions.
+
+When a client doesn't read fast enough, the queue grows.  Two
+watermarks (high and low) decide when the queue is considered
+too large and when it has become small enough again.  What to do
+when the queue goes over the high watermark depends on the policy:
+
+- "drop": new messages are dropped until the queue
+  goes under the high watermark again.
+- "coalesce": the oldest messages are dropped to bring the queue
+  down to the low watermark, the most recent output is kept.
+- "disconnect": messages are kept, but if the queue remains over
+  the high watermark for more than `timeout` seconds,
+  the connection is closed.
+
+Output can also be compressed (see `service.mccp`): once compression
+has started, each batch of messages is compressed and flushed
+before being written.  Watermarks apply to uncompressed sizes.
+
+"""
+
+import asyncio
+from collections import deque
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from tools.logging import Logger
+
+if TYPE_CHECKING:
+    from service.mccp import Compressor
+
+POLICIES = ("drop", "coalesce", "disconnect")
+
+
+class Outbound:
+
+    """Queue of outgoing messages for a single connection."""
+
+    def __init__(
+        self,
+        writer: asyncio.StreamWriter,
+        logger: Logger,
+        name: str = "",
+        high: int = 65536,
+        low: int = 16384,
+        policy: str = "disconnect",
+        timeout: float = 30,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown outbound policy: {policy!r}")
+
+        self.writer = writer
+        self.logger = logger
+        self.name = name
+        self.high = high
+        self.low = min(low, high)
+        self.policy = policy
+        self.timeout = timeout
+        self.messages = deque()
+        self.depth = 0
+        self.dropped = 0
+        self.over_since = None
+        self.closing = False
+        self.ready = asyncio.Event()
+        self.task = None
+        self.watchdog = None
+        self.compressor = None
+        self.prefix = b""
+
+    def __repr__(self):
+        return (
+            f"<Outbound {self.name}: {len(self.messages)} messages, "
+            f"{self.depth} bytes, {self.dropped} dropped>"
+        )
+
+    @property
+    def over(self) -> bool:
+        """Return whether the queue is over the high watermark."""
+        return self.over_since is not None
+
+    def start(self) -> None:
+        """Start the writer task."""
+        if self.task is None:
+            self.task = asyncio.create_task(self.write_forever())
+
+    def start_compression(
+        self, compressor: "Compressor", header: bytes = b""
+    ) -> None:
+        """Compress the messages queued from now on.
+
+        The messages already in the queue are sent uncompressed,
+        followed by `header`.
+
+        Args:
+            compressor (Compressor): the compressor to use.
+            header (bytes, optional): the uncompressed data to send
+                    just before the compressed data.
+
+        """
+        if self.compressor is not None:
+            return
+
+        self.prefix += b"".join(self.messages) + header
+        self.messages.clear()
+        self.depth = 0
+        self.compressor = compressor
+        self.ready.set()
+
+    def stop_compression(self) -> None:
+        """Stop compressing messages.
+
+        The messages already in the queue are compressed and
+        the compressed stream is ended.  Messages queued afterward
+        are sent uncompressed.
+
+        """
+        if (compressor := self.compressor) is None:
+            return
+
+        self.prefix += compressor.finish(b"".join(self.messages))
+        self.messages.clear()
+        self.depth = 0
+        self.compressor = None
+        self.ready.set()
+
+    def put(self, message: bytes) -> bool:
+        """Add a message to the queue, without waiting.
+
+        Args:
+            message (bytes): the message to send.
+
+        Returns:
+            queued (bool): whether the message was added to the queue.
+                    A message can be dropped if the connection is
+                    closing or if the queue is too large.
+
+        """
+        if self.closing:
+            return False
+
+        size = len(message)
+        if self.depth + size > self.high:
+            if self.policy == "drop":
+                self.dropped += 1
+                self._mark_over()
+                return False
+
+            self.messages.append(message)
+            self.depth += size
+            if self.policy == "coalesce":
+                self._coalesce()
+            else:
+                self._mark_over()
+        else:
+            self.messages.append(message)
+            self.depth += size
+
+        self.ready.set()
+        return True
+
+    async def close(self, timeout: float = 5) -> None:
+        """Stop accepting messages and send the remaining ones.
+
+        Args:
+            timeout (float): the maximum number of seconds to wait
+                    for the remaining messages to be sent.
+
+        """
+        self.closing = True
+        self.ready.set()
+        if self.watchdog:
+            self.watchdog.cancel()
+            self.watchdog = None
+
+        task = self.task
+        if task is None or task is asyncio.current_task():
+            return
+
+        try:
+            await asyncio.wait_for(task, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+
+    async def write_forever(self) -> None:
+        """Send queued messages until the queue is closed."""
+        writer = self.writer
+        while True:
+            if not self.messages and not self.prefix:
+                if self.closing:
+                    return
+
+                await self.ready.wait()
+                self.ready.clear()
+                continue
+
+            chunk = b"".join(self.messages)
+            self.messages.clear()
+            self.depth = 0
+            if chunk and (compressor := self.compressor) is not None:
+                chunk = compressor.compress(chunk)
+
+            if self.prefix:
+                chunk = self.prefix + chunk
+                self.prefix = b""
+
+            try:
+                writer.write(chunk)
+                await writer.drain()
+            except asyncio.CancelledError:
+                raise
+            except (ConnectionError, RuntimeError):
+                self.logger.debug(
+                    f"outbound {self.name}: the connection was lost."
+                )
+                self.closing = True
+                self.messages.clear()
+                self.depth = 0
+                writer.transport.abort()
+                return
+
+            if self.depth <= self.low:
+                self._clear_over()
+
+    def _mark_over(self) -> None:
+        """The queue just went over the high watermark."""
+        if self.over_since is not None:
+            return
+
+        self.over_since = monotonic()
+        self.logger.debug(
+            f"outbound {self.name}: over the high watermark "
+            f"({self.depth} bytes)."
+        )
+        if self.policy == "disconnect":
+            loop = asyncio.get_running_loop()
+            self.watchdog = loop.call_later(self.timeout, self._check_slow)
+
+    def _clear_over(self) -> None:
+        """The queue is back under the low watermark."""
+        self.over_since = None
+        if self.watchdog:
+            self.watchdog.cancel()
+            self.watchdog = None
+
+    def _coalesce(self) -> None:
+        """Drop the oldest messages to go back to the low watermark."""
+        messages = self.messages
+        while self.depth > self.low and len(messages) > 1:
+            self.depth -= len(messages.popleft())
+            self.dropped += 1
+
+        self._mark_over()
+
+    def _check_slow(self) -> None:
+        """Disconnect if the queue stayed over the high watermark."""
+        self.watchdog = None
+        if self.over_since is None or self.closing:
+            return
+
+        elapsed = monotonic() - self.over_since
+        if elapsed < self.timeout:
+            loop = asyncio.get_running_loop()
+            self.watchdog = loop.call_later(
+                self.timeout - elapsed, self._check_slow
+            )
+            return
+
+        self.logger.warning(
+            f"outbound {self.name}: disconnecting a slow client "
+            f"({self.depth} bytes queued for {elapsed:.0f} seconds)."
+        )
+        self.closing = True
+        self.messages.clear()
+        self.depth = 0
+        self.writer.transport.abort()
+        if self.task:
+            self.task.cancel()
@@ -324,6 +324,8 @@ class Service(BaseService):
                 session.ip_address,
                 session.ago,
                 session.secured,
+                session.outbound.depth,
+                session.outbound.dropped,
             )
 
         await crux.answer(origin, dict(sessions=sessions))
@@ -30,17 +30,29 @@
 """Telnet server."""
 
 import asyncio
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from io import BytesIO
 from itertools import count
 from ssl import create_default_context, Purpose
-from telnetlib import IAC, AYT
+from telnetlib import AYT, DO, DONT, IAC, SB, SE, WILL, WONT
 from typing import Union
 from uuid import UUID, uuid4
+import zlib
+
+from dynaconf import settings
 
 from service.base import BaseService
 from service.cmd import CmdMixin
+from service.mccp import (
+    Compression,
+    Compressor,
+    Decompressor,
+    MCCP2,
+    MCCP3,
+    TelnetParser,
+)
+from service.outbound import Outbound
 from service.ssl_cert import save_cert
 
 
@@ -58,6 +70,14 @@ class Service(CmdMixin, BaseService):
     Telnet server (listening on port 4001).  Both are handled in
     the same way, since the implementation remains similar in both cases.
 
+    Each session has its own outbound queue and writer task (see
+    `service.outbound`), so a client that doesn't read its output
+    fast enough will not delay the output sent to other clients.
+
+    Output and input can be compressed (MCCP2 and MCCP3, see
+    `service.mccp`), if the client accepts it.  Other Telnet
+    options are refused.
+
     """
 
     name = "telnet"
@@ -67,11 +87,11 @@ class Service(CmdMixin, BaseService):
         self.serving_task = None
         self.serving_ssl_task = None
         self.sessions = {}
-        self.writing_lock = asyncio.Lock()
         self.buffers = {}
         self.CRUX = None
         self.stats = []
         self.input_id = count(1)
+        self.compressed = {"raw": 0, "compressed": 0}
 
     async def setup(self):
         """Set the Telnet servers up."""
@@ -97,6 +117,9 @@ class Service(CmdMixin, BaseService):
 
     async def cleanup(self):
         """Clean the service up before shutting down."""
+        for session in tuple(self.sessions.values()):
+            await session.outbound.close(timeout=1)
+
         if self.serving_task:
             self.serving_task.cancel()
         if self.serving_ssl_task:
@@ -217,6 +240,9 @@ class Service(CmdMixin, BaseService):
         loop = asyncio.get_running_loop()
         loop.call_later(60, asyncio.create_task, self.send_AYT(session_id))
         session = await self.new_session(session_id, reader, writer, ssl, addr)
+        if session.compression.offered:
+            session.outbound.put(IAC + WILL + MCCP2 + IAC + WILL + MCCP3)
+
         self.logger.info(
             f"telnet{'(ssl)' if ssl else ''}: connection "
             f"from {addr}: new session {session_id}"
@@ -226,6 +252,8 @@ class Service(CmdMixin, BaseService):
             await self.read_input(session)
         except asyncio.CancelledError:
             pass
+        finally:
+            await session.outbound.close()
 
     async def read_input(self, session: "Session"):
         """Enter an asynchronous loop to read input from `reader`."""
@@ -258,7 +286,7 @@ class Service(CmdMixin, BaseService):
                 await self.error_read(session)
                 return
 
-            buffer.write(data)
+            buffer.write(self.parse_input(session, data))
 
             # Process full lines, placing incomplete lines in the buffer.
             buffer.seek(0)
@@ -283,6 +311,130 @@ class Service(CmdMixin, BaseService):
             buffer.truncate()
             buffer.write(unprocessed)
 
+    def parse_input(self, session: "Session", data: bytes) -> bytes:
+        """Decompress input and handle the Telnet commands it contains.
+
+        Args:
+            session (Session): the session sending the input.
+            data (bytes): the data read from the client.
+
+        Returns:
+            text (bytes): the text sent by the client, without
+                    Telnet commands.
+
+        """
+        compression = session.compression
+        text = b""
+        while data:
+            rest = b""
+            if (decompressor := compression.decompressor) is not None:
+                try:
+                    data, rest = decompressor.decompress(data)
+                except zlib.error:
+                    self.logger.warning(
+                        f"telnet: invalid compressed input from "
+                        f"{session.uuid}, ignoring it."
+                    )
+                    compression.decompressor = None
+                    break
+
+                if rest is None:
+                    rest = b""
+                else:
+                    # The client stopped compressing its input.
+                    compression.decompressor = None
+
+            parsed, commands, compressed = session.parser.feed(data)
+            text += parsed
+            for command, option, payload in commands:
+                self.negotiate(session, command, option, payload)
+
+            data = compressed + rest
+
+        return text
+
+    def negotiate(
+        self, session: "Session", command: bytes, option: bytes, payload: bytes
+    ) -> None:
+        """Answer a Telnet command sent by the client.
+
+        Args:
+            session (Session): the session sending the command.
+            command (bytes): the command (`DO`, `WILL`, `SB`...).
+            option (bytes): the option, if any.
+            payload (bytes): the sub-negotiation payload, if any.
+
+        """
+        compression = session.compression
+        outbound = session.outbound
+        if command == DO:
+            if option == MCCP2 and compression.offered:
+                if compression.compressor is None:
+                    compressor = Compressor(settings.TELNET_COMPRESSION_LEVEL)
+                    compression.compressor = compressor
+                    outbound.start_compression(
+                        compressor, IAC + SB + MCCP2 + IAC + SE
+                    )
+            elif option == MCCP3 and compression.offered:
+                compression.input_accepted = True
+            else:
+                outbound.put(IAC + WONT + option)
+        elif command == DONT:
+            if option == MCCP2 and compression.compressor is not None:
+                self._record_compression(compression.compressor)
+                compression.compressor = None
+                outbound.stop_compression()
+            elif option == MCCP3:
+                compression.input_accepted = False
+        elif command == WILL:
+            outbound.put(IAC + DONT + option)
+        elif command == SB and option == MCCP3:
+            if compression.input_accepted and compression.decompressor is None:
+                compression.decompressor = Decompressor()
+
+    def get_compression_stats(self) -> dict[str, int | float]:
+        """Return statistics about output compression.
+
+        Returns:
+            stats (dict): the number of sessions currently compressing
+                    their output, the number of bytes before and after
+                    compression and the compression ratio (compressed
+                    size divided by raw size).
+
+        """
+        raw = self.compressed["raw"]
+        compressed = self.compressed["compressed"]
+        sessions = 0
+        for session in self.sessions.values():
+            if (compressor := session.compression.compressor) is not None:
+                sessions += 1
+                raw += compressor.raw
+                compressed += compressor.compressed
+
+        return {
+            "sessions": sessions,
+            "raw": raw,
+            "compressed": compressed,
+            "ratio": compressed / raw if raw else 1.0,
+        }
+
+    def _record_compression(self, compressor: Compressor) -> None:
+        """Add the bytes compressed by a session to the totals."""
+        self.compressed["raw"] += compressor.raw
+        self.compressed["compressed"] += compressor.compressed
+        compressor.raw = compressor.compressed = 0
+
+    def _forget_session(self, session_id: UUID) -> None:
+        """Remove a session, keeping its compression statistics."""
+        session = self.sessions.pop(session_id, None)
+        if session and (compressor := session.compression.compressor):
+            self.logger.debug(
+                f"telnet: session {session_id} output compressed "
+                f"from {compressor.raw} to {compressor.compressed} bytes "
+                f"({compressor.ratio:.1%})"
+            )
+            self._record_compression(compressor)
+
     async def send_AYT(self, session_id: UUID) -> None:
         """Send AYT Telnet query to the specified session every 60 seconds.
 
@@ -291,14 +443,10 @@ class Service(CmdMixin, BaseService):
 
         """
         while session := self.sessions.get(session_id):
-            try:
-                async with self.writing_lock:
-                    session.writer.write(IAC + AYT)
-                    await session.writer.drain()
-            except ConnectionError:
-                await self.error_read(session)
+            if session.outbound.closing:
                 break
 
+            session.outbound.put(IAC + AYT)
             await asyncio.sleep(60)
 
     async def error_read(self, session: "Session"):
@@ -314,7 +462,7 @@ class Service(CmdMixin, BaseService):
                 "disconnect_session",
                 dict(session_id=session.uuid),
             )
-        self.sessions.pop(session.uuid, None)
+        self._forget_session(session.uuid)
 
     async def new_session(
         self,
@@ -332,6 +480,15 @@ class Service(CmdMixin, BaseService):
             writer (StreamWriter): the session writer.
 
         """
+        outbound = Outbound(
+            writer,
+            self.logger,
+            name=str(session_id),
+            high=settings.TELNET_HIGH_WATERMARK,
+            low=settings.TELNET_LOW_WATERMARK,
+            policy=settings.TELNET_SLOW_POLICY,
+            timeout=settings.TELNET_SLOW_TIMEOUT,
+        )
         session = Session(
             uuid=session_id,
             creation=datetime.utcnow(),
@@ -339,8 +496,11 @@ class Service(CmdMixin, BaseService):
             writer=writer,
             secured=ssl,
             ip_address=ip_address,
+            outbound=outbound,
+            compression=Compression(offered=settings.TELNET_COMPRESSION),
         )
         self.sessions[session_id] = session
+        outbound.start()
         self.logger.debug(f"telnet: new connection, session ID {session_id}")
         writer = self.parent.game_writer
         if writer:
@@ -366,11 +526,11 @@ class Service(CmdMixin, BaseService):
         """
         session = self.sessions.get(session_id)
         if session and session.writer:
-            async with self.writing_lock:
-                self.logger.debug(f"Diconnecting session ID {session.uuid}.")
-                session.writer.close()
-                await session.writer.wait_closed()
-        self.sessions.pop(session_id, None)
+            self.logger.debug(f"Diconnecting session ID {session.uuid}.")
+            await session.outbound.close()
+            session.writer.close()
+            await session.writer.wait_closed()
+        self._forget_session(session_id)
 
     async def send_input(self, session: "Session", command: bytes):
         """Called when an input line was sent by the client."""
@@ -398,7 +558,9 @@ class Service(CmdMixin, BaseService):
                     str, encode it using the default encoding
                     in the settings.
 
-        Should this method fail, the session will be disconnected.
+        The message is added to the session's outbound queue and
+        this method returns without waiting for it to be sent.  Should
+        the connection fail, the session will be disconnected.
 
         """
         if isinstance(message, str):
@@ -414,13 +576,7 @@ class Service(CmdMixin, BaseService):
 
         session = self.sessions.get(session_id)
         if session:
-            try:
-                async with self.writing_lock:
-                    session.writer.write(message)
-                    await session.writer.drain()
-            except ConnectionError:
-                await self.error_read(session)
-                return
+            session.outbound.put(message)
 
 
 @dataclass(frozen=True)
@@ -434,6 +590,9 @@ class Session:
     writer: asyncio.StreamWriter
     secured: bool
     ip_address: str
+    outbound: Outbound
+    compression: Compression = field(default_factory=Compression)
+    parser: TelnetParser = field(default_factory=TelnetParser)
 
     @property
     def ago(self) -> str:
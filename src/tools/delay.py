@@ -47,15 +47,31 @@ delay.schedule(5, print, "After five seconds")
 # when the game is back up, even later.
 ```
 
+All delays are driven by a single scheduler (see `SCHEDULER`).
+Delays are placed in buckets of `resolution` seconds (the ticks
+of the scheduler).  A single task sleeps until the next tick
+with delays and runs all the delays of this tick at once
+(the game service runs them in a single transaction).
+
+Persistence is write-ahead: new, rescheduled or cancelled delays
+are written to the database in batches, at most `flush_interval`
+seconds after they have been scheduled (or as soon as a tick runs),
+so that a crash doesn't lose them.  A delay that expires before
+being written is never written at all.
+
 """
 
 import asyncio
 from datetime import datetime, timedelta
+import heapq
 from inspect import iscoroutine
 from itertools import count
+from math import ceil, floor
 import pickle
 from typing import Any, Callable, Dict, Sequence
 
+from dynaconf import settings
+
 from data.delay import Delay as DbDelay
 from tools.logging.frequent import FrequentLogger
 
@@ -63,81 +79,124 @@ from tools.logging.frequent import FrequentLogger
 logger = FrequentLogger("delays")
 logger.setup()
 
+# Constants
+EPOCH = datetime(1970, 1, 1)
+
 
 class Delay:
 
     """Class to store delays, and persist them if necessary.
 
-    When a delay is created, an asynchronous task is created
-    to execute it.  Should the game be stopped, this delay will
-    be stored in the database (see `data.delay`) which will restore
-    and schedule a task again when the game is up and running once more.
+    When a delay is created, it is added to the scheduler, which will
+    execute it when it expires.  The delay is also written
+    to the database (see `data.delay`), so the game can restore
+    and schedule it again if it is restarted or stopped.
 
     Delays are just callable that can be pickled, which includes
     top-level functions and instance methods.
 
     """
 
-    _delays = {}
     _current_id = count(1)
-    _game_service = None
 
     def __init__(
         self,
         id: int,
-        expire_at: timedelta,
-        callback: Callable,
+        expire_at: datetime,
+        callback: Callable | None,
         args: Sequence[Any],
         kwargs: Dict[str, Any],
+        pickled: bytes | None = None,
     ):
         self.id = id
         self.expire_at = expire_at
         self.callback = callback
         self.args = args
         self.kwargs = kwargs
+        self.pickled = pickled
         self.persistent = None
-        type(self)._delays[self.id] = self
+        self.tick = None
 
     def __repr__(self):
+        if self.callback is None:
+            return f"<Delay {self.id} (not loaded)>"
+
         arguments = ", ".join(str(arg) for arg in self.args)
         arguments += ", ".join(
             f"{key}={value}" for key, value in self.kwargs.items()
         )
         return f"<Delay {self.id} {self.callback}({arguments})"
 
-    def _schedule(self):
-        seconds = (self.expire_at - datetime.utcnow()).total_seconds()
-        seconds = 0 if seconds < 0 else seconds
-        loop = asyncio.get_event_loop()
-        loop.call_later(seconds, type(self)._game_service.call_delay, self)
-        logger.debug(f"Preparing to call {self!r} in {seconds} seconds")
+    @property
+    def scheduled(self) -> bool:
+        """Return whether this delay is waiting to be executed."""
+        return SCHEDULER.delays.get(self.id) is self
+
+    def cancel(self) -> bool:
+        """Cancel this delay, so it will not be executed.
+
+        Returns:
+            cancelled (bool): whether the delay was cancelled.  A delay
+                    that has already been executed (or cancelled)
+                    can't be cancelled.
+
+        """
+        cancelled = SCHEDULER.remove(self)
+        if cancelled:
+            SCHEDULER.forget(self)
+            logger.debug(f"Cancelling {self!r}")
+
+        return cancelled
+
+    def reschedule(self, delay: int | float | timedelta) -> None:
+        """Change the moment when this delay will be executed.
+
+        Args:
+            delay (int or float or timedelta): the new delay,
+                    from now, as seconds or a `datetime.timedelta`.
+
+        Raises:
+            ValueError: the delay has already been executed
+                    (or cancelled), or the delay is invalid.
+
+        """
+        expire_at = self._get_expire_at(delay)
+        if not SCHEDULER.remove(self):
+            raise ValueError(f"{self!r} isn't scheduled anymore")
+
+        self.expire_at = expire_at
+        SCHEDULER.add(self, write=True)
+        logger.debug(f"Rescheduling {self!r} at {expire_at}")
+
+    def _load(self):
+        """Unpickle the callback and its arguments, if needed."""
+        if self.callback is None:
+            self.callback, self.args, self.kwargs = pickle.loads(self.pickled)
 
     def _execute(self):
         """Prepare to execute."""
         try:
+            self._load()
             result = self.callback(*self.args, **self.kwargs)
         except Exception:
-            logger.exception("An error occurred while executing {self!r}")
+            logger.exception(f"An error occurred while executing {self!r}")
+            SCHEDULER.forget(self)
         else:
             if iscoroutine(result):
                 # Schedule it asynchronously
                 loop = asyncio.get_event_loop()
                 loop.create_task(self._async_execute(result))
             else:
-                type(self)._delays.pop(self.id, None)
-                if persistent := self.persistent:
-                    DbDelay.delete(persistent)
+                SCHEDULER.forget(self)
 
     async def _async_execute(self, coroutine):
         """Execute the delayed action."""
         try:
             await coroutine
         except Exception:
-            logger.exception("An error occurred while executing {self!r}")
+            logger.exception(f"An error occurred while executing {self!r}")
         finally:
-            type(self)._delays.pop(self.id, None)
-            if persistent := self.persistent:
-                DbDelay.delete(persistent)
+            SCHEDULER.forget(self)
 
     @classmethod
     def schedule(cls, *args, **kwargs):
@@ -168,38 +227,359 @@ class Delay:
         callback = args.pop(0)
 
         # Check the time.
-        expire_at = datetime.utcnow()
-        if isinstance(delay, (int, float)):
-            expire_at += timedelta(seconds=delay)
-        elif isinstance(delay, timedelta):
-            expire_at += delay
-        else:
-            raise ValueError(f"invalid delay: {delay!r}")
+        expire_at = cls._get_expire_at(delay)
 
         # Check that the callable can be pickled.
         args = tuple(args)
         try:
-            cls._pickled(callback, args, kwargs)
-        except TypeError:
+            pickled = cls._pickled(callback, args, kwargs)
+        except (TypeError, AttributeError, pickle.PicklingError):
             raise ValueError("cannot pickle this callback")
 
         # Create and return a delay.
         id = next(cls._current_id)
-        obj = cls(id, expire_at, callback, args, kwargs)
-        obj._schedule()
+        obj = cls(id, expire_at, callback, args, kwargs, pickled)
+        SCHEDULER.add(obj, write=True)
+        logger.debug(f"Preparing to call {obj!r} at {expire_at}")
+        return obj
+
+    @classmethod
+    def restore(cls, persistent: DbDelay) -> "Delay":
+        """Schedule a delay stored in the database.
+
+        The callback isn't unpickled until the delay is executed.
+
+        Args:
+            persistent (data.delay.Delay): the stored delay.
+
+        Returns:
+            delay (Delay): the scheduled delay.
+
+        """
+        id = next(cls._current_id)
+        obj = cls(id, persistent.expire_at, None, (), {}, persistent.pickled)
+        obj.persistent = persistent
+        SCHEDULER.add(obj)
         return obj
 
+    @classmethod
+    def count(cls) -> int:
+        """Return the number of scheduled delays."""
+        return len(SCHEDULER)
+
+    @staticmethod
+    def _get_expire_at(delay: int | float | timedelta) -> datetime:
+        """Return the expiration date of a delay from now.
+
+        Args:
+            delay (int or float or timedelta): the delay.
+
+        Raises:
+            ValueError: the delay is invalid.
+
+        """
+        expire_at = datetime.utcnow()
+        if isinstance(delay, (int, float)):
+            expire_at += timedelta(seconds=delay)
+        elif isinstance(delay, timedelta):
+            expire_at += delay
+        else:
+            raise ValueError(f"invalid delay: {delay!r}")
+
+        return expire_at
+
     @classmethod
     def _pickled(cls, callback, args, kwargs):
         return pickle.dumps((callback, args, kwargs))
 
     @classmethod
     def persist(cls):
-        """Persist all non-persistent delays."""
-        for id, delay in cls._delays.items():
+        """Write all pending delays in the database."""
+        SCHEDULER.flush()
+
+
+class Scheduler:
+
+    """Scheduler, to execute all delays from a single task.
+
+    Delays are grouped in buckets, one bucket per tick (a tick
+    lasts `resolution` seconds).  A heap keeps the ticks that
+    have a bucket, so the next tick to run is always known.
+    Delays are never executed before they expire, but can
+    be executed up to `resolution` seconds later.
+
+    The scheduler also keeps the writes to perform in the database:
+    delays to create or update and stored delays to remove.
+    These writes are performed by `flush`, which should be called
+    in a transaction.
+
+    """
+
+    def __init__(
+        self,
+        resolution: float | None = None,
+        flush_interval: float | None = None,
+    ):
+        self.resolution = resolution
+        self.flush_interval = flush_interval
+        self.delays = {}
+        self.buckets = {}
+        self.ticks = []
+        self.to_write = {}
+        self.to_delete = []
+        self.flush_at = None
+        self.runner = None
+        self.task = None
+        self.wakeup = None
+
+    def __len__(self):
+        return len(self.delays)
+
+    def add(self, delay: Delay, write: bool = False) -> None:
+        """Add a delay to the scheduler.
+
+        Args:
+            delay (Delay): the delay to add.
+            write (bool): whether to write this delay
+                    in the database.
+
+        """
+        self._setup()
+        delay.tick = tick = self._get_tick(delay.expire_at)
+        if (bucket := self.buckets.get(tick)) is None:
+            bucket = self.buckets[tick] = {}
+            heapq.heappush(self.ticks, tick)
+
+        bucket[delay.id] = delay
+        self.delays[delay.id] = delay
+        if write:
+            self.to_write[delay.id] = delay
+            self._plan_flush()
+
+        self._wake()
+
+    def remove(self, delay: Delay) -> bool:
+        """Remove a delay from the scheduler, without executing it.
+
+        Args:
+            delay (Delay): the delay to remove.
+
+        Returns:
+            removed (bool): whether the delay was scheduled.
+
+        """
+        if self.delays.pop(delay.id, None) is None:
+            return False
+
+        bucket = self.buckets.get(delay.tick, {})
+        bucket.pop(delay.id, None)
+        if not bucket:
+            # The tick will be ignored when popped from the heap.
+            self.buckets.pop(delay.tick, None)
+
+        return True
+
+    def forget(self, delay: Delay) -> None:
+        """Forget about a delay that will not be executed again.
+
+        If the delay was written in the database, it will be removed
+        on the next flush.
+
+        Args:
+            delay (Delay): the delay to forget.
+
+        """
+        self.to_write.pop(delay.id, None)
+        if (persistent := delay.persistent) is not None:
+            delay.persistent = None
+            self.to_delete.append(persistent)
+            self._plan_flush()
+
+    def get_due(self, now: datetime | None = None) -> list[Delay]:
+        """Remove and return the delays that have expired.
+
+        Args:
+            now (datetime, optional): the current time.
+
+        Returns:
+            due (list of Delay): the delays to execute, in order.
+
+        """
+        self._setup()
+        now = datetime.utcnow() if now is None else now
+        current = floor((now - EPOCH).total_seconds() / self.resolution)
+        due = []
+        while self.ticks and self.ticks[0] <= current:
+            tick = heapq.heappop(self.ticks)
+            bucket = self.buckets.pop(tick, None)
+            if bucket:
+                due.extend(bucket.values())
+
+        for delay in due:
+            self.delays.pop(delay.id, None)
             if delay.persistent is None:
-                pickled = cls._pickled(
-                    delay.callback, delay.args, delay.kwargs
+                # The delay is executed before it has been written.
+                self.to_write.pop(delay.id, None)
+
+        return due
+
+    def get_timeout(self, now: datetime | None = None) -> float | None:
+        """Return the number of seconds before something has to be done.
+
+        Args:
+            now (datetime, optional): the current time.
+
+        Returns:
+            timeout (float or None): the number of seconds before
+                    the next tick with delays or the next flush,
+                    `None` if there's nothing to do.
+
+        """
+        self._setup()
+        now = datetime.utcnow() if now is None else now
+        moments = []
+        if self.ticks:
+            moments.append(
+                EPOCH + timedelta(seconds=self.ticks[0] * self.resolution)
+            )
+
+        if self.flush_at is not None:
+            moments.append(self.flush_at)
+
+        if not moments:
+            return None
+
+        return max((min(moments) - now).total_seconds(), 0)
+
+    def flush(self) -> None:
+        """Write the pending delays in the database.
+
+        This method should be called in a transaction.
+
+        """
+        for delay in self.to_write.values():
+            if (persistent := delay.persistent) is None:
+                delay.persistent = DbDelay.create(
+                    expire_at=delay.expire_at, pickled=delay.pickled
                 )
-                DbDelay.create(expire_at=delay.expire_at, pickled=pickled)
-                logger.debug(f"Persisting {delay!r} in the database.")
+            elif persistent.expire_at != delay.expire_at:
+                persistent.expire_at = delay.expire_at
+
+        for persistent in self.to_delete:
+            DbDelay.delete(persistent)
+
+        if self.to_write or self.to_delete:
+            logger.debug(
+                f"Wrote {len(self.to_write)} delays and removed "
+                f"{len(self.to_delete)} delays from the database"
+            )
+
+        self.to_write.clear()
+        self.to_delete.clear()
+        self.flush_at = None
+
+    def run_once(self, now: datetime | None = None) -> None:
+        """Execute the expired delays and write the pending ones.
+
+        Pending writes are only flushed with expired delays or
+        when the flush interval has elapsed.  If a runner was given
+        to `start`, it is called with the list of delays to execute.
+        Otherwise, the delays are executed and the pending writes
+        flushed here.
+
+        Args:
+            now (datetime, optional): the current time.
+
+        """
+        now = datetime.utcnow() if now is None else now
+        due = self.get_due(now)
+        flush_at = self.flush_at
+        if not due and (flush_at is None or flush_at > now):
+            return
+
+        if self.runner is not None:
+            self.runner(due)
+        else:
+            for delay in due:
+                delay._execute()
+            self.flush()
+
+    def start(self, runner: Callable[[list[Delay]], None]) -> None:
+        """Start the scheduler task.
+
+        Args:
+            runner (callable): the function to call with the list of
+                    delays to execute.  It should execute them
+                    and then call `flush`, all in one transaction.
+
+        """
+        self.runner = runner
+        if self.task is None:
+            self.wakeup = asyncio.Event()
+            self.task = asyncio.create_task(self.run_forever())
+
+    def stop(self) -> None:
+        """Stop the scheduler task."""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+        self.wakeup = None
+        self.runner = None
+
+    def clear(self) -> None:
+        """Forget all delays, without executing or writing them."""
+        self.delays.clear()
+        self.buckets.clear()
+        self.ticks.clear()
+        self.to_write.clear()
+        self.to_delete.clear()
+        self.flush_at = None
+
+    async def run_forever(self) -> None:
+        """Execute delays when they expire."""
+        while True:
+            timeout = self.get_timeout()
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+                self.wakeup.clear()
+
+            try:
+                self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("An error occurred while running delays")
+
+    def _get_tick(self, moment: datetime) -> int:
+        """Return the tick at which a delay expiring at `moment` runs."""
+        return ceil((moment - EPOCH).total_seconds() / self.resolution)
+
+    def _plan_flush(self) -> None:
+        """Make sure a flush will happen soon."""
+        self._setup()
+        if self.flush_at is None:
+            self.flush_at = datetime.utcnow() + timedelta(
+                seconds=self.flush_interval
+            )
+            self._wake()
+
+    def _wake(self) -> None:
+        """Wake the scheduler task up, so it computes its timeout again."""
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def _setup(self) -> None:
+        """Read the settings, if needed."""
+        if self.resolution is None:
+            self.resolution = settings.DELAY_RESOLUTION
+
+        if self.flush_interval is None:
+            self.flush_interval = settings.DELAY_FLUSH_INTERVAL
+
+
+SCHEDULER = Scheduler()
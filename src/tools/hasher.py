@@ -0,0 +1,173 @@
+# Copyright (c) 2022, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Password hasher, to hash passwords outside of the event loop.
+
+Hashing a password (see `data.account.Account.hash_password`) is
+designed to be slow: it takes tens of milliseconds.  Running it
+in the game loop would freeze the game for all players during this time.
+The password hasher runs these functions in a small pool of worker
+threads (`hashlib` releases the GIL while hashing) behind an
+awaitable API:
+
+```python
+from tools.hasher import HASHER
+hashed = await HASHER.run(Account.hash_password, "password")
+```
+
+At most `workers` functions run at the same time.  Other calls
+wait in the event loop, at most `max_pending` calls can be waiting
+or running: a flood of calls beyond this limit is rejected with
+`PasswordHasherBusy`.  The time spent waiting for a worker is recorded
+(see `get_stats`).
+
+Contexts usually don't call the password hasher directly,
+but use `Context.suspend` instead.
+
+"""
+
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import time
+from typing import Any, Callable
+
+from dynaconf import settings
+
+
+class PasswordHasherBusy(Exception):
+
+    """Exception raised when too many calls are pending."""
+
+
+class PasswordHasher:
+
+    """Run password hashing functions in worker threads."""
+
+    def __init__(
+        self, workers: int | None = None, max_pending: int | None = None
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = None
+        self.semaphore = None
+        self.pending = 0
+        self.stats = Counter()
+
+    async def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Run the function in a worker thread and return its result.
+
+        Args:
+            function (callable): the function to call.
+
+        Additional positional arguments are sent to the function.
+
+        Returns:
+            result (Any): the function's result.
+
+        Raises:
+            PasswordHasherBusy: too many calls are pending already.
+
+        """
+        self._setup()
+        if self.pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise PasswordHasherBusy(
+                f"{self.pending} password hashing calls are pending"
+            )
+
+        self.pending += 1
+        self.stats["max_pending"] = max(
+            self.stats["max_pending"], self.pending
+        )
+        queued = time.perf_counter()
+        try:
+            async with self.semaphore:
+                waited = time.perf_counter() - queued
+                self.stats["calls"] += 1
+                self.stats["wait"] += waited
+                self.stats["max_wait"] = max(self.stats["max_wait"], waited)
+                loop = asyncio.get_running_loop()
+                begin = time.perf_counter()
+                try:
+                    return await loop.run_in_executor(
+                        self.executor, function, *args
+                    )
+                finally:
+                    self.stats["run"] += time.perf_counter() - begin
+        finally:
+            self.pending -= 1
+
+    def get_stats(self) -> dict[str, int | float]:
+        """Return the password hasher statistics.
+
+        Returns:
+            stats (dict): the number of calls, of rejected calls,
+                    the number of calls currently pending and the
+                    maximum reached, the average and maximum time
+                    waited for a worker and the average run time
+                    (all times in seconds).
+
+        """
+        calls = self.stats["calls"]
+        return {
+            "calls": calls,
+            "rejected": self.stats["rejected"],
+            "pending": self.pending,
+            "max_pending": self.stats["max_pending"],
+            "avg_wait": self.stats["wait"] / calls if calls else 0,
+            "max_wait": self.stats["max_wait"],
+            "avg_run": self.stats["run"] / calls if calls else 0,
+        }
+
+    def shutdown(self) -> None:
+        """Shut the worker threads down."""
+        if (executor := self.executor) is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+            self.semaphore = None
+
+    def _setup(self) -> None:
+        """Create the worker threads, if needed."""
+        if self.executor is not None:
+            return
+
+        if self.workers is None:
+            self.workers = settings.PASSWORD_HASH_WORKERS
+
+        if self.max_pending is None:
+            self.max_pending = settings.PASSWORD_HASH_MAX_PENDING
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="password-hasher"
+        )
+        self.semaphore = asyncio.Semaphore(self.workers)
+
+
+HASHER = PasswordHasher()
@@ -53,6 +53,7 @@ class FrequentLogger(Logger):
             cls_batch=Hour,
             format=FILE_FORMAT,
             output_file=f"{self.name}.log",
+            buffered=True,
         )
         self.add_handler(
             Stream, Level.INFO, format=STREAM_FORMAT, output=sys.stdout
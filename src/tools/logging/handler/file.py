@@ -36,6 +36,7 @@ from pathlib import Path
 from tools.logging.handler.abc import BaseHandler
 from tools.logging.level import Level
 from tools.logging.message import Message
+from tools.logging.writer import WRITER
 
 DEFAULT_FORMAT = (
     "{year}-{month}-{day} {hour}:{minute}:{second},{ms} [{level}] {message}"
@@ -44,15 +45,29 @@ DEFAULT_FORMAT = (
 
 class File(BaseHandler):
 
-    """File handler."""
+    """File handler.
+
+    By default, each message is written to the file right away
+    (the file is opened, written to and closed).  A buffered file
+    handler sends its messages to the background writer instead
+    (see `tools.logging.writer`), which writes them in batches,
+    in a dedicated thread.
+
+    """
 
     def init(self):
         """Initialize the logger."""
         self.format = DEFAULT_FORMAT if self.format is None else self.format
         self.output_file = None
         self.encoding = "utf-8"
-
-    def setup(self, output_file: str | Path, encoding: str = "utf-8") -> None:
+        self.buffered = False
+
+    def setup(
+        self,
+        output_file: str | Path,
+        encoding: str = "utf-8",
+        buffered: bool = False,
+    ) -> None:
         """Configure the file handler.
 
         Args:
@@ -60,6 +75,9 @@ class File(BaseHandler):
                     will be selected from the logger's option "directory",
                     if set.
             encoding (str, optional): the encoding.  By default, utf-8.
+            buffered (bool, optional): if True, send messages to
+                    the background writer instead of writing them
+                    right away.
 
         """
         directory = self.logger.directory
@@ -81,6 +99,7 @@ class File(BaseHandler):
         # Check that the encoding exists.
         _ = codecs.lookup(encoding)
         self.encoding = encoding
+        self.buffered = buffered
 
     def log(self, level: Level | None, message: str | Message) -> None:
         """Log a message.
@@ -92,6 +111,10 @@ class File(BaseHandler):
         If the message is a `Message` object, format it.
 
         """
+        if self.buffered and self.output_file:
+            WRITER.add(self.output_file, self.encoding, self.format, message)
+            return
+
         if isinstance(message, Message):
             message = self.format.format(**asdict(message))
 
@@ -29,9 +29,12 @@
 
 """Logger module."""
 
+from collections import deque
+from contextlib import contextmanager
 from pathlib import Path
+import sys
 import traceback
-from typing import Any, Type
+from typing import Any, Iterator, Type
 
 from tools.logging.abc import LoggerMetaclass
 from tools.logging.batch.abc import BaseBatch
@@ -44,10 +47,14 @@ class Logger(metaclass=LoggerMetaclass):
 
     """A logger class, containing handlers."""
 
+    # Number of released groups to keep for post-mortem.
+    recent_size = 16
+
     def __init__(self, name: str, directory: str | Path | None = None):
         self.name = name
         self.handlers = []
         self.sub_loggers = {}
+        self.recent_groups = deque(maxlen=self.recent_size)
         self.cap_level = None
         self.delayed = []
         self.init(directory=directory)
@@ -107,6 +114,20 @@ class Logger(metaclass=LoggerMetaclass):
         if directory := self.directory:
             directory.mkdir(parents=True, exist_ok=True)
 
+    def accepts(self, level: Level) -> bool:
+        """Return whether a message of this level would be logged.
+
+        This can be used to avoid building messages nobody will read.
+
+        Args:
+            level (Level): the message level.
+
+        Returns:
+            accepted (bool): whether a handler accepts this level.
+
+        """
+        return any(handler.level <= level for handler in self.handlers)
+
     def log(self, level: Level, message: str):
         """Log the message if a handler is found."""
         message = Message.create_for(self, level, message)
@@ -132,7 +153,9 @@ class Logger(metaclass=LoggerMetaclass):
         """Create or return a sub-logger for this identifier.
 
         This is useful to group messages but not log them, unless the group
-        ends with an error.
+        ends with an error.  The group is kept until it is released
+        (see `release`), the `grouped` context manager releases it
+        automatically.
 
         Args:
             identifier (any): the identifier.
@@ -152,6 +175,87 @@ class Logger(metaclass=LoggerMetaclass):
 
         return sub
 
+    @contextmanager
+    def grouped(
+        self, identifier: Any, cap_level: Level = Level.WARNING
+    ) -> Iterator["Logger"]:
+        """Group messages for the duration of a `with` block.
+
+        If an exception is raised inside the block, all grouped
+        messages are logged.  In any case, the group is released
+        when the block ends.
+
+        Args:
+            identifier (any): the identifier.
+            cap_level (level, optional): the level at which messages
+                    should be logged and not grouped anymore.
+
+        """
+        group = self.group(identifier, cap_level)
+        try:
+            yield group
+        except Exception:
+            self.release(identifier, flush=True)
+            raise
+        else:
+            self.release(identifier)
+
+    def release(self, identifier: Any, flush: bool = False) -> None:
+        """Release the group of this identifier.
+
+        The group's messages are not logged, unless `flush` is set,
+        but the last released groups are kept for post-mortem
+        (see `log_recent_groups`).
+
+        Args:
+            identifier (any): the identifier.
+            flush (bool): whether to log the group's messages.
+
+        """
+        if (sub := self.sub_loggers.pop(identifier, None)) is None:
+            return
+
+        if flush:
+            sub.log_group()
+        elif sub.delayed:
+            self.recent_groups.append((identifier, sub.delayed))
+
+    def log_recent_groups(self) -> None:
+        """Log the messages of the last released groups."""
+        recent = list(self.recent_groups)
+        self.recent_groups.clear()
+        for identifier, messages in recent:
+            for handler in self.handlers:
+                handler.always_log(f"-- Group {identifier}:")
+                for message in messages:
+                    handler.always_log(message)
+
+    def group_stats(self) -> dict[str, int]:
+        """Return the number and estimated size of the groups.
+
+        Returns:
+            stats (dict): the number of groups currently open,
+                    the number of messages they contain, the number
+                    of released groups kept for post-mortem,
+                    the number of messages they contain and the
+                    estimated size of all these messages, in bytes.
+
+        """
+        groups = [sub.delayed for sub in self.sub_loggers.values()]
+        recent = [messages for _, messages in self.recent_groups]
+        size = sum(
+            _get_size(message)
+            for messages in groups + recent
+            for message in messages
+        )
+        return {
+            "groups": len(groups),
+            "messages": sum(len(messages) for messages in groups),
+            "recent_groups": len(recent),
+            "recent_messages": sum(len(messages) for messages in recent),
+            "size": size,
+        }
+
     def delay_log(self, level: Level, message: str) -> None:
         """Delay log unless the message is WARNING or greater.
 
@@ -174,3 +278,18 @@ class Logger(metaclass=LoggerMetaclass):
                 if handler.can_process(level, message):
                     handler.process(level, message)
         self.delayed.clear()
+
+
+def _get_size(obj: Any, depth: int = 2) -> int:
+    """Return the estimated size of an object and its attributes."""
+    size = sys.getsizeof(obj)
+    if depth == 0:
+        return size
+
+    if (attrs := getattr(obj, "__dict__", None)) is not None:
+        values = attrs.values()
+    else:
+        slots = getattr(type(obj), "__slots__", ())
+        values = [getattr(obj, slot, None) for slot in slots]
+
+    return size + sum(_get_size(value, depth - 1) for value in values)
@@ -0,0 +1,387 @@
+# Copyright (c) 2023, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Background writer, used by buffered file handlers.
+
+Writing to a file on every log message means opening, writing and
+closing the file, synchronously, in the thread that logs.  Buffered
+file handlers only add their messages to the background writer's
+buffer, a bounded queue in memory.  A dedicated thread writes
+this buffer to the log files at regular intervals, or as soon as
+enough messages are waiting, and keeps the log files open
+between writes.
+
+Messages are formatted in the writer thread, not by the caller.
+
+Policies:
+    The `flush_interval` (in seconds) and `flush_size` (in messages)
+    decide when the buffer is written.  The `fsync` policy decides
+    whether to force the data to disk:
+        "never": let the operating system decide (the default).
+        "interval": force the data to disk every `fsync_interval` seconds.
+        "always": force the data to disk after each write.
+
+    When the buffer is full (it can contain `capacity` messages),
+    the oldest messages are dropped and counted.  Logging never
+    blocks the caller.
+
+The writer thread is started when the first message is added.
+While it runs, only this thread touches the open files.
+Call `WRITER.close()` to write the remaining messages and close
+the files (this is done automatically when the program exits).
+
+"""
+
+import atexit
+from collections import Counter, deque
+from dataclasses import asdict
+import os
+from pathlib import Path
+import threading
+import time
+
+from tools.logging.message import Message
+
+FSYNC_POLICIES = ("never", "interval", "always")
+
+
+class BackgroundWriter:
+
+    """Write log messages to files in a dedicated thread."""
+
+    def __init__(
+        self,
+        capacity: int = 100_000,
+        flush_interval: float = 0.5,
+        flush_size: int = 1_000,
+        fsync: str = "never",
+        fsync_interval: float = 5,
+    ):
+        self.capacity = capacity
+        self.buffer = deque()
+        self.condition = threading.Condition()
+        self.files = {}
+        self.stats = Counter()
+        self.thread = None
+        self.closed = False
+        self.flush_requested = False
+        self.configure(
+            flush_interval=flush_interval,
+            flush_size=flush_size,
+            fsync=fsync,
+            fsync_interval=fsync_interval,
+        )
+        self.last_fsync = time.monotonic()
+
+    def configure(
+        self,
+        flush_interval: float | None = None,
+        flush_size: int | None = None,
+        fsync: str | None = None,
+        fsync_interval: float | None = None,
+    ) -> None:
+        """Change the writer policies.
+
+        Args:
+            flush_interval (float, optional): the maximum number of
+                    seconds a message can wait before being written.
+            flush_size (int, optional): the number of waiting messages
+                    that triggers a write.
+            fsync (str, optional): the fsync policy, "never",
+                    "interval" or "always".
+            fsync_interval (float, optional): the number of seconds
+                    between two fsync calls, if the fsync policy
+                    is "interval".
+
+        """
+        if fsync is not None and fsync not in FSYNC_POLICIES:
+            raise ValueError(f"invalid fsync policy: {fsync!r}")
+
+        if flush_interval is not None:
+            self.flush_interval = flush_interval
+        if flush_size is not None:
+            self.flush_size = flush_size
+        if fsync is not None:
+            self.fsync = fsync
+        if fsync_interval is not None:
+            self.fsync_interval = fsync_interval
+
+    def add(
+        self,
+        path: Path,
+        encoding: str,
+        format: str,
+        message: str | Message,
+    ) -> None:
+        """Add a message to the buffer, without waiting.
+
+        Args:
+            path (Path): the path of the file to write to.
+            encoding (str): the file encoding.
+            format (str): the format string, used if the message
+                    is a `Message` object.
+            message (str or Message): the message to write.
+
+        """
+        with self.condition:
+            if self.closed and self.thread is None:
+                self.stats.update(
+                    self._write([(path, encoding, format, message)])
+                )
+                self.stats["queued"] += 1
+                self.stats["written"] += 1
+                return
+
+            if len(self.buffer) >= self.capacity:
+                self.buffer.popleft()
+                self.stats["dropped"] += 1
+
+            self.buffer.append((path, encoding, format, message))
+            self.stats["queued"] += 1
+            self.stats["max_depth"] = max(
+                self.stats["max_depth"], len(self.buffer)
+            )
+
+            if self.thread is None:
+                self._start()
+            elif len(self.buffer) >= self.flush_size:
+                self.condition.notify()
+
+    def flush(self, timeout: float = 5) -> None:
+        """Write all waiting messages and wait for them to be written.
+
+        Args:
+            timeout (float): the maximum number of seconds to wait.
+
+        """
+        with self.condition:
+            if self.thread is None or not self.thread.is_alive():
+                entries = list(self.buffer)
+                self.buffer.clear()
+                self.stats.update(self._write(entries))
+                self.stats["written"] += len(entries)
+                return
+
+            expected = self.stats["queued"] - self.stats["dropped"]
+            self.flush_requested = True
+            self.condition.notify()
+            self.condition.wait_for(
+                lambda: self.stats["written"] >= expected, timeout
+            )
+
+    def close(self, timeout: float = 5) -> None:
+        """Write all waiting messages, close the files, stop the thread.
+
+        The writer can still be used after being closed: messages
+        will then be written synchronously.  If the thread is still
+        writing when `timeout` expires, it is left to write the
+        remaining messages and close the files itself.
+
+        Args:
+            timeout (float): the maximum number of seconds to wait
+                    for the thread to stop.
+
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+            thread = self.thread
+
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+        with self.condition:
+            if self.thread is not None and self.thread.is_alive():
+                return
+
+            entries = list(self.buffer)
+            self.buffer.clear()
+            self.stats.update(self._write(entries))
+            self.stats["written"] += len(entries)
+            self._close_files()
+            self.thread = None
+
+    def get_stats(self) -> dict[str, int]:
+        """Return the writer statistics.
+
+        Returns:
+            stats (dict): the number of messages queued, written
+                    and dropped (because the buffer was full), the
+                    number of messages currently waiting (depth),
+                    the maximum depth reached, the number of
+                    writes, fsync calls and errors.
+
+        """
+        with self.condition:
+            stats = {
+                key: self.stats[key]
+                for key in (
+                    "queued",
+                    "written",
+                    "dropped",
+                    "max_depth",
+                    "writes",
+                    "fsyncs",
+                    "errors",
+                )
+            }
+            stats["depth"] = len(self.buffer)
+
+        return stats
+
+    def _start(self) -> None:
+        """Start the writer thread."""
+        self.thread = threading.Thread(
+            target=self._run, name="log-writer", daemon=True
+        )
+        self.thread.start()
+
+    def _run(self) -> None:
+        """Write messages until the writer is closed."""
+        condition = self.condition
+        while True:
+            with condition:
+                condition.wait_for(self._should_write, self.flush_interval)
+                entries = list(self.buffer)
+                self.buffer.clear()
+                self.flush_requested = False
+
+            # Write outside of the lock, so logging is never blocked.
+            # The statistics are only updated with the lock held.
+            stats = self._write(entries)
+            stats.update(self._sync())
+
+            with condition:
+                self.stats.update(stats)
+                self.stats["written"] += len(entries)
+                condition.notify_all()
+                if self.closed and not self.buffer:
+                    self._close_files()
+                    self.thread = None
+                    return
+
+    def _should_write(self) -> bool:
+        """Return whether the buffer should be written right away."""
+        return (
+            self.closed
+            or self.flush_requested
+            or len(self.buffer) >= self.flush_size
+        )
+
+    def _close_files(self) -> None:
+        """Force the data to disk if needed and close the files."""
+        self.stats.update(self._sync(force=self.fsync != "never"))
+        for file in self.files.values():
+            file.close()
+        self.files.clear()
+
+    def _write(self, entries: list[tuple]) -> Counter:
+        """Write the entries to their files.
+
+        Args:
+            entries (list): the entries to write, each a tuple
+                    (path, encoding, format, message).
+
+        Returns:
+            stats (Counter): the number of writes and errors,
+                    to add to the writer statistics.
+
+        """
+        stats = Counter()
+        if not entries:
+            return stats
+
+        by_file = {}
+        for path, encoding, format, message in entries:
+            if isinstance(message, Message):
+                try:
+                    message = format.format(**asdict(message))
+                except (KeyError, IndexError, ValueError):
+                    stats["errors"] += 1
+                    message = message.message
+
+            if not message.endswith("\n"):
+                message = message + "\n"
+
+            by_file.setdefault((path, encoding), []).append(message)
+
+        for (path, encoding), messages in by_file.items():
+            try:
+                file = self.files.get(path)
+                if file is None or file.closed:
+                    file = path.open("a", encoding=encoding)
+                    self.files[path] = file
+
+                file.write("".join(messages))
+                file.flush()
+            except OSError:
+                stats["errors"] += 1
+                self.files.pop(path, None)
+
+        stats["writes"] += 1
+        return stats
+
+    def _sync(self, force: bool = False) -> Counter:
+        """Force the data to disk, following the fsync policy.
+
+        Args:
+            force (bool): if True, force the data to disk
+                    regardless of the policy.
+
+        Returns:
+            stats (Counter): the number of fsync calls and errors,
+                    to add to the writer statistics.
+
+        """
+        stats = Counter()
+        now = time.monotonic()
+        if not force:
+            if self.fsync == "never":
+                return stats
+
+            if (
+                self.fsync == "interval"
+                and now - self.last_fsync < self.fsync_interval
+            ):
+                return stats
+
+        for file in tuple(self.files.values()):
+            if not file.closed:
+                try:
+                    os.fsync(file.fileno())
+                except OSError:
+                    stats["errors"] += 1
+
+        self.last_fsync = now
+        stats["fsyncs"] += 1
+        return stats
+
+
+WRITER = BackgroundWriter()
+atexit.register(WRITER.close)
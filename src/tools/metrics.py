@@ -0,0 +1,140 @@
+# Copyright (c) 2022, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Metrics about the input processed by the game, for load testing.
+
+Recording metrics is off by default.  When it is started
+(see the `metrics` admin command), the game records, for each input:
+
+- the time between the moment the portal received the input
+  (the `sent` stamp given by the Telnet service) and the moment
+  the game sent the resulting output back to the portal;
+- the number of SQL statements sent to the database while processing
+  this input (including the statements sent on commit).
+
+The report is a dictionary which can be dumped as JSON.
+
+"""
+
+from collections import deque
+from datetime import datetime
+from math import ceil
+from time import perf_counter
+from typing import Any, Sequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from data.base.sql.engine import SqliteEngine
+
+
+class Metrics:
+
+    """Record latencies and SQL statements per input."""
+
+    def __init__(self, engine: "SqliteEngine", size: int = 100_000):
+        self.engine = engine
+        self.latencies = deque(maxlen=size)
+        self.statements = deque(maxlen=size)
+        self.inputs = 0
+        self.started = perf_counter()
+        engine.count_statements(True)
+
+    def __repr__(self):
+        return f"<Metrics {self.inputs} inputs>"
+
+    def get_statements(self) -> int:
+        """Return the number of statements sent so far."""
+        return self.engine.statements or 0
+
+    def record(self, sent: datetime, statements: int) -> None:
+        """Record an input whose output has just been sent.
+
+        Args:
+            sent (datetime): when the portal received this input.
+            statements (int): the number of statements sent
+                    before this input was processed
+                    (see `get_statements`).
+
+        """
+        self.inputs += 1
+        self.latencies.append((datetime.utcnow() - sent).total_seconds())
+        self.statements.append(self.get_statements() - statements)
+
+    def stop(self) -> None:
+        """Stop counting statements."""
+        self.engine.count_statements(False)
+
+    def report(self) -> dict[str, Any]:
+        """Return the metrics recorded so far.
+
+        Returns:
+            report (dict): the number of inputs, the throughput (inputs
+                    per second), latencies (in milliseconds) and
+                    SQL statements per input.
+
+        """
+        duration = perf_counter() - self.started
+        latencies = sorted(self.latencies)
+        statements = sorted(self.statements)
+        return {
+            "inputs": self.inputs,
+            "duration": round(duration, 3),
+            "throughput": round(self.inputs / duration, 2) if duration else 0,
+            "latency_ms": {
+                "p50": round(get_percentile(latencies, 50) * 1000, 3),
+                "p99": round(get_percentile(latencies, 99) * 1000, 3),
+                "max": round(max(latencies, default=0) * 1000, 3),
+            },
+            "statements": {
+                "total": sum(statements),
+                "per_input": (
+                    round(sum(statements) / len(statements), 2)
+                    if statements
+                    else 0
+                ),
+                "p99": get_percentile(statements, 99),
+            },
+        }
+
+
+def get_percentile(values: Sequence[float], percent: float) -> float:
+    """Return the percentile of sorted values (nearest rank).
+
+    Args:
+        values (sequence): the sorted values.
+        percent (float): the percentile, between 0 and 100.
+
+    Returns:
+        percentile (float): the value, 0 if there's no value.
+
+    """
+    if not values:
+        return 0
+
+    rank = max(ceil(percent / 100 * len(values)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
@@ -0,0 +1,152 @@
+"""Micro-benchmark of the command argument parser.
+
+Run it from the `src` directory:
+
+    python ../tests/benchmarks/args.py [--number 2000]
+
+Each case is parsed with the cached parse plan and with a plan
+compiled again for every call, to show the cost of expansion.
+
+"""
+
+import argparse
+from pathlib import Path
+import sys
+from timeit import timeit
+
+sys.path.insert(0, str(Path(__file__).parents[2] / "src"))
+
+from command.args import CommandArgs  # noqa: E402
+
+
+class Thing:
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+    def get_name_for(self, character, quantity):
+        return self.name
+
+
+class Locator:
+    def __init__(self, *names):
+        self.all_contents = [
+            (Thing(i, name), 1, None) for i, name in enumerate(names, 2)
+        ]
+
+
+class Versions:
+    def get_version(self, location_id):
+        return 0
+
+
+class Engine:
+    locator = Versions()
+
+
+class Room:
+    engine = Engine()
+
+    def __init__(self, *names):
+        self.id = 1
+        self.locator = Locator(*names)
+
+
+class Character:
+    id = 0
+    location = Room("red apple", "green apple", "sword", "shield")
+
+
+def number():
+    args = CommandArgs()
+    args.add_argument("number")
+    return args, "152"
+
+
+def word():
+    args = CommandArgs()
+    args.add_argument("word")
+    args.add_argument("text")
+    return args, "north a long description of the exit"
+
+
+def text():
+    args = CommandArgs()
+    args.add_argument("text")
+    return args, "hello everyone, how are you doing today? " * 4
+
+
+def search():
+    args = CommandArgs()
+    args.add_argument("number", optional=True, default=1)
+    search = args.add_argument("search")
+    search.search_in = "room"
+    return args, "2 apple"
+
+
+def options():
+    args = CommandArgs()
+    args.add_argument("word", dest="exit")
+    options = args.add_argument("options")
+    options.add_option("title", "t", default="A new room")
+    options.add_option("barcode", "b", default=None)
+    return args, "north title=A dark corridor barcode=corridor"
+
+
+def keyword():
+    args = CommandArgs()
+    args.add_argument("number", dest="first")
+    args.add_argument("keyword", "to", "for")
+    args.add_argument("number", dest="second")
+    return args, "15 to 20"
+
+
+def branch():
+    args = CommandArgs()
+    group = args.add_group("|")
+    group.add_branch(args.new("number", dest="unique"), run_in="one")
+    group.add_branch(
+        args.new("number", dest="first"),
+        args.new("keyword", "for"),
+        args.new("number", dest="second"),
+        run_in="two",
+    )
+    group.add_branch(
+        args.new("word", dest="name"),
+        args.new("text", dest="rest", optional=True),
+        run_in="three",
+    )
+    return args, "15 for 12"
+
+
+CASES = (number, word, text, search, options, keyword, branch)
+
+
+def run(number: int) -> None:
+    """Run all cases and print the results."""
+    character = Character()
+    print(f"{'case':<10} {'cached':>12} {'compiled':>12}")
+    for case in CASES:
+        args, string = case()
+        result = args.parse(character, string)
+        if not result:
+            raise ValueError(f"{case.__name__}: {result}")
+
+        cached = timeit(lambda: args.parse(character, string), number=number)
+
+        def uncached():
+            args.invalidate()
+            args.parse(character, string)
+
+        compiled = timeit(uncached, number=number)
+        print(
+            f"{case.__name__:<10} "
+            f"{cached / number * 1e6:>9.2f} us "
+            f"{compiled / number * 1e6:>9.2f} us"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    run(parser.parse_args().number)
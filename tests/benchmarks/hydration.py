@@ -0,0 +1,89 @@
+"""Benchmark of model hydration, with and without validation.
+
+Run it from the `src` directory:
+
+    python ../tests/benchmarks/hydration.py [--number 50000]
+
+Rooms are created, then loaded from the database (with an empty
+cache) through `Room.all()`, once with the trusted hydration
+used by the engine (`ModelMetaclass.hydrate`) and once with
+full Pydantic validation (`Room(**attrs)`), as before.  The time
+spent building the models alone (from their stored attributes,
+without querying the database) is shown separately.
+
+"""
+
+import argparse
+from pathlib import Path
+import sys
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).parents[2] / "src"))
+
+from data.base import handle_data  # noqa: E402
+from data.base.abc import ModelMetaclass  # noqa: E402
+from data.room import Room  # noqa: E402
+
+
+def validate(cls, attrs, deferred=()):
+    """Build the model with full validation."""
+    return cls(**attrs)
+
+
+def load(engine) -> float:
+    """Load all rooms with an empty cache, return the time it took."""
+    engine.cache.clear()
+    started = perf_counter()
+    with engine.session.begin():
+        Room.all()
+
+    return perf_counter() - started
+
+
+def build(engine, rooms, hydrate) -> float:
+    """Build the rooms from their attributes, return the time it took."""
+    attributes = [dict(room.__dict__) for room in rooms]
+    started = perf_counter()
+    with engine._load_model():
+        for attrs in attributes:
+            hydrate(Room, attrs)
+
+    return perf_counter() - started
+
+
+def run(number: int) -> None:
+    """Create the rooms and load them both ways."""
+    engine = handle_data(memory=True)
+    try:
+        with engine.session.begin():
+            rooms = [
+                Room.create(barcode=f"room_{i}", title=f"Room {i}")
+                for i in range(number)
+            ]
+
+        hydrate = ModelMetaclass.hydrate
+        results = [("trusted", load(engine), build(engine, rooms, hydrate))]
+        ModelMetaclass.hydrate = validate
+        try:
+            results.append(
+                ("validated", load(engine), build(engine, rooms, validate))
+            )
+        finally:
+            ModelMetaclass.hydrate = hydrate
+
+        print(
+            f"{'hydration':<12} {'load':>10} {'build':>10} {'per model':>12}"
+        )
+        for name, loaded, built in results:
+            print(
+                f"{name:<12} {loaded:>8.3f} s {built:>8.3f} s "
+                f"{built / number * 1e6:>9.1f} us"
+            )
+    finally:
+        engine.destroy()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=50_000)
+    run(parser.parse_args().number)
@@ -0,0 +1,78 @@
+"""Benchmark of model iteration, as a list and by chunk.
+
+Run it from the `src` directory:
+
+    python ../tests/benchmarks/iteration.py [--number 50000]
+
+Rooms are created, then read from the database (with an empty
+cache) through `Room.all()`, `Room.iter_select()` and
+`Room.iter_select(retain=False)`.  The time and the peak memory
+allocated during the iteration (as measured by `tracemalloc`)
+are shown, along with the number of models the cache still
+retains afterward.
+
+"""
+
+import argparse
+import gc
+from pathlib import Path
+import sys
+from time import perf_counter
+import tracemalloc
+
+sys.path.insert(0, str(Path(__file__).parents[2] / "src"))
+
+from data.base import handle_data  # noqa: E402
+from data.room import Room  # noqa: E402
+
+
+def measure(engine, iterate) -> tuple[float, int, int]:
+    """Go over all rooms, return the time, peak memory and retained."""
+    engine.cache.clear()
+    gc.collect()
+    tracemalloc.start()
+    started = perf_counter()
+    with engine.session.begin():
+        for room in iterate():
+            room.title
+
+    elapsed = perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+    return elapsed, peak, engine.cache.stats()["retained"]
+
+
+def run(number: int, chunk_size: int) -> None:
+    """Create the rooms and go over them in different ways."""
+    engine = handle_data(memory=True)
+    try:
+        with engine.session.begin():
+            for i in range(number):
+                Room.create(barcode=f"room_{i}", title=f"Room {i}")
+
+        ways = (
+            ("all", Room.all),
+            ("iter", lambda: Room.iter_select(chunk_size=chunk_size)),
+            (
+                "iter/release",
+                lambda: Room.iter_select(chunk_size=chunk_size, retain=False),
+            ),
+        )
+        print(f"{'iteration':<14} {'time':>10} {'peak':>12} {'retained':>10}")
+        for name, iterate in ways:
+            elapsed, peak, retained = measure(engine, iterate)
+            print(
+                f"{name:<14} {elapsed:>8.3f} s {peak / 2**20:>9.1f} MB "
+                f"{retained:>10}"
+            )
+    finally:
+        engine.destroy()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=50_000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+    run(args.number, args.chunk_size)
@@ -0,0 +1,86 @@
+"""Micro-benchmark of lazy property access.
+
+Run it from the `src` directory:
+
+    python ../tests/benchmarks/lazy_property.py [--number 100000]
+
+Lazy values are stored on the instance.  For comparison,
+the cost of hashing the instance (what a storage keyed by
+`hash((instance, attr))` would pay on each access) is also shown.
+Contexts are loaded to create a session, their log is written
+in a temporary directory.
+
+"""
+
+import argparse
+from pathlib import Path
+import sys
+from tempfile import TemporaryDirectory
+from timeit import timeit
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).parents[2] / "src"))
+
+from data.base import handle_data  # noqa: E402
+from data.direction import Direction  # noqa: E402
+from data.room import Room  # noqa: E402
+from data.session import Session  # noqa: E402
+from service.mudio import Service as MudIOService  # noqa: E402
+from tools.logging.frequent import FrequentLogger  # noqa: E402
+from tools.logging.writer import WRITER  # noqa: E402
+
+
+def setup(directory: str):
+    """Create a session, two rooms and an exit between them."""
+    logger = FrequentLogger("contexts")
+    logger.init(directory)
+    logger.setup()
+    mudio_service = MagicMock()
+    mudio_service.contexts = {}
+    with patch("service.mudio.ctx_logger", logger):
+        MudIOService.load_contexts(mudio_service)
+
+    WRITER.flush()
+    session = Session.create(
+        uuid=uuid4(),
+        context_path="connection.motd",
+        ip_address="127.0.0.1",
+        secured=False,
+    )
+    room = Room.create(barcode="bench", title="A room")
+    room.create_neighbor(Direction.EAST)
+    exits = room.exits
+    exit = exits.get(Direction.EAST)
+    return (
+        ("Session.context", session, "context"),
+        ("ExitHandler.commands", exits, "commands"),
+        ("Exit.destination", exit, "destination"),
+    )
+
+
+def run(number: int) -> None:
+    """Run all cases and print the results."""
+    engine = handle_data(memory=True)
+    try:
+        with TemporaryDirectory() as directory:
+            cases = setup(directory)
+
+        print(f"{'case':<22} {'lazy':>12} {'hash':>12}")
+        for name, instance, attr in cases:
+            getattr(instance, attr)
+            lazy = timeit(lambda: getattr(instance, attr), number=number)
+            hashed = timeit(lambda: hash((instance, attr)), number=number)
+            print(
+                f"{name:<22} "
+                f"{lazy / number * 1e9:>9.0f} ns "
+                f"{hashed / number * 1e9:>9.0f} ns"
+            )
+    finally:
+        engine.destroy()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=100_000)
+    run(parser.parse_args().number)
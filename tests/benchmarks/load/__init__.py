@@ -0,0 +1,19 @@
+"""Load-testing harness.
+
+Two scripts, both run from the `src` directory:
+
+1.  `world.py` builds a large synthetic world (rooms, exits, object
+    prototypes, objects and accounts) in the game database.
+    Run it while the game is stopped.
+2.  `swarm.py` connects many simulated Telnet clients to the running
+    portal, makes them log in and play a script of commands, and
+    reports latencies, throughput and SQL statements per command
+    as JSON.
+
+```
+python ../tests/benchmarks/load/world.py --rooms 2500 --accounts 50
+python launcher.py start
+python ../tests/benchmarks/load/swarm.py --clients 50 > run.json
+```
+
+"""
@@ -0,0 +1,195 @@
+"""Run a swarm of simulated Telnet clients against the game.
+
+Run it from the `src` directory, once the world has been built
+(see `world.py`) and the game has been started:
+
+    python ../tests/benchmarks/load/swarm.py [--clients 50] [--rounds 20]
+
+Each client logs into one of the `bench_*` accounts and plays the
+same script of commands, `rounds` times, waiting for the answer
+to each command and pausing `think` seconds between commands.
+The client-side latency is the time between sending a command
+and receiving the first byte of its answer.
+
+The first account (an administrator) is used as a probe: it starts
+recording metrics on the server before the swarm connects
+and stops recording after the swarm is done (see the `metrics`
+command).  The server metrics (latency from the portal to the
+output, SQL statements per command) are included in the report,
+printed as JSON.
+
+"""
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+import sys
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).parents[3] / "src"))
+
+from tools.metrics import get_percentile  # noqa: E402
+
+SCRIPT = "look,east,look,west,south,look,north,help"
+
+
+class Client:
+
+    """A simulated Telnet client."""
+
+    def __init__(self, host: str, port: int, quiet: float, timeout: float):
+        self.host = host
+        self.port = port
+        self.quiet = quiet
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.latencies = []
+
+    async def connect(self) -> None:
+        """Connect and wait for the welcome screen."""
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port
+        )
+        await self.read()
+
+    async def login(self, username: str, password: str) -> None:
+        """Log into the account and play the first character."""
+        for line in (username, password, "1"):
+            await self.send(line, record=False)
+
+    async def send(self, line: str, record: bool = True) -> str:
+        """Send a command and return its answer.
+
+        Args:
+            line (str): the command to send.
+            record (bool): whether to record the latency.
+
+        Returns:
+            answer (str): the answer, once the server has gone quiet.
+
+        Raises:
+            asyncio.TimeoutError: the server didn't answer in time.
+
+        """
+        self.writer.write(line.encode("utf-8") + b"\r\n")
+        await self.writer.drain()
+        sent = perf_counter()
+        first = await asyncio.wait_for(self.reader.read(65536), self.timeout)
+        if record:
+            self.latencies.append(perf_counter() - sent)
+
+        if not first:
+            raise ConnectionError("the server closed the connection")
+
+        return (first + await self.read()).decode("utf-8", errors="replace")
+
+    async def read(self) -> bytes:
+        """Read until the server remains quiet."""
+        received = b""
+        while True:
+            try:
+                data = await asyncio.wait_for(
+                    self.reader.read(65536), self.quiet
+                )
+            except asyncio.TimeoutError:
+                return received
+
+            if not data:
+                return received
+
+            received += data
+
+    async def close(self) -> None:
+        """Close the connection."""
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def play(
+    client: Client,
+    username: str,
+    args: argparse.Namespace,
+    script: list[str],
+) -> None:
+    """Connect a client, log in and play the script."""
+    await client.connect()
+    await client.login(username, args.password)
+    for _ in range(args.rounds):
+        for line in script:
+            await client.send(line)
+            await asyncio.sleep(args.think)
+
+    await client.close()
+
+
+def get_metrics(answer: str) -> dict:
+    """Extract the JSON report from the `metrics` command answer."""
+    start, end = answer.find("{"), answer.rfind("}")
+    if start < 0 or end < start:
+        return {"error": answer.strip()}
+
+    return json.loads(answer[start : end + 1])
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Run the swarm and return the report."""
+    script = [line.strip() for line in args.script.split(",")]
+    probe = Client(args.host, args.port, args.quiet, args.timeout)
+    await probe.connect()
+    await probe.login("bench_1", args.password)
+    await probe.send("metrics start", record=False)
+
+    clients = [
+        Client(args.host, args.port, args.quiet, args.timeout)
+        for _ in range(args.clients)
+    ]
+    started = perf_counter()
+    results = await asyncio.gather(
+        *(
+            play(client, f"bench_{i}", args, script)
+            for i, client in enumerate(clients, start=2)
+        ),
+        return_exceptions=True,
+    )
+    duration = perf_counter() - started
+    server = get_metrics(await probe.send("metrics stop", record=False))
+    await probe.close()
+
+    errors = [repr(result) for result in results if result is not None]
+    latencies = sorted(
+        latency for client in clients for latency in client.latencies
+    )
+    return {
+        "clients": args.clients,
+        "script": script,
+        "rounds": args.rounds,
+        "errors": errors,
+        "commands": len(latencies),
+        "duration": round(duration, 3),
+        "throughput": round(len(latencies) / duration, 2),
+        "latency_ms": {
+            "p50": round(get_percentile(latencies, 50) * 1000, 3),
+            "p99": round(get_percentile(latencies, 99) * 1000, 3),
+            "max": round(max(latencies, default=0) * 1000, 3),
+        },
+        "server": server,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4000)
+    parser.add_argument("--clients", type=int, default=49)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--script", default=SCRIPT)
+    parser.add_argument("--think", type=float, default=0.1)
+    parser.add_argument("--quiet", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--password", default="benchmark")
+    print(json.dumps(asyncio.run(run(parser.parse_args())), indent=2))
@@ -0,0 +1,268 @@
+"""Build a large synthetic world for load testing.
+
+Run it from the `src` directory, while the game is stopped:
+
+    python ../tests/benchmarks/load/world.py [--rooms 2500] [--accounts 50]
+
+Rooms are created as a grid (through `Room.create_neighbor` for
+the first row and column, the other links are added through
+`ExitHandler.add`).  Objects are created from a set of prototypes
+(`ObjectPrototype.create_object_in`) and spread in the rooms.
+More prototypes and objects are defined in a blueprint, which is
+applied like the world blueprints at startup (the blueprint is only
+kept in memory, it isn't written in the `world` directory).
+Accounts named `bench_1`, `bench_2`... each have a player character
+placed in the grid.  The first player is an administrator (the swarm
+uses it to record metrics).  A summary is printed as JSON.
+
+"""
+
+import argparse
+import json
+from math import isqrt
+from pathlib import Path
+from random import Random
+import sys
+from time import perf_counter
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parents[3] / "src"))
+
+from dynaconf import settings  # noqa: E402
+
+from data.account import Account  # noqa: E402
+from data.base import handle_data  # noqa: E402
+from data.base.blueprint import Blueprint, logger  # noqa: E402
+from data.direction import Direction  # noqa: E402
+from data.player import Player  # noqa: E402
+from data.prototype.object import ObjectPrototype  # noqa: E402
+from data.room import Room  # noqa: E402
+from tools.logging import Level, Stream  # noqa: E402
+
+PREFIX = "bench"
+ADJECTIVES = ("red", "old", "shiny", "heavy", "small", "wooden", "rusty")
+NOUNS = ("apple", "sword", "lantern", "book", "coin", "rope", "helmet")
+
+
+def build_rooms(number: int) -> list[list[Room]]:
+    """Build a grid of rooms linked by exits.
+
+    Args:
+        number (int): the approximate number of rooms.
+
+    Returns:
+        grid (list of list of Room): the rooms, by row.
+
+    """
+    width = max(isqrt(number), 1)
+    height = max(number // width, 1)
+    start = Room.get_or_none(barcode=settings.START_ROOM)
+    if start is None:
+        start = Room.create(barcode=settings.START_ROOM, title="The start")
+
+    origin = Room.get_or_none(barcode=f"{PREFIX}_0_0")
+    if origin is not None:
+        raise ValueError("the world has already been built")
+
+    origin = Room.create(barcode=f"{PREFIX}_0_0", title="A crossroad")
+    start.exits.add(Direction.DOWN, origin, "down")
+    grid = []
+    for row in range(height):
+        if row == 0:
+            first = origin
+        else:
+            first = grid[row - 1][0].create_neighbor(
+                Direction.SOUTH, barcode=f"{PREFIX}_{row}_0"
+            )
+
+        rooms = [first]
+        for column in range(1, width):
+            rooms.append(
+                rooms[-1].create_neighbor(
+                    Direction.EAST,
+                    barcode=f"{PREFIX}_{row}_{column}",
+                    title=f"A plain ({row}, {column})",
+                )
+            )
+
+        if row > 0:
+            for above, room in zip(grid[row - 1][1:], rooms[1:]):
+                above.exits.add(Direction.SOUTH, room, "south")
+
+        grid.append(rooms)
+
+    return grid
+
+
+def build_prototypes(number: int) -> list[ObjectPrototype]:
+    """Create object prototypes.
+
+    Args:
+        number (int): the number of prototypes.
+
+    Returns:
+        prototypes (list of ObjectPrototype): the prototypes.
+
+    """
+    prototypes = []
+    for i in range(number):
+        adjective = ADJECTIVES[i % len(ADJECTIVES)]
+        noun = NOUNS[(i // len(ADJECTIVES)) % len(NOUNS)]
+        prototypes.append(
+            ObjectPrototype.create(
+                barcode=f"{PREFIX}_{i}",
+                singular=f"a {adjective} {noun}",
+                plural=f"{adjective} {noun}s",
+            )
+        )
+
+    return prototypes
+
+
+def build_objects(
+    number: int, prototypes: list[ObjectPrototype], rooms: list[Room], rng
+) -> None:
+    """Spread objects in the rooms.
+
+    Args:
+        number (int): the number of objects.
+        prototypes (list of ObjectPrototype): the prototypes to use.
+        rooms (list of Room): the rooms in which to place objects.
+        rng (Random): the random generator.
+
+    """
+    for _ in range(number):
+        rng.choice(prototypes).create_object_in(rng.choice(rooms))
+
+
+def build_blueprint(
+    number: int, objects: int, rooms: list[Room], rng
+) -> Blueprint:
+    """Create object prototypes and objects through a blueprint.
+
+    Args:
+        number (int): the number of prototypes.
+        objects (int): the number of objects.
+        rooms (list of Room): the rooms in which to place objects.
+        rng (Random): the random generator.
+
+    Returns:
+        blueprint (Blueprint): the applied blueprint.
+
+    """
+    documents = []
+    for i in range(number):
+        adjective = ADJECTIVES[-1 - i % len(ADJECTIVES)]
+        noun = NOUNS[-1 - (i // len(ADJECTIVES)) % len(NOUNS)]
+        documents.append(
+            {
+                "type": "object",
+                "barcode": f"{PREFIX}_bp_{i}",
+                "singular": f"a {adjective} {noun}",
+                "plural": f"{adjective} {noun}s",
+                "objects": [],
+            }
+        )
+
+    for i in range(objects):
+        rng.choice(documents)["objects"].append(
+            {
+                "barcode": f"{PREFIX}_bp_object_{i}",
+                "location": rng.choice(rooms).barcode,
+            }
+        )
+
+    # Created objects are still logged in the world log file,
+    # but not on the standard output, where the summary is printed.
+    for handler in logger.handlers:
+        if isinstance(handler, Stream):
+            handler.level = Level.WARNING
+
+    name = PREFIX
+    blueprint = Blueprint(name, Path("../world") / f"{name}.yml", documents)
+    Blueprint.service = SimpleNamespace(blueprints={name: blueprint})
+    blueprint.apply()
+    blueprint.complete()
+    return blueprint
+
+
+def build_accounts(
+    number: int, password: str, rooms: list[Room], rng
+) -> list[str]:
+    """Create accounts, each with a player character.
+
+    Args:
+        number (int): the number of accounts.
+        password (str): the password of all accounts.
+        rooms (list of Room): the rooms in which to place players.
+        rng (Random): the random generator.
+
+    Returns:
+        usernames (list of str): the account usernames.
+
+    """
+    hashed = Account.hash_password(password)
+    usernames = []
+    for i in range(1, number + 1):
+        username = f"{PREFIX}_{i}"
+        account = Account.create(username=username, hashed_password=hashed)
+        player = Player.create(name=f"Bench{i}", account=account)
+        account.players.append(player)
+        player.permissions.add("admin" if i == 1 else "player")
+        player.room = rng.choice(rooms)
+        usernames.append(username)
+
+    return usernames
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Build the world and return a summary."""
+    rng = Random(args.seed)
+    engine = handle_data()
+    summary = {}
+    try:
+        with engine.session.begin():
+            started = perf_counter()
+            grid = build_rooms(args.rooms)
+            rooms = [room for row in grid for room in row]
+            summary["rooms"] = len(rooms)
+            summary["rooms_seconds"] = round(perf_counter() - started, 3)
+
+            started = perf_counter()
+            prototypes = build_prototypes(args.prototypes)
+            build_objects(args.objects, prototypes, rooms, rng)
+            summary["prototypes"] = len(prototypes)
+            summary["objects"] = args.objects
+            summary["objects_seconds"] = round(perf_counter() - started, 3)
+
+            started = perf_counter()
+            build_blueprint(
+                args.blueprint_prototypes, args.blueprint_objects, rooms, rng
+            )
+            summary["blueprint_prototypes"] = args.blueprint_prototypes
+            summary["blueprint_objects"] = args.blueprint_objects
+            summary["blueprint_seconds"] = round(perf_counter() - started, 3)
+
+            started = perf_counter()
+            usernames = build_accounts(
+                args.accounts, args.password, rooms, rng
+            )
+            summary["accounts"] = len(usernames)
+            summary["accounts_seconds"] = round(perf_counter() - started, 3)
+    finally:
+        engine.close()
+
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=2500)
+    parser.add_argument("--prototypes", type=int, default=49)
+    parser.add_argument("--objects", type=int, default=5000)
+    parser.add_argument("--blueprint-prototypes", type=int, default=7)
+    parser.add_argument("--blueprint-objects", type=int, default=500)
+    parser.add_argument("--accounts", type=int, default=50)
+    parser.add_argument("--password", default="benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    print(json.dumps(run(parser.parse_args()), indent=2))
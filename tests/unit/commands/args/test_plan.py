@@ -0,0 +1,58 @@
+from command.args import CommandArgs
+from command.args.helpers import has_entirely_parsed
+from command.args.result import Result
+
+
+def test_plan_is_cached():
+    """The parse plan is only compiled once."""
+    args = CommandArgs()
+    args.add_argument("number")
+    plan = args.compile()
+    assert args.compile() is plan
+    assert args.parse(None, "5").number == 5
+    assert args.compile() is plan
+
+
+def test_plan_invalidated_by_new_argument():
+    """Adding an argument invalidates the parse plan."""
+    args = CommandArgs()
+    args.add_argument("number")
+    assert not args.parse(None, "5 apples")
+    args.add_argument("word")
+    result = args.parse(None, "5 apples")
+    assert result.number == 5
+    assert result.word == "apples"
+
+
+def test_plan_invalidated_by_new_branch():
+    """Adding a branch to a group invalidates the parse plan."""
+    args = CommandArgs()
+    group = args.add_group("|")
+    group.add_branch(args.new("number", dest="first"), run_in="one")
+    assert not args.parse(None, "5 for 6")
+    group.add_branch(
+        args.new("number", dest="first"),
+        args.new("keyword", "for"),
+        args.new("number", dest="second"),
+        run_in="two",
+    )
+    result = args.parse(None, "5 for 6")
+    assert result._run_in == "two"
+    assert (result.first, result.second) == (5, 6)
+    result = args.parse(None, "5")
+    assert result._run_in == "one"
+
+
+def test_has_entirely_parsed():
+    """Check the coverage of the parsed string."""
+    string = "take 2 red apples"
+    assert has_entirely_parsed([Result(0, 17, string)], string, 0)
+    assert has_entirely_parsed(
+        [Result(7, 17, string), Result(0, 6, string)], string, 0
+    )
+    assert not has_entirely_parsed([Result(0, 6, string)], string, 0)
+    assert not has_entirely_parsed(
+        [Result(0, 6, string), Result(11, 17, string)], string, 0
+    )
+    assert has_entirely_parsed([Result(5, 6, string)], string, 5, 7)
+    assert has_entirely_parsed([], "   ", 0)
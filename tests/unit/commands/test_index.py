@@ -0,0 +1,136 @@
+from command.base import Command
+from command.index import CommandIndex
+
+
+class Permissions:
+    def __init__(self, *permissions):
+        self._permissions = set(permissions)
+
+    @property
+    def frozen(self):
+        return frozenset(self._permissions)
+
+    def has(self, permission):
+        return permission in self._permissions
+
+
+class Character:
+    def __init__(self, *permissions):
+        self.permissions = Permissions(*permissions)
+        self.subscribed = False
+
+
+class BaseCommand(Command):
+    permissions = ""
+
+
+class Look(BaseCommand):
+    name = "look"
+    alias = "l"
+
+
+class Lock(BaseCommand):
+    name = "lock"
+
+
+class Shutdown(BaseCommand):
+    name = "shutdown"
+    permissions = "admin"
+
+
+class Chat(BaseCommand):
+    name = "chat"
+
+    @classmethod
+    def can_run(cls, character):
+        return character.subscribed
+
+
+class Account(BaseCommand):
+    name = "account"
+
+
+class Password(BaseCommand):
+    name = "password"
+    parent = Account
+    global_alias = "passwd"
+
+
+class North(BaseCommand):
+    name = "north"
+    alias = "n"
+
+
+class Notes(BaseCommand):
+    name = "notes"
+
+
+def build(*commands):
+    index = CommandIndex()
+    index.build(commands)
+    return index
+
+
+def test_exact_and_prefix():
+    """Exact names win over prefixes, prefixes go by load order."""
+    index = build(Look, Lock)
+    character = Character()
+    assert index.match(character, "look") == (Look, " ", "", None)
+    assert index.match(character, "lock door") == (Lock, " ", "door", None)
+    assert index.match(character, "lo")[0] is Look
+    assert index.match(character, "loc")[0] is Lock
+    assert index.match(character, "l")[0] is Look
+    assert index.match(character, "unknown") is None
+
+
+def test_permission_views():
+    """Permission sets are cached as separate views."""
+    index = build(Look, Shutdown)
+    player = Character()
+    admin = Character("admin")
+    assert index.match(player, "shutdown") is None
+    assert index.match(admin, "shutdown")[0] is Shutdown
+    assert len(index.views) == 2
+
+    # Changing permissions selects another view.
+    player.permissions._permissions.add("admin")
+    assert index.match(player, "shutdown")[0] is Shutdown
+    assert len(index.views) == 2
+
+
+def test_dynamic_can_run():
+    """Commands overriding `can_run` are checked for each input."""
+    index = build(Look, Chat)
+    character = Character()
+    assert index.match(character, "chat hi") is None
+    character.subscribed = True
+    assert index.match(character, "chat hi") == (Chat, " ", "hi", None)
+
+
+def test_sub_commands_and_global_alias():
+    """Sub-commands are found, as well as global aliases."""
+    index = build(Account, Password)
+    character = Character()
+    assert index.match(character, "account password new") == (
+        Password,
+        " ",
+        "new",
+        None,
+    )
+    assert index.match(character, "passwd new")[0] is Password
+    assert index.match(character, "account wrong") == (
+        Account,
+        " ",
+        "wrong",
+        "display_sub_commands",
+    )
+
+
+def test_exits():
+    """Exits are merged for each lookup."""
+    index = build(Notes)
+    character = Character()
+    assert index.match(character, "n", exits=[North])[0] is North
+    assert index.match(character, "no", exits=[North])[0] is North
+    assert index.match(character, "notes", exits=[North])[0] is Notes
+    assert index.match(character, "no")[0] is Notes
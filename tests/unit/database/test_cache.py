@@ -0,0 +1,139 @@
+import gc
+from typing import Optional
+
+import pytest
+
+from data.base.model import Field, Model
+from data.base.sql.policy import LRUPolicy, WeakPolicy
+from data.direction import Direction
+from data.exit import Exit
+from data.room import Room
+
+
+class Author(Model):
+
+    id: int = Field(primary_key=True)
+    name: str
+
+
+class Book(Model):
+
+    id: int = Field(primary_key=True)
+    title: str
+    author: Optional[Author] = Field(None, external=True)
+
+
+def test_hits_and_misses(db):
+    db.bind({Author})
+    vincent = Author.create(name="Vincent")
+    Author.get(id=vincent.id)
+    Author.get_or_none(id=vincent.id + 1)
+    stats = db.cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_lru_evicts_unused_models(db):
+    db.cache.policy = LRUPolicy(2)
+    db.bind({Author})
+    ids = [Author.create(name=str(i)).id for i in range(5)]
+    gc.collect()
+    stats = db.cache.stats()
+    assert stats["retained"] == 2
+    assert stats["evictions"] == 3
+    assert stats["size"] == 2
+    author = Author.get(id=ids[0])
+    assert author.name == "0"
+
+
+def test_lru_keeps_identity_of_used_models(db):
+    db.cache.policy = LRUPolicy(1)
+    db.bind({Author})
+    vincent = Author.create(name="Vincent")
+    Author.create(name="Vanessa")
+    gc.collect()
+    assert Author.get(id=vincent.id) is vincent
+
+
+def test_weak_policy_and_pins(db):
+    db.cache.policy = WeakPolicy()
+    db.bind({Author})
+    vincent = Author.create(name="Vincent")
+    db.cache.pin(vincent)
+    vincent_id = vincent.id
+    del vincent
+    gc.collect()
+    assert db.cache.stats()["size"] == 1
+    vincent = Author.get(id=vincent_id)
+    db.cache.unpin(vincent)
+    del vincent
+    gc.collect()
+    assert db.cache.stats()["size"] == 0
+
+
+def test_collected_models_are_unlinked(db):
+    db.cache.policy = WeakPolicy()
+    db.bind({Author, Book})
+    vincent = Author.create(name="Vincent")
+    book = Book.create(title="TalisMUD", author=vincent)
+    assert db.cache.linked_cache[(Author, vincent.id)]
+    del book
+    gc.collect()
+    Author.create(name="Vanessa")
+    assert (Author, vincent.id) not in db.cache.linked_cache
+
+
+def test_rollback_only_forgets_modified_models(db):
+    db.bind({Author})
+    with db.session.begin():
+        vincent = Author.create(name="Vincent")
+        vanessa = Author.create(name="Vanessa")
+
+    with pytest.raises(RuntimeError):
+        with db.session.begin():
+            vincent.name = "Mark"
+            raise RuntimeError("abort")
+
+    assert Author.get(id=vanessa.id) is vanessa
+    author = Author.get(id=vincent.id)
+    assert author is not vincent
+    assert author.name == "Vincent"
+
+
+def test_iter_select_without_retaining(db):
+    db.bind({Author})
+    ids = [Author.create(name=str(i)).id for i in range(5)]
+    db.cache.clear()
+    kept = Author.get(id=ids[0])
+    names = [
+        author.name
+        for author in Author.iter_select(chunk_size=2, retain=False)
+    ]
+    assert names == [str(i) for i in range(5)]
+    gc.collect()
+    stats = db.cache.stats()
+    assert stats["retained"] == 1
+    assert stats["size"] == 1
+    assert Author.get(id=ids[0]) is kept
+
+
+def test_exit_destinations_stay_loaded_with_weak_policy(db):
+    db.cache.policy = WeakPolicy()
+    db.bind({Room, Exit})
+    origin = Room.create(barcode="origin")
+    origin.exits.add(Direction.EAST, Room.create(barcode="east"), "east")
+    origin_id = origin.id
+    del origin
+    db.cache.clear()
+    gc.collect()
+    origin = Room.get(id=origin_id)
+    origin.exits.load_exits()
+    gc.collect()
+    db.count_statements()
+    try:
+        destination = origin.exits.get(Direction.EAST).destination
+        assert db.statements == 0
+    finally:
+        db.count_statements(False)
+
+    assert destination.barcode == "east"
@@ -1,6 +1,9 @@
+from random import Random
+
 import pytest
 
 from data.base.coordinates import Coordinates
+from data.base.sql.spatial import get_distance, SpatialIndex
 from data.base.node import Field, Node
 from data.exit import Direction
 from data.handler.coordinates import CoordinateHandler
@@ -208,6 +211,79 @@ def test_around_order(db):
     assert close.index(east) < close.index(northeast)
 
 
+def test_nearest(db):
+    """Retrieve the nearest rooms (nodes) from coordinates."""
+    db.bind({Coordinates, Room})
+    center = Room.create(barcode="center", title="The center")
+    center.coordinates.update(0, 0, 0)
+    rooms = []
+    for x in range(1, 30):
+        room = Room.create(barcode=f"room_{x}", title=f"Room {x}")
+        room.coordinates.update(x, 0, 0)
+        rooms.append(room)
+
+    db.clear_cache()
+    center = Room.get(barcode="center")
+    distances = center.coordinates.nearest(3)
+    assert [room.barcode for _, room in distances] == [
+        "room_1",
+        "room_2",
+        "room_3",
+    ]
+    assert [distance for distance, _ in distances] == [1, 2, 3]
+    assert center.coordinates.nearest(3, radius=1.5)[0][0] == 1
+    assert len(center.coordinates.nearest(3, radius=1.5)) == 1
+    distances = center.coordinates.nearest(2, x=29, y=0, z=0, exclude=None)
+    assert [room.barcode for _, room in distances] == ["room_29", "room_28"]
+
+
+def test_in_box(db):
+    """Retrieve the rooms (nodes) in a box."""
+    db.bind({Coordinates, Room})
+    rooms = {}
+    for x, y in ((0, 0), (5, 5), (20, 0), (-3, 4)):
+        room = Room.create(barcode=f"{x}_{y}", title="A room")
+        room.coordinates.update(x, y, 0)
+        rooms[(x, y)] = room
+
+    close = rooms[(0, 0)].coordinates.in_box((-3, -1, 0), (5, 5, 0))
+    assert {room.barcode for room in close} == {"0_0", "5_5", "-3_4"}
+
+
+def test_spatial_index_matches_brute_force():
+    """Compare the spatial index with a scan of all coordinates."""
+    spatial = SpatialIndex(None)
+    spatial.loaded = True
+    generator = Random(4)
+    points = {}
+    for node_id in range(500):
+        point = tuple(generator.uniform(-60, 60) for _ in range(3))
+        points[node_id] = point
+        spatial.update(node_id, point)
+
+    # Move and remove some of them.
+    for node_id in range(0, 500, 7):
+        points[node_id] = (node_id % 13, 0.0, -node_id % 5)
+        spatial.update(node_id, points[node_id])
+    for node_id in range(3, 500, 11):
+        del points[node_id]
+        spatial.update(node_id, None)
+
+    for _ in range(20):
+        center = tuple(generator.uniform(-80, 80) for _ in range(3))
+        expected = sorted(
+            (get_distance(center, point), node_id)
+            for node_id, point in points.items()
+        )
+        radius = generator.uniform(0, 40)
+        assert spatial.around(center, radius) == [
+            tup for tup in expected if tup[0] <= radius
+        ]
+        assert spatial.nearest(center, 5) == expected[:5]
+
+    assert spatial.at((7.0, 0.0, 3.0)) == [7, 462]
+
+
 def test_project(db):
     """Test to project."""
     db.bind({Coordinates, Room})
@@ -0,0 +1,105 @@
+import gc
+from weakref import ref
+
+from data.base.node import Node
+from data.decorators import LazyPropertyDescriptor, lazy_property
+
+
+class Counter:
+
+    """A plain object with a lazy property."""
+
+    calls = 0
+
+    @lazy_property
+    def value(self):
+        Counter.calls += 1
+        return object()
+
+    @lazy_property
+    def other(self):
+        return object()
+
+
+class Thing(Node):
+
+    """A node with a lazy property."""
+
+    name: str = "thing"
+
+    @lazy_property
+    def shown(self):
+        return [self.name]
+
+    @shown.setter
+    def shown(self, shown):
+        """Nothing to do."""
+
+    @lazy_property
+    def owner(self):
+        return Owner(self)
+
+
+class Owner:
+
+    """A lazy value referring back to its instance."""
+
+    def __init__(self, thing):
+        self.thing = thing
+
+
+def test_values_are_per_instance():
+    first, second = Counter(), Counter()
+    assert first.value is first.value
+    assert first.value is not second.value
+
+
+def test_invalidate():
+    counter = Counter()
+    value = counter.value
+    other = counter.other
+    Counter.value.invalidate(counter)
+    assert counter.value is not value
+    assert counter.other is other
+    LazyPropertyDescriptor.clear(counter)
+    assert counter.other is not other
+
+
+def test_values_are_forgotten_with_instances():
+    counter = Counter()
+    counter.value
+    instance = ref(counter)
+    del counter
+    gc.collect()
+    assert instance() is None
+
+
+def test_self_referencing_values_are_collected(db):
+    db.bind({Thing})
+    thing = Thing.create(name="apple")
+    assert thing.owner.thing is thing
+    instance = ref(thing)
+    db.cache.clear()
+    del thing
+    gc.collect()
+    assert instance() is None
+
+
+def test_clear_all_values():
+    counter = Counter()
+    value = counter.value
+    assert counter.value is value
+    LazyPropertyDescriptor.clear()
+    assert counter.value is not value
+
+
+def test_setter_and_clear_cache(db):
+    db.bind({Thing})
+    thing = Thing.create(name="apple")
+    shown = thing.shown
+    thing.shown = ["pear"]
+    assert thing.shown == ["pear"]
+    assert thing.shown is not shown
+    db.clear_cache()
+    thing = Thing.get(id=thing.id)
+    assert thing.shown == ["apple"]
@@ -79,6 +79,11 @@ def test_move_well_ordered_when_not_cached(db):
     assert obtained == ids
 
 
+class Marker(Node):
+
+    """A node without any external attribute."""
+
+
 class Coin(Node):
 
     """A coin."""
@@ -153,6 +158,64 @@ def test_stackable_set_location(db):
         dime.location = center
 
 
+def test_move_into_location_not_cached(db):
+    db.bind({Room, Character})
+    center = Room.create(title="center", description="the center")
+    first, second, third = _create_characters(3).values()
+    first.location = center
+    second.location = center
+    db.clear_cache()
+
+    # Move a character without loading the room's contents first.
+    third = Character.get(id=third.id)
+    third.location = Room.get(id=center.id)
+    center = Room.get(id=center.id)
+    obtained = [character.id for character in center.contents]
+    assert obtained == [first.id, second.id, third.id]
+    assert third.location_index == 2
+
+
+def test_next_index_counts_nodes_without_attributes(db):
+    db.bind({Room, Character, Marker})
+    center = Room.create(title="center", description="the center")
+    markers = [Marker.create() for _ in range(2)]
+    for marker in markers:
+        marker.location = center
+
+    db.clear_cache()
+    kredh = Character.create(name="Kredh")
+    kredh.location = Room.get(id=center.id)
+    assert kredh.location_index == 2
+
+
+def test_preload_contents(db):
+    db.bind({Room, Character})
+    rooms = [
+        Room.create(title=f"room {indice}", description="a room")
+        for indice in range(3)
+    ]
+    characters = list(_create_characters(4).values())
+    for indice, character in enumerate(characters):
+        character.location = rooms[indice % 2]
+
+    db.clear_cache()
+    room_ids = [room.id for room in rooms]
+    db.locator.preload(room_ids)
+    assert set(db.locator.contents) == set(room_ids)
+    assert db.locator.next_index[rooms[0].id] == 2
+    assert db.locator.next_index[rooms[2].id] == 0
+    rooms = [Room.get(id=room_id) for room_id in room_ids]
+    assert [c.id for c in rooms[0].contents] == [
+        characters[0].id,
+        characters[2].id,
+    ]
+    assert [c.id for c in rooms[1].contents] == [
+        characters[1].id,
+        characters[3].id,
+    ]
+    assert rooms[2].contents == []
+
+
 def _create_characters(number):
     characters = {}
     for indice in range(1, number + 1):
@@ -128,3 +128,56 @@ def test_create_and_select_with_db(db):
     assert [person for person in results if person.id == vincent.id]
     assert [person for person in results if person.id == anthony.id]
     assert not [person for person in results if person.id == vanessa.id]
+
+
+class Player(Model):
+
+    id: int = Field(primary_key=True)
+    name: str
+    level: int = Field(1, external=True)
+
+
+def test_write_behind_commit(db):
+    db.bind({Player})
+    with db.session.begin():
+        vincent = Player.create(name="Vincent")
+        vincent.name = "Mark"
+        vincent.level = 2
+        vincent.level = 3
+        assert db.pending_fields
+        assert db.pending_attrs
+
+    assert not db.pending_fields
+    assert not db.pending_attrs
+    db.cache.clear()
+    player = Player.get(id=vincent.id)
+    assert player.name == "Mark"
+    assert player.level == 3
+
+
+def test_write_behind_flush_before_read(db):
+    db.bind({Player})
+    with db.session.begin():
+        vincent = Player.create(name="Vincent")
+        vincent.level = 5
+        db.cache.clear()
+        player = Player.get(id=vincent.id)
+        assert player.level == 5
+
+
+def test_write_behind_rollback(db):
+    db.bind({Player})
+    with db.session.begin():
+        vincent = Player.create(name="Vincent")
+
+    with pytest.raises(RuntimeError):
+        with db.session.begin():
+            vincent.name = "Mark"
+            vincent.level = 8
+            raise RuntimeError("abort")
+
+    assert not db.pending_fields
+    assert not db.pending_attrs
+    player = Player.get(id=vincent.id)
+    assert player.name == "Vincent"
+    assert player.level == 1
@@ -0,0 +1,101 @@
+import pickle
+
+from sqlalchemy import select
+
+from data.base.model import Field, Model
+from data.handler.namespace import NamespaceHandler
+
+
+class Hero(Model):
+
+    id: int = Field(primary_key=True)
+    name: str
+    db: NamespaceHandler = Field(
+        default_factory=NamespaceHandler, external=True
+    )
+
+
+def get_rows(db, hero):
+    nattr = Hero.nattr
+    statement = select(nattr.name, nattr.value).where(nattr.model == hero.id)
+    return {name: value for name, value in db.session.execute(statement)}
+
+
+def test_keys_are_stored_separately(db):
+    db.bind({Hero})
+    hero = Hero.create(name="Vincent")
+    hero.db["level"] = 3
+    hero.db.strength = 12
+    rows = get_rows(db, hero)
+    assert pickle.loads(rows["db.level"]) == 3
+    assert pickle.loads(rows["db.strength"]) == 12
+    assert pickle.loads(rows["db"]).keys() == set()
+
+
+def test_keys_are_loaded_lazily(db):
+    db.bind({Hero})
+    hero = Hero.create(name="Vincent")
+    hero.db["level"] = 3
+    hero.db["title"] = "knight"
+    db.cache.clear()
+    hero = Hero.get(id=hero.id)
+    assert set(hero.db._raw) == {"level", "title"}
+    assert hero.db["level"] == 3
+    assert "level" not in hero.db._raw
+    assert "title" in hero.db
+    assert sorted(hero.db.keys()) == ["level", "title"]
+
+
+def test_delete_key(db):
+    db.bind({Hero})
+    hero = Hero.create(name="Vincent")
+    hero.db["level"] = 3
+    del hero.db["level"]
+    assert "db.level" not in get_rows(db, hero)
+    db.cache.clear()
+    hero = Hero.get(id=hero.id)
+    assert "level" not in hero.db
+
+
+def test_only_modified_keys_are_written(db):
+    db.bind({Hero})
+    with db.session.begin():
+        hero = Hero.create(name="Vincent")
+        hero.db.update({str(i): i for i in range(100)})
+
+    statements = []
+    db.logging = lambda statement, args: statements.append((statement, args))
+    with db.session.begin():
+        hero.db["5"] = "five"
+        hero.db["5"] = 5.5
+
+    db.logging = False
+    (arguments,) = [
+        args for statement, args in statements if statement != "COMMIT"
+    ]
+    assert arguments[0] == "db.5"
+    db.cache.clear()
+    hero = Hero.get(id=hero.id)
+    assert hero.db["5"] == 5.5
+    assert hero.db["99"] == 99
+
+
+def test_legacy_namespace_is_compacted(db):
+    db.bind({Hero})
+    hero = Hero.create(name="Vincent")
+    legacy = NamespaceHandler()
+    legacy._data.update({"level": 3, "title": "knight"})
+    nattr = Hero.nattr
+    db.session.execute(
+        nattr.__table__.update()
+        .where((nattr.name == "db") & (nattr.model == hero.id))
+        .values(value=pickle.dumps(legacy))
+    )
+    db.cache.clear()
+    hero = Hero.get(id=hero.id)
+    assert hero.db["title"] == "knight"
+    del hero.db["title"]
+    db.cache.clear()
+    hero = Hero.get(id=hero.id)
+    assert "title" not in hero.db
+    assert hero.db["level"] == 3
@@ -1,6 +1,9 @@
+from typing import Optional
+
+from pydantic import ValidationError
 import pytest
 
-from data.base.node import Node
+from data.base.node import Field, Node
 
 
 class User(Node):
@@ -13,6 +16,13 @@ class Account(Node):
     pass
 
 
+class Box(Node):
+
+    name: str = "box"
+    tags: list[str] = Field(default_factory=list)
+    partner: Optional[Node] = None
+
+
 def test_create(db):
     db.bind({User})
     vincent = User.create(name="Vincent")
@@ -51,6 +61,15 @@ def test_create_and_retrieve_from_db(db):
     assert user.name == vincent.name
 
 
+def test_retrieve_subclass_from_db_through_node(db):
+    db.bind({User})
+    vincent = User.create(name="Vincent")
+    db.cache.clear()
+    user = Node.get(id=vincent.id)
+    assert type(user) is User
+    assert user.name == "Vincent"
+
+
 def test_create_and_update(db):
     db.bind({User})
     vincent = User.create(name="Vincent")
@@ -103,3 +122,92 @@ def test_create_and_get_all(db):
     assert vincent in results
     assert vanessa in results
     assert anthony in results
+
+
+def test_get_many_from_cache_and_db(db):
+    db.bind({User})
+    users = [User.create(name=str(i)) for i in range(5)]
+    db.cache.clear()
+    first = User.get(id=users[0].id)
+    queries = []
+    db.logging = lambda statement, args: queries.append(statement)
+    ids = [user.id for user in reversed(users)] + [999]
+    found = User.get_many(ids)
+    db.logging = False
+    assert [user.id for user in found] == ids[:-1]
+    assert found[-1] is first
+    assert [user.name for user in found] == ["4", "3", "2", "1", "0"]
+
+    # One query for the rows, one for their attributes.
+    assert len(queries) == 2
+
+
+def test_hydrate_without_validation(db):
+    db.bind({Box})
+    first = Box.hydrate({"id": 1, "name": 3})
+    second = Box.hydrate({"id": 2})
+    assert first.name == 3
+    assert second.name == "box"
+    assert first.tags == second.tags == []
+    assert first.tags is not second.tags
+
+
+def test_hydrate_from_db_and_validate_assignment(db):
+    db.bind({Box})
+    box = Box.create(name="apple", tags=["red"])
+    db.cache.clear()
+    box = Box.get(id=box.id)
+    assert box.name == "apple"
+    assert box.tags == ["red"]
+    with pytest.raises(ValidationError):
+        box.name = object()
+
+
+def test_hydrate_from_db_with_cycles(db):
+    db.bind({Box})
+    first = Box.create(name="first")
+    second = Box.create(name="second", partner=first)
+    first.partner = second
+    db.cache.clear()
+    first = Box.get(id=first.id)
+    assert first.partner.name == "second"
+    assert first.partner.partner is first
+
+
+def test_get_all_from_db_with_every_attribute(db):
+    db.bind({Box})
+    first = Box.create(name="first", tags=["a", "b"])
+    second = Box.create(name="second", tags=["c"], partner=first)
+    db.cache.clear()
+    boxes = sorted(Box.all(), key=lambda box: box.id)
+    assert [box.id for box in boxes] == [first.id, second.id]
+    assert [box.name for box in boxes] == ["first", "second"]
+    assert [box.tags for box in boxes] == [["a", "b"], ["c"]]
+    assert boxes[1].partner is boxes[0]
+
+
+def test_get_all_from_db_without_attributes(db):
+    db.bind({Account})
+    accounts = [Account.create() for _ in range(3)]
+    db.cache.clear()
+    assert len(Account.all()) == 3
+    db.cache.clear()
+    assert Account.get(id=accounts[0].id).id == accounts[0].id
+
+
+def test_iter_select_by_chunk(db):
+    db.bind({User})
+    users = [User.create(name=str(i)) for i in range(7)]
+    db.cache.clear()
+    queries = []
+    db.logging = lambda statement, args: queries.append(statement)
+    found = list(User.iter_select(chunk_size=3))
+    db.logging = False
+    assert [user.id for user in found] == [user.id for user in users]
+    assert [user.name for user in found] == [str(i) for i in range(7)]
+
+    # Three chunks of rows, each followed by a query for attributes.
+    assert len(queries) == 6
+    query = User.table.id > users[4].id
+    found = list(User.iter_select(query, chunk_size=3))
+    assert found == users[5:]
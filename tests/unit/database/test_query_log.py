@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import event, text
+
+from data.base.model import Field, Model
+from data.base.sql.query_log import QueryLog
+from data.log import logger
+
+
+class Book(Model):
+
+    id: int = Field(primary_key=True)
+    title: str
+
+
+def test_no_listener_without_logging(db):
+    assert db.query_listeners == []
+    assert not event.contains(
+        db.engine, "before_cursor_execute", db._log_query
+    )
+
+
+def test_debug_mode_times_all_queries(db):
+    db.bind({Book})
+    queries = []
+    db.logging = QueryLog(queries.append, mode="debug")
+    with db.session.begin():
+        Book.create(title="Dune")
+
+    db.logging = False
+    assert db.query_listeners == []
+    statements = [query.statement for query in queries]
+    assert statements[-1] == "COMMIT"
+    insert = next(query for query in queries if "INSERT" in query.statement)
+    assert insert.duration is not None
+    assert "Dune" in str(insert)
+
+
+def test_sample_mode(db):
+    db.bind({Book})
+    queries = []
+    db.logging = QueryLog(queries.append, mode="sample", sample=5, slow=60)
+    for i in range(10):
+        Book.create(title=str(i))
+
+    db.logging = False
+    assert 0 < len(queries) < 10
+    assert not any(query.slow for query in queries)
+
+
+def test_slow_and_failed_queries_are_always_sampled(db):
+    queries = []
+    db.logging = QueryLog(queries.append, mode="sample", sample=1000, slow=0)
+    with db.session.begin():
+        db.session.execute(text("SELECT 1"))
+
+    with pytest.raises(Exception):
+        with db.session.begin():
+            db.session.execute(text("SELECT * FROM missing"))
+
+    db.logging = False
+    assert queries[0].slow
+    assert queries[-1].failed
+    assert "missing" in queries[-1].statement
+
+
+def test_off_mode_creates_no_query_log():
+    assert QueryLog.create(print, mode="off") is None
+
+
+def test_transaction_group_is_released_on_commit(db):
+    with db.session.begin():
+        transaction = db.current_transaction
+        logger.group(transaction).debug("grouped")
+        assert transaction in logger.sub_loggers
+
+    assert transaction not in logger.sub_loggers
+    assert db.current_transaction is None
@@ -0,0 +1,45 @@
+from typing import Optional
+from uuid import UUID, uuid4
+
+import pytest
+
+from data.base.node import Field, Node
+
+
+class Crate(Node):
+
+    barcode: str = Field("unset", unique=True)
+    weight: int = 0
+    token: UUID = Field(default_factory=uuid4)
+    tags: list[str] = Field(default_factory=list)
+    content: Optional[Node] = None
+
+
+def test_schema(db):
+    db.bind({Crate})
+    schema = Crate.schema
+    assert schema.primary_keys == ("id",)
+    assert set(schema.key_fields) == {"id", "barcode"}
+    assert schema.uniques == ("barcode",)
+    assert {"barcode", "weight", "tags", "content"} <= schema.external
+    assert "id" not in schema.external
+    assert "content" in schema.references
+    assert "weight" not in schema.references
+    assert "tags" not in schema.references
+
+
+def test_schema_read_only(db):
+    db.bind({Crate})
+    keys = Crate.get_primary_keys_from_class()
+    assert list(keys) == ["id"]
+    with pytest.raises(TypeError):
+        keys["barcode"] = None
+
+
+def test_cached_primary_keys(db):
+    db.bind({Crate})
+    crate = Crate.create(barcode="crate")
+    assert hash(crate) == hash(("id", crate.id))
+    assert crate._pkeys == ("id", crate.id)
+    crates = {crate}
+    assert Crate.get(barcode="crate") in crates
@@ -0,0 +1,156 @@
+from data.base.node import Node
+from data.object import Object
+from data.prototype.object import ObjectPrototype
+from data.search.group import Group
+
+
+class Room(Node):
+
+    """A room."""
+
+    title: str = "no title"
+
+
+class Thing(Node):
+
+    """A thing that can be seen."""
+
+    name: str = "thing"
+
+
+class Coin(Node):
+
+    """A stackable coin."""
+
+    name: str = "coin"
+
+    class Config:
+        stackable = True
+
+
+def test_versions_change_on_move(db):
+    db.bind({Room, Thing})
+    center = Room.create(title="center")
+    side = Room.create(title="side")
+    apple = Thing.create(name="apple")
+    apple.location = center
+    versions = (
+        db.locator.get_version(center.id),
+        db.locator.get_version(side.id),
+    )
+    apple.location = side
+    assert db.locator.get_version(center.id) != versions[0]
+    assert db.locator.get_version(side.id) != versions[1]
+    version = db.locator.get_version(side.id)
+    db.clear_cache()
+    assert db.locator.get_version(side.id) != version
+
+
+def test_versions_change_with_stackables(db):
+    db.bind({Room, Coin})
+    center = Room.create(title="center")
+    side = Room.create(title="side")
+    dime = Coin.create(name="dime")
+    version = db.locator.get_version(center.id)
+    center.locator.add(dime, 5)
+    assert db.locator.get_version(center.id) != version
+    version = db.locator.get_version(center.id)
+    side_version = db.locator.get_version(side.id)
+    side.locator.transfer(dime, center, 3)
+    assert db.locator.get_version(center.id) != version
+    assert db.locator.get_version(side.id) != side_version
+
+
+def test_cached_group_is_rebuilt_on_change(db):
+    db.bind({Room, Thing})
+    Group.clear()
+    center = Room.create(title="center")
+    viewer = Thing.create(name="viewer")
+    apple = Thing.create(name="apple")
+    apple.location = center
+    group = Group.get_for(viewer, center)
+    assert Group.get_for(viewer, center) is group
+    assert group.get_names() == ["apple"]
+    pear = Thing.create(name="pear")
+    pear.location = center
+    group = Group.get_for(viewer, center)
+    assert group.get_names() == ["apple", "pear"]
+    apple.location = None
+    assert Group.get_for(viewer, center).get_names() == ["pear"]
+
+
+def test_cached_groups_are_bounded(db, monkeypatch):
+    db.bind({Room, Thing})
+    Group.clear()
+    monkeypatch.setattr(Group, "CACHE_SIZE", 2)
+    rooms = [Room.create(title=f"room {i}") for i in range(3)]
+    viewer = Thing.create(name="viewer")
+    first = Group.get_for(viewer, rooms[0])
+    Group.get_for(viewer, rooms[1])
+    assert Group.get_for(viewer, rooms[0]) is first
+    Group.get_for(viewer, rooms[2])
+    assert len(Group.CACHED) == 2
+    assert (viewer.id, (rooms[1].id,)) not in Group.CACHED
+    assert Group.get_for(viewer, rooms[0]) is first
+
+
+def test_cached_group_is_discarded_on_rename(db):
+    db.bind({Room, Thing})
+    Group.clear()
+    center = Room.create(title="center")
+    side = Room.create(title="side")
+    viewer = Thing.create(name="viewer")
+    apple = Thing.create(name="apple")
+    apple.location = center
+    pear = Thing.create(name="pear")
+    pear.location = side
+    assert Group.get_for(viewer, center).get_names() == ["apple"]
+    side_group = Group.get_for(viewer, side)
+    center.title = "the center"
+    assert (viewer.id, (center.id,)) in Group.CACHED
+    apple.name = "green apple"
+    assert (viewer.id, (center.id,)) not in Group.CACHED
+    assert Group.get_for(viewer, side) is side_group
+    assert Group.get_for(viewer, center).get_names() == ["green apple"]
+
+
+def test_cached_group_is_discarded_on_prototype_rename(db):
+    db.bind({Room, Thing, Object, ObjectPrototype})
+    Group.clear()
+    center = Room.create(title="center")
+    viewer = Thing.create(name="viewer")
+    prototype = ObjectPrototype.create(barcode="apple", singular="an apple")
+    prototype.create_object_in(center)
+    assert Group.get_for(viewer, center).get_names() == ["an apple"]
+    prototype.singular = "a red apple"
+    assert not Group.CACHED
+    assert Group.get_for(viewer, center).get_names() == ["a red apple"]
+
+
+def test_matches_are_shared_between_characters(db):
+    db.bind({Room, Thing})
+    Group.clear()
+    center = Room.create(title="center")
+    first = Thing.create(name="first")
+    second = Thing.create(name="second")
+    flower = Thing.create(name="a beautiful flower")
+    flower.location = center
+    group1 = Group.get_for(first, center)
+    group2 = Group.get_for(second, center)
+    assert group1 is not group2
+    assert group1.matches.keys() == group2.matches.keys()
+    assert "beautiful flower" in group1.matches
+    key = (Group, "a beautiful flower")
+    assert Group.MATCHES[key] == frozenset(
+        {
+            "a",
+            "beautiful",
+            "flower",
+            "a beautiful",
+            "beautiful flower",
+            "a beautiful flower",
+        }
+    )
+    assert [grouped.nodes for grouped in group2.match("flow")] == [
+        [(flower, 1, None)]
+    ]
@@ -0,0 +1,112 @@
+import pickle
+from typing import Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import select
+
+from data.base.node import Field, Node
+from data.base.sql.typed import convert_table
+from data.handler.namespace import NamespaceHandler
+from data.room import Room
+
+
+class Crate(Node):
+
+    label: str = "crate"
+    weight: float = 0.0
+    sealed: bool = False
+    serial: Optional[UUID] = None
+    tags: list[str] = Field(default_factory=list)
+    lid: Optional[Node] = None
+    db: NamespaceHandler = Field(default_factory=NamespaceHandler)
+
+
+def get_rows(db, crate):
+    nattr = Crate.nattr
+    statement = select(nattr.name, nattr.value, nattr.typed).where(
+        nattr.model == crate.id
+    )
+    return {
+        name: (value, typed)
+        for name, value, typed in db.session.execute(statement)
+    }
+
+
+def test_native_values_are_not_pickled(db):
+    db.bind({Crate})
+    crate = Crate.create(label="apples", weight=2.5)
+    rows = get_rows(db, crate)
+    assert rows["label"] == (None, "apples")
+    assert rows["weight"] == (None, 2.5)
+    assert rows["sealed"] == (pickle.dumps(False), 0)
+    assert rows["tags"] == (pickle.dumps([]), None)
+    db.cache.clear()
+    crate = Crate.get(id=crate.id)
+    assert crate.label == "apples"
+    assert crate.weight == 2.5
+    assert crate.sealed is False
+
+
+def test_search_typed_values(db):
+    db.bind({Crate})
+    serial = uuid4()
+    lid = Crate.create(label="lid")
+    first = Crate.create(label="apples", sealed=True, serial=serial)
+    second = Crate.create(label="pears", lid=lid)
+    second.label = "apples"
+    assert sorted(Crate.search_attributes("label", "apples")) == [
+        first.id,
+        second.id,
+    ]
+    assert Crate.search_attributes("sealed", True) == [first.id]
+    assert Crate.search_attributes("serial", serial) == [first.id]
+    assert Crate.search_attributes("lid", lid) == [second.id]
+    assert Crate.search_attributes("tags", []) == [
+        lid.id,
+        first.id,
+        second.id,
+    ]
+    assert sorted(Crate.get_attributes("label")) == ["apples", "apples", "lid"]
+
+
+def test_unique_lookup_through_typed_index(db):
+    db.bind({Room})
+    room = Room.create(barcode="demo_1")
+    room.barcode = "demo_2"
+    db.cache.clear()
+    assert Room.get_or_none(barcode="demo_1") is None
+    assert Room.get(barcode="demo_2").id == room.id
+
+
+def test_convert_legacy_attributes(db):
+    db.bind({Crate})
+    lid = Crate.create(label="lid")
+    crate = Crate.create(label="apples", weight=2.5, lid=lid)
+    crate.db["level"] = 3
+
+    # Store attributes as older versions did: pickled, without typed values.
+    nattr = Crate.nattr
+    for model in (lid, crate):
+        for name, (value, typed) in get_rows(db, model).items():
+            if value is None:
+                value = pickle.dumps(typed)
+
+            db.session.execute(
+                nattr.__table__.update()
+                .where((nattr.name == name) & (nattr.model == model.id))
+                .values(value=value, typed=None)
+            )
+
+    convert_table(db.session.connection(), nattr.__table__)
+    db.session.commit()
+
+    rows = get_rows(db, crate)
+    assert rows["label"] == (None, "apples")
+    assert rows["weight"] == (None, 2.5)
+    assert rows["db.level"] == (pickle.dumps(3), None)
+    assert Crate.search_attributes("lid", lid) == [crate.id]
+    db.cache.clear()
+    crate = Crate.get(id=crate.id)
+    assert crate.label == "apples"
+    assert crate.lid.label == "lid"
+    assert crate.db["level"] == 3
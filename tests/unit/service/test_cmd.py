@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from struct import unpack
+
+import pytest
+
+from service.cmd import BATCH_FLAG, CmdMixin, INITIAL_PACKET_FORMAT_STRING
+from service.message import MessageMode
+
+
+class Host(CmdMixin):
+
+    """Minimal service using the command mixin."""
+
+    logger = logging.getLogger("test")
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    async def call_hook(self, *args, **kwargs):
+        pass
+
+    async def send_cmd(self, writer, cmd_name, args=None, cmd_id=None):
+        self.sent.append((cmd_name, cmd_id))
+
+
+def test_answer_resolves_pending_request():
+    async def run():
+        host = Host()
+        task = asyncio.create_task(
+            host.wait_for_answer(None, "sessions", timeout=1)
+        )
+        await asyncio.sleep(0)
+        assert host.get_request_stats()["outstanding"] == 1
+        (cmd_id,) = host.pending
+        assert host.sent == [("sessions", cmd_id)]
+        await host.process_command(
+            None, None, "answer", cmd_id, dict(sessions={})
+        )
+        return host, await task
+
+    host, result = asyncio.run(run())
+    assert result == dict(sessions={})
+    stats = host.get_request_stats()
+    assert stats["answered"] == 1
+    assert stats["outstanding"] == 0
+
+
+def test_timeout_cleans_pending_request():
+    async def run():
+        host = Host()
+        result = await host.wait_for_answer(None, "sessions", timeout=0.01)
+        await host.process_command(None, None, "answer", 0, {})
+        return host, result
+
+    host, result = asyncio.run(run())
+    assert result is None
+    stats = host.get_request_stats()
+    assert stats["timeouts"] == 1
+    assert stats["late"] == 1
+    assert stats["outstanding"] == 0
+
+
+def test_cancelled_request_is_removed():
+    async def run():
+        host = Host()
+        task = asyncio.create_task(host.wait_for_answer(None, "net"))
+        await asyncio.sleep(0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return host
+
+    host = asyncio.run(run())
+    assert host.get_request_stats()["cancelled"] == 1
+    assert host.pending == {}
+
+
+def test_commands_are_sent_in_one_batch():
+    class Writer:
+        def __init__(self):
+            self.written = []
+
+        def write(self, data):
+            self.written.append(data)
+
+        async def drain(self):
+            pass
+
+    async def run():
+        host = Host()
+        writer = Writer()
+        commands = [("output", dict(text=str(i))) for i in range(3)]
+        await host.send_cmds(writer, commands)
+        return writer.written
+
+    MessageMode.setup("secret", ...)
+    written = asyncio.run(run())
+    assert len(written) == 1
+    flag, size = unpack(INITIAL_PACKET_FORMAT_STRING, written[0][:9])
+    assert flag & BATCH_FLAG
+    mode = MessageMode(flag & ~BATCH_FLAG)
+    commands = mode.get_batch(written[0][9:])
+    assert [args for _, _, args in commands] == [
+        dict(text="0"),
+        dict(text="1"),
+        dict(text="2"),
+    ]
+    with pytest.raises(ValueError):
+        mode.get_batch(written[0][9:-1])
@@ -0,0 +1,45 @@
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from service.codec import decode_batch, encode_batch
+
+
+def test_batch_round_trip():
+    session_id = uuid4()
+    sent = datetime(2021, 11, 4, 12, 30, 15, 123456)
+    commands = [
+        ("output", 1, dict(session_id=session_id, output=b"hi", input_id=4)),
+        ("output", 2, dict(session_id=session_id, output=b"", input_id=None)),
+        (
+            "input",
+            3,
+            dict(
+                session_id=session_id, command=b"look", input_id=5, sent=sent
+            ),
+        ),
+        ("sessions", 4, dict(extra=[1, 2, 3])),
+    ]
+    assert decode_batch(encode_batch(commands)) == commands
+    assert decode_batch(encode_batch(commands, compact=False)) == commands
+
+
+def test_compact_output_is_smaller():
+    cmd = ("output", 1, dict(session_id=uuid4(), output=b"hi", input_id=4))
+    assert len(encode_batch([cmd])) < len(encode_batch([cmd], compact=False))
+
+
+def test_unexpected_arguments_are_pickled():
+    cmd = (
+        "output",
+        1,
+        dict(session_id="not a UUID", output=b"hi", input_id=4),
+    )
+    assert decode_batch(encode_batch([cmd])) == [cmd]
+
+
+def test_truncated_batch():
+    cmd = ("output", 1, dict(session_id=uuid4(), output=b"hi", input_id=4))
+    with pytest.raises(ValueError):
+        decode_batch(encode_batch([cmd])[:-1])
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from telnetlib import DO, DONT, IAC, SB, SE, WILL, WONT
+from types import SimpleNamespace
+import zlib
+
+from service.mccp import (
+    Compression,
+    Compressor,
+    MCCP2,
+    MCCP3,
+    TelnetParser,
+)
+from service.outbound import Outbound
+from service.telnet import Service
+
+LOGGER = logging.getLogger("test")
+
+
+class Writer:
+
+    """Fake stream writer, never blocking."""
+
+    def __init__(self):
+        self.written = []
+
+    def write(self, data):
+        self.written.append(data)
+
+    async def drain(self):
+        pass
+
+
+class FakeOutbound:
+
+    """Fake outbound queue, recording what is done."""
+
+    def __init__(self):
+        self.messages = []
+        self.compressor = None
+
+    def put(self, message):
+        self.messages.append(message)
+
+    def start_compression(self, compressor, header):
+        self.compressor = compressor
+        self.messages.append(header)
+
+    def stop_compression(self):
+        self.compressor = None
+
+
+def test_parser_strips_commands():
+    parser = TelnetParser()
+    text, commands, rest = parser.feed(
+        b"look" + IAC + DO + MCCP2 + b" at" + IAC + IAC + b"\n"
+    )
+    assert text == b"look at" + IAC + b"\n"
+    assert commands == [(DO, MCCP2, b"")]
+    assert rest == b""
+
+
+def test_parser_keeps_split_commands():
+    parser = TelnetParser()
+    assert parser.feed(b"a" + IAC) == (b"a", [], b"")
+    assert parser.feed(WILL) == (b"", [], b"")
+    assert parser.feed(b"\x18b") == (b"b", [(WILL, b"\x18", b"")], b"")
+
+
+def test_parser_stops_at_compressed_input():
+    parser = TelnetParser()
+    text, commands, rest = parser.feed(
+        b"hi" + IAC + SB + MCCP3 + IAC + SE + b"\x78\x9c"
+    )
+    assert text == b"hi"
+    assert commands == [(SB, MCCP3, b"")]
+    assert rest == b"\x78\x9c"
+
+
+def test_compressor_ratio():
+    compressor = Compressor()
+    stream = zlib.decompressobj()
+    text = b"You are standing in a long corridor.\r\n" * 20
+    assert stream.decompress(compressor.compress(text)) == text
+    assert stream.decompress(compressor.compress(text)) == text
+    assert compressor.raw == 2 * len(text)
+    assert compressor.ratio < 0.2
+    stream.decompress(compressor.finish())
+    assert stream.eof
+
+
+def test_outbound_compresses_after_header():
+    async def run():
+        writer = Writer()
+        outbound = Outbound(writer, LOGGER)
+        outbound.put(b"before")
+        outbound.start_compression(Compressor(), b"<header>")
+        outbound.put(b"after")
+        outbound.start()
+        await asyncio.sleep(0)
+        outbound.stop_compression()
+        outbound.put(b"raw again")
+        await outbound.close()
+        return b"".join(writer.written)
+
+    written = asyncio.run(run())
+    assert written.startswith(b"before<header>")
+    stream = zlib.decompressobj()
+    assert stream.decompress(written[len(b"before<header>") :]) == b"after"
+    assert stream.eof
+    assert stream.unused_data == b"raw again"
+
+
+def test_compression_resets_queue_depth():
+    outbound = Outbound(Writer(), LOGGER)
+    outbound.put(b"before")
+    outbound.start_compression(Compressor())
+    assert outbound.depth == 0
+    outbound.put(b"after")
+    assert outbound.depth == len(b"after")
+    outbound.stop_compression()
+    assert outbound.depth == 0
+
+
+def test_negotiation_and_compressed_input():
+    service = Service.__new__(Service)
+    service.logger = LOGGER
+    service.compressed = {"raw": 0, "compressed": 0}
+    outbound = FakeOutbound()
+    session = SimpleNamespace(
+        uuid="test",
+        outbound=outbound,
+        compression=Compression(offered=True),
+        parser=TelnetParser(),
+    )
+    compressed = zlib.compress(b"north\n")
+    data = IAC + DO + MCCP2 + IAC + DO + MCCP3 + IAC + WILL + b"\x18"
+    data += b"look\n" + IAC + SB + MCCP3 + IAC + SE + compressed + b"raw\n"
+    assert service.parse_input(session, data) == b"look\nnorth\nraw\n"
+    assert outbound.compressor is session.compression.compressor
+    assert outbound.messages == [
+        IAC + SB + MCCP2 + IAC + SE,
+        IAC + DONT + b"\x18",
+    ]
+    assert session.compression.decompressor is None
+    service.parse_input(session, IAC + DONT + MCCP2 + IAC + DO + b"\x01")
+    assert outbound.compressor is None
+    assert outbound.messages[-1] == IAC + WONT + b"\x01"
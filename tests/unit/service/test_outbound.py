@@ -0,0 +1,105 @@
+import asyncio
+import logging
+
+from service.outbound import Outbound
+
+LOGGER = logging.getLogger("test")
+
+
+class Transport:
+
+    """Fake transport, only able to abort."""
+
+    def __init__(self):
+        self.aborted = False
+
+    def abort(self):
+        self.aborted = True
+
+
+class Writer:
+
+    """Fake stream writer, blocked in `drain` until released."""
+
+    def __init__(self):
+        self.written = []
+        self.released = asyncio.Event()
+        self.transport = Transport()
+
+    def write(self, data):
+        self.written.append(data)
+
+    async def drain(self):
+        await self.released.wait()
+
+
+def test_messages_are_sent_in_order():
+    async def run():
+        writer = Writer()
+        writer.released.set()
+        outbound = Outbound(writer, LOGGER)
+        outbound.start()
+        for i in range(3):
+            outbound.put(f"{i}\r\n".encode())
+        await outbound.close()
+        return b"".join(writer.written)
+
+    assert asyncio.run(run()) == b"0\r\n1\r\n2\r\n"
+
+
+def test_drop_policy():
+    async def run():
+        writer = Writer()
+        outbound = Outbound(writer, LOGGER, high=10, low=5, policy="drop")
+        outbound.start()
+        outbound.put(b"x" * 4)
+        await asyncio.sleep(0)
+        # The writer task is now blocked in drain.
+        assert outbound.put(b"a" * 6)
+        assert not outbound.put(b"b" * 6)
+        assert outbound.depth == 6
+        assert outbound.dropped == 1
+        assert outbound.over
+        writer.released.set()
+        await outbound.close()
+        assert not outbound.over
+        return b"".join(writer.written)
+
+    assert asyncio.run(run()) == b"xxxxaaaaaa"
+
+
+def test_coalesce_policy_keeps_recent_output():
+    async def run():
+        writer = Writer()
+        outbound = Outbound(writer, LOGGER, high=10, low=5, policy="coalesce")
+        outbound.start()
+        outbound.put(b"start")
+        await asyncio.sleep(0)
+        for char in b"abc":
+            outbound.put(bytes([char]) * 4)
+        assert outbound.depth == 4
+        assert outbound.dropped == 2
+        writer.released.set()
+        await outbound.close()
+        return b"".join(writer.written)
+
+    assert asyncio.run(run()) == b"startcccc"
+
+
+def test_disconnect_policy_aborts_slow_client():
+    async def run():
+        writer = Writer()
+        outbound = Outbound(
+            writer, LOGGER, high=10, low=5, policy="disconnect", timeout=0.05
+        )
+        outbound.start()
+        outbound.put(b"start")
+        await asyncio.sleep(0)
+        outbound.put(b"x" * 20)
+        assert outbound.over
+        await asyncio.sleep(0.1)
+        assert writer.transport.aborted
+        assert not outbound.put(b"more")
+        await outbound.close()
+
+    asyncio.run(run())
@@ -0,0 +1,131 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from data.delay import Delay as DbDelay
+from tools.delay import Delay, SCHEDULER
+from tools.logging.frequent import FrequentLogger
+
+CALLED = []
+
+
+def record(value):
+    CALLED.append(value)
+
+
+@pytest.fixture
+def delay_logger(monkeypatch, tmp_path):
+    logger = FrequentLogger("delays")
+    logger.init(tmp_path)
+    logger.setup()
+    monkeypatch.setattr("tools.delay.logger", logger)
+    return logger
+
+
+@pytest.fixture
+def scheduler(db, monkeypatch, delay_logger):
+    db.bind({DbDelay})
+    CALLED.clear()
+    SCHEDULER.clear()
+    monkeypatch.setattr(SCHEDULER, "resolution", 0.1)
+    monkeypatch.setattr(SCHEDULER, "flush_interval", 1)
+    yield SCHEDULER
+    SCHEDULER.clear()
+
+
+def later(seconds):
+    return datetime.utcnow() + timedelta(seconds=seconds)
+
+
+def test_delays_run_in_order_and_not_early(scheduler):
+    Delay.schedule(2, record, "second")
+    Delay.schedule(1, record, "first")
+    Delay.schedule(1.05, record, "same tick")
+    assert Delay.count() == 3
+    assert scheduler.get_due(later(0.5)) == []
+    due = scheduler.get_due(later(1.2))
+    assert [delay.args for delay in due] == [("first",), ("same tick",)]
+    assert Delay.count() == 1
+    assert 0.5 < scheduler.get_timeout() <= 2
+
+
+def test_cancel_and_reschedule(scheduler):
+    first = Delay.schedule(1, record, "first")
+    second = Delay.schedule(1, record, "second")
+    assert first.cancel()
+    assert not first.cancel()
+    second.reschedule(5)
+    assert scheduler.get_due(later(2)) == []
+    assert scheduler.get_due(later(6)) == [second]
+    with pytest.raises(ValueError):
+        second.reschedule(1)
+
+
+def test_unpicklable_callback(scheduler):
+    with pytest.raises(ValueError):
+        Delay.schedule(1, lambda: None)
+
+
+def test_write_ahead_and_execution(scheduler):
+    Delay.schedule(0, record, "now")
+    delay = Delay.schedule(60, record, "later")
+    scheduler.run_once(later(0.2))
+    assert CALLED == ["now"]
+    assert [stored.expire_at for stored in DbDelay.all()] == [delay.expire_at]
+    delay.reschedule(0)
+    scheduler.run_once(later(0.2))
+    assert CALLED == ["now", "later"]
+    assert DbDelay.all() == []
+
+
+def test_batched_flush(scheduler):
+    Delay.schedule(60, record, "first")
+    Delay.schedule(60, record, "second")
+    scheduler.run_once()
+    assert DbDelay.all() == []
+    scheduler.flush_at = datetime.utcnow()
+    scheduler.run_once()
+    assert len(DbDelay.all()) == 2
+    assert scheduler.flush_at is None
+
+
+def test_restore_is_lazy(scheduler):
+    Delay.schedule(60, record, "restored")
+    scheduler.flush()
+    scheduler.clear()
+    delays = [Delay.restore(stored) for stored in DbDelay.all()]
+    assert delays[0].callback is None
+    assert Delay.count() == 1
+    delays[0].reschedule(0)
+    scheduler.run_once(later(0.2))
+    assert CALLED == ["restored"]
+    assert DbDelay.all() == []
+
+
+def test_task_runs_delays(delay_logger):
+    CALLED.clear()
+    SCHEDULER.clear()
+    batches = []
+
+    def runner(delays):
+        batches.append(len(delays))
+        for delay in delays:
+            delay._execute()
+
+    async def run():
+        SCHEDULER.resolution = 0.01
+        SCHEDULER.flush_interval = 10
+        SCHEDULER.start(runner)
+        try:
+            Delay.schedule(0.02, record, "a")
+            Delay.schedule(0.02, record, "b")
+            await asyncio.sleep(0.1)
+        finally:
+            SCHEDULER.stop()
+            SCHEDULER.to_write.clear()
+            SCHEDULER.resolution = SCHEDULER.flush_interval = None
+
+    asyncio.run(run())
+    assert CALLED == ["a", "b"]
+    assert batches == [2]
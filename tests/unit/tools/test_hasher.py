@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+import pytest
+
+from tools.hasher import PasswordHasher, PasswordHasherBusy
+
+
+def test_run_in_worker():
+    """The function runs in a worker thread, not in the event loop."""
+
+    async def run():
+        hasher = PasswordHasher(workers=2, max_pending=4)
+        try:
+            return await hasher.run(threading.current_thread), hasher
+        finally:
+            hasher.shutdown()
+
+    thread, hasher = asyncio.run(run())
+    assert thread is not threading.current_thread()
+    assert thread.name.startswith("password-hasher")
+    stats = hasher.get_stats()
+    assert stats["calls"] == 1
+    assert stats["pending"] == 0
+
+
+def test_concurrency_cap():
+    """Only `workers` calls run at once, others wait."""
+    running = []
+    release = threading.Event()
+
+    def block():
+        running.append(1)
+        release.wait(5)
+        return len(running)
+
+    async def run():
+        hasher = PasswordHasher(workers=1, max_pending=2)
+        try:
+            first = asyncio.create_task(hasher.run(block))
+            second = asyncio.create_task(hasher.run(block))
+            await asyncio.sleep(0.05)
+            assert len(running) == 1
+            release.set()
+            return await asyncio.gather(first, second), hasher
+        finally:
+            hasher.shutdown()
+
+    results, hasher = asyncio.run(run())
+    assert sorted(results) == [1, 2]
+    stats = hasher.get_stats()
+    assert stats["calls"] == 2
+    assert stats["max_pending"] == 2
+    assert stats["max_wait"] >= 0.04
+
+
+def test_reject_when_busy():
+    """Calls beyond `max_pending` are rejected."""
+    release = threading.Event()
+
+    async def run():
+        hasher = PasswordHasher(workers=1, max_pending=1)
+        try:
+            task = asyncio.create_task(hasher.run(release.wait, 5))
+            await asyncio.sleep(0)
+            with pytest.raises(PasswordHasherBusy):
+                await hasher.run(release.wait, 5)
+
+            release.set()
+            await task
+            return hasher
+        finally:
+            hasher.shutdown()
+
+    hasher = asyncio.run(run())
+    assert hasher.get_stats()["rejected"] == 1
@@ -0,0 +1,118 @@
+import threading
+
+from tools.logging import File, Hour, Level, Logger
+from tools.logging.writer import BackgroundWriter, WRITER
+
+
+def test_buffered_file_handler(tmp_path):
+    logger = Logger("test", tmp_path)
+    logger.add_handler(
+        File,
+        Level.DEBUG,
+        cls_batch=Hour,
+        format="{level} {message}",
+        output_file="test.log",
+        buffered=True,
+    )
+    logger.debug("first")
+    logger.info("second")
+    WRITER.flush()
+    lines = (tmp_path / "test.log").read_text().splitlines()
+    assert lines[0].startswith("-- New hour")
+    assert lines[1:] == ["DEBUG first", "INFO second"]
+
+
+def test_writer_keeps_files_open(tmp_path):
+    writer = BackgroundWriter(flush_interval=60)
+    path = tmp_path / "test.log"
+    for i in range(3):
+        writer.add(path, "utf-8", "", f"message {i}")
+    writer.flush()
+    assert path.read_text() == "message 0\nmessage 1\nmessage 2\n"
+    assert path in writer.files
+    writer.close()
+    assert writer.files == {}
+    assert writer.get_stats()["written"] == 3
+
+
+def test_writer_drops_oldest_messages_when_full(tmp_path):
+    writer = BackgroundWriter(capacity=2, flush_interval=60, flush_size=10)
+    path = tmp_path / "test.log"
+    for i in range(5):
+        writer.add(path, "utf-8", "", f"message {i}")
+    stats = writer.get_stats()
+    assert stats["dropped"] == 3
+    assert stats["depth"] == 2
+    writer.close()
+    assert path.read_text() == "message 3\nmessage 4\n"
+
+
+def test_writer_fsync_always(tmp_path):
+    writer = BackgroundWriter(fsync="always")
+    writer.add(tmp_path / "test.log", "utf-8", "", "message")
+    writer.flush()
+    writer.close()
+    assert writer.get_stats()["fsyncs"] >= 1
+
+
+def test_writer_close_leaves_files_to_a_busy_thread(tmp_path):
+    writer = BackgroundWriter(flush_interval=60)
+    path = tmp_path / "test.log"
+    writing = threading.Event()
+    resume = threading.Event()
+    write = writer._write
+
+    def slow_write(entries):
+        writing.set()
+        resume.wait(5)
+        return write(entries)
+
+    writer._write = slow_write
+    writer.add(path, "utf-8", "", "first")
+    thread = writer.thread
+    writer.flush(timeout=0)
+    assert writing.wait(5)
+    writer.close(timeout=0.01)
+    assert thread.is_alive()
+    writer.add(path, "utf-8", "", "second")
+    resume.set()
+    thread.join(5)
+    assert path.read_text() == "first\nsecond\n"
+    assert writer.files == {}
+    assert writer.thread is None
+    assert writer.get_stats()["written"] == 2
+
+
+def test_released_groups_are_kept_in_a_bounded_ring(tmp_path):
+    logger = Logger("test", tmp_path)
+    logger.add_handler(File, Level.DEBUG, output_file="test.log")
+    for identifier in range(logger.recent_size + 5):
+        with logger.grouped(identifier) as group:
+            group.debug(f"message {identifier}")
+
+    assert logger.sub_loggers == {}
+    stats = logger.group_stats()
+    assert stats["groups"] == 0
+    assert stats["recent_groups"] == logger.recent_size
+    assert stats["size"] > 0
+    assert not (tmp_path / "test.log").exists()
+    logger.log_recent_groups()
+    content = (tmp_path / "test.log").read_text()
+    assert "message 4" not in content
+    assert f"message {logger.recent_size + 4}" in content
+
+
+def test_group_is_logged_on_error(tmp_path):
+    logger = Logger("test", tmp_path)
+    logger.add_handler(
+        File, Level.DEBUG, format="{message}", output_file="test.log"
+    )
+    try:
+        with logger.grouped("failing") as group:
+            group.debug("before the error")
+            raise ValueError
+    except ValueError:
+        pass
+
+    assert logger.sub_loggers == {}
+    assert (tmp_path / "test.log").read_text() == "before the error\n"
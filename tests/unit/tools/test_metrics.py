@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+from data.base.node import Node
+from tools.metrics import Metrics, get_percentile
+
+
+class Item(Node):
+
+    name: str = "nothing"
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert get_percentile(values, 50) == 50
+    assert get_percentile(values, 99) == 99
+    assert get_percentile(values, 100) == 100
+    assert get_percentile([3], 99) == 3
+    assert get_percentile([], 50) == 0
+
+
+def test_count_statements(db):
+    db.bind({Item})
+    metrics = Metrics(db)
+    statements = metrics.get_statements()
+    Item.create(name="apple")
+    Item.create(name="pear")
+    sent = datetime.utcnow() - timedelta(milliseconds=20)
+    metrics.record(sent, statements)
+    report = metrics.report()
+    assert report["inputs"] == 1
+    assert report["statements"]["total"] >= 2
+    assert report["latency_ms"]["p50"] >= 20
+
+    metrics.stop()
+    assert db.statements is None
+    Item.create(name="plum")
+    assert metrics.get_statements() == 0